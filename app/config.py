@@ -14,5 +14,69 @@ class Settings:
     MAX_POSITION_PER_SYMBOL = int(os.getenv("MAX_POSITION_PER_SYMBOL", "1000"))
     MAX_TOTAL_EXPOSURE = float(os.getenv("MAX_TOTAL_EXPOSURE", "250000"))
     MAX_DAILY_LOSS = float(os.getenv("MAX_DAILY_LOSS", "2000"))
+    # Time of day in EXCHANGE_TZ (HH:MM) at which the next trading day starts for daily PnL
+    TRADING_DAY_START = os.getenv("TRADING_DAY_START", "00:00")
+    # Seconds between background reconciles (full rebuild) of the position ledger; 0 disables
+    LEDGER_RECONCILE_S = float(os.getenv("LEDGER_RECONCILE_S", "300"))
+    # Seconds between re-pricing trade_pnl unrealized PnL at the ledger's latest marks; 0 disables
+    PNL_UNREALIZED_REFRESH_S = float(os.getenv("PNL_UNREALIZED_REFRESH_S", "5"))
+    # Lot-book checkpoint every N fills and on the first fill of a new day; older ones beyond KEEP are pruned
+    PNL_CHECKPOINT_FILLS = int(os.getenv("PNL_CHECKPOINT_FILLS", "500"))
+    PNL_CHECKPOINT_KEEP = int(os.getenv("PNL_CHECKPOINT_KEEP", "30"))
+    # Seconds before an order's risk reservation is dropped if it was never released
+    RISK_RESERVATION_TTL_S = float(os.getenv("RISK_RESERVATION_TTL_S", "120"))
+    # An open order blocks duplicates for this long unless the broker closes it first
+    ORDER_PENDING_TTL_S = float(os.getenv("ORDER_PENDING_TTL_S", "60"))
+    ORDER_SWEEP_S = float(os.getenv("ORDER_SWEEP_S", "30"))
+    # Portfolio VaR from 15m bar returns: parametric or historical, over VAR_LOOKBACK_BARS bars,
+    # scaled to VAR_HORIZON_BARS bars (26 = one regular session)
+    VAR_METHOD = os.getenv("VAR_METHOD", "parametric")
+    VAR_CONFIDENCE = float(os.getenv("VAR_CONFIDENCE", "0.95"))
+    VAR_LOOKBACK_BARS = int(os.getenv("VAR_LOOKBACK_BARS", "520"))
+    VAR_HORIZON_BARS = int(os.getenv("VAR_HORIZON_BARS", "26"))
+    # Per-bar return volatility assumed for symbols without enough stored bars (conservative proxy)
+    VAR_DEFAULT_BAR_VOL = float(os.getenv("VAR_DEFAULT_BAR_VOL", "0.01"))
+    # Automatic exits of open positions, as a fraction of the average entry price (0 disables)
+    EXIT_STOP_LOSS_PCT = float(os.getenv("EXIT_STOP_LOSS_PCT", "0"))
+    EXIT_TAKE_PROFIT_PCT = float(os.getenv("EXIT_TAKE_PROFIT_PCT", "0"))
+    # Poll prices of positions with exit levels this often while no streaming feed runs (0 disables)
+    EXIT_POLL_S = float(os.getenv("EXIT_POLL_S", "60"))
 
-settings = Settings()
\ No newline at end of file
+    # Market data
+    EXCHANGE_TZ = os.getenv("EXCHANGE_TZ", "America/New_York")
+    # Years of NYSE sessions precomputed around the current year
+    CALENDAR_YEARS_BACK = int(os.getenv("CALENDAR_YEARS_BACK", "5"))
+    CALENDAR_YEARS_AHEAD = int(os.getenv("CALENDAR_YEARS_AHEAD", "2"))
+    BAR_STORE_DIR = os.getenv("BAR_STORE_DIR", "./data/bars")
+    BAR_STORE_ENABLED = os.getenv("BAR_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+    # Streaming bars for validation: yahoo (polling only), ibkr or replay
+    MARKET_DATA_SOURCE = os.getenv("MARKET_DATA_SOURCE", "yahoo")
+    MARKET_DATA_REPLAY_FILE = os.getenv("MARKET_DATA_REPLAY_FILE", "./data/replay.csv")
+    # Symbols subscribed at startup; others are subscribed on their first validation
+    MARKET_DATA_SYMBOLS = [s.strip().upper() for s in os.getenv("MARKET_DATA_SYMBOLS", "").split(",") if s.strip()]
+    IBKR_HOST = os.getenv("IBKR_HOST", "127.0.0.1")
+    IBKR_PORT = int(os.getenv("IBKR_PORT", "7497"))
+    MARKET_DATA_CLIENT_ID = int(os.getenv("MARKET_DATA_CLIENT_ID", "2"))
+
+    # Signal validation latency
+    VALIDATION_TIMEOUT_MS = int(os.getenv("VALIDATION_TIMEOUT_MS", "3000"))
+    # Extra time allowed past the budget before the webhook abandons validation
+    VALIDATION_GRACE_MS = int(os.getenv("VALIDATION_GRACE_MS", "500"))
+    # Max cached validation results (one per symbol/direction/bar)
+    VALIDATION_MEMO_SIZE = int(os.getenv("VALIDATION_MEMO_SIZE", "512"))
+    # Worker processes for indicator computation; 0 evaluates in the request thread
+    VALIDATION_PROCESS_WORKERS = int(os.getenv("VALIDATION_PROCESS_WORKERS", "2"))
+    # Keep the compressed full validation result next to its typed columns
+    VALIDATION_STORE_DETAIL = os.getenv("VALIDATION_STORE_DETAIL", "true").lower() in ("1", "true", "yes")
+
+    # Universe scanner: comma-separated symbols, or a file with one symbol per line
+    SCANNER_UNIVERSE = [s.strip().upper() for s in os.getenv("SCANNER_UNIVERSE", "").split(",") if s.strip()]
+    SCANNER_UNIVERSE_FILE = os.getenv("SCANNER_UNIVERSE_FILE", "")
+    # Size of the scanner's shared process pool (default: all cores); 0 scans in-process
+    SCANNER_WORKERS = int(os.environ["SCANNER_WORKERS"]) if os.getenv("SCANNER_WORKERS") else None
+    # Most symbols one /signals/scan request may list
+    SCANNER_MAX_SYMBOLS = int(os.getenv("SCANNER_MAX_SYMBOLS", "200"))
+    # Rescan the universe after every 15m bar close in the background
+    SCANNER_AUTO_REFRESH = os.getenv("SCANNER_AUTO_REFRESH", "false").lower() in ("1", "true", "yes")
+
+settings = Settings()
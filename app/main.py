@@ -1,19 +1,63 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
-from app.database import Base, engine
+from app.database import Base, engine, SessionLocal
 from app.routes import webhook
 from app.routes import dashboard
+from app.routes import signals
+from app.routes import risk
 from app.config import settings
+from app.services.compute_pool import compute_pool
+from app.services import market_data
+from app.services.scanner import scanner
+from app.services.ledger import position_ledger
+from app.services.order_tracker import order_tracker
+from app.services.position_monitor import position_monitor
+from app.services.pnl import maybe_checkpoint
 # Import all models to ensure they're registered with SQLAlchemy
 from app.models.trade import Trade
 from app.models.settings import TradeSettings
 from app.models.open_order import OpenOrder
+from app.models.validation_result import ValidationResult
+from app.models.daily_pnl import DailyPnl
+from app.models.pnl_checkpoint import PnlCheckpoint
+from app.models.trade_pnl import TradePnl
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title=settings.APP_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Spawn and warm the validation workers before the first alert arrives
+    compute_pool.start()
+    db = SessionLocal()
+    try:
+        position_ledger.rebuild(db)
+        order_tracker.rebuild(db)
+        maybe_checkpoint(db)
+    finally:
+        db.close()
+    order_tracker.start()
+    position_ledger.start()
+    market_data.add_price_listener(position_ledger.mark)
+    position_monitor.on_exit = webhook.exit_handler(asyncio.get_running_loop())
+    position_monitor.start()
+    market_data.start_feed()
+    if settings.SCANNER_AUTO_REFRESH:
+        scanner.start()
+    yield
+    scanner.stop()
+    position_monitor.stop()
+    order_tracker.stop()
+    position_ledger.stop()
+    market_data.stop_feed()
+    compute_pool.shutdown()
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
 app.include_router(webhook.router)
 app.include_router(dashboard.router)
+app.include_router(signals.router)
+app.include_router(risk.router)
 
 @app.get("/")
 def root():
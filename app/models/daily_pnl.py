@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime
+from datetime import datetime
+from app.database import Base
+
+
+class DailyPnl(Base):
+    """Realized PnL per trading day (EXCHANGE_TZ, rolling over at TRADING_DAY_START)."""
+    __tablename__ = "daily_pnl"
+
+    trading_day = Column(Date, primary_key=True)
+    realized = Column(Float, default=0.0)
+    fills = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -6,6 +6,10 @@ from app.database import Base
 class OpenOrder(Base):
     """Track open/pending orders to avoid duplicates."""
     __tablename__ = "open_orders"
+    __table_args__ = (
+        # Pending lookups: symbol/side with filled_at IS NULL
+        Index("ix_open_orders_pending", "symbol", "side", "filled_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String, index=True)
@@ -13,5 +17,6 @@ class OpenOrder(Base):
     qty = Column(Integer)
     price = Column(Float)
     order_id = Column(String, nullable=True, doc="IBKR order ID if available")
+    status = Column(String, nullable=True, doc="Final broker status, or 'expired' when swept")
     created_at = Column(DateTime, server_default=func.now(), index=True)
     filled_at = Column(DateTime, nullable=True, doc="When order was filled or cancelled")
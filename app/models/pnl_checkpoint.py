@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+import json
+from app.database import Base
+
+
+class PnlCheckpoint(Base):
+    """
+    Snapshot of the FIFO lot books after trade `last_trade_id`: open lots per
+    symbol (qty, price, opening trade id), cumulative realized PnL per symbol
+    and per UTC day, recent trading-day totals and last fill prices. PnL and
+    the position ledger replay only trades after it.
+    """
+    __tablename__ = "pnl_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    last_trade_id = Column(Integer, index=True, nullable=False)
+    # Identity of the last trade, to detect trades rewritten or deleted under the checkpoint
+    last_trade_key = Column(String, nullable=False)
+    # "count:sum(qty * fill price)" of the filled trades up to last_trade_id
+    checksum = Column(String)
+    fills = Column(Integer, default=0)
+    reason = Column(String)
+    state = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def state_dict(self) -> dict:
+        return json.loads(self.state)
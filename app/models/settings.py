@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, Boolean, DateTime
+from sqlalchemy import Column, Integer, Float, Boolean, DateTime, String
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -18,6 +18,7 @@ class TradeSettings(Base):
     max_daily_loss = Column(Float, default=2000.0, doc="Max loss allowed per day before stopping trades")
     max_trades_per_day = Column(Integer, default=50, doc="Max number of trades per day")
     max_total_position_notional = Column(Float, default=250000.0, doc="Max total notional exposure across all positions")
+    max_portfolio_var = Column(Float, default=0.0, doc="Max portfolio Value-at-Risk in dollars after an order (0 disables)")
     
     # Position limits
     max_position_per_symbol = Column(Integer, default=1000, doc="Max quantity for single symbol")
@@ -26,6 +27,8 @@ class TradeSettings(Base):
     only_trade_during_rth = Column(Boolean, default=False, doc="If true, only allow trades during RTH (9:30-16:00 ET)")
     subscribe_to_strategy = Column(Boolean, default=True, doc="If false, reject incoming webhook orders")
     enable_signal_validation = Column(Boolean, default=True, doc="If true, validate signals with market data before placing orders")
+    validation_timeout_ms = Column(Integer, default=3000, doc="Latency budget for signal validation in milliseconds")
+    validation_timeout_policy = Column(String, default='reject', doc="On validation timeout: reject, approve_cached or skip")
     
     # Account checks
     min_buying_power_required = Column(Float, default=1000.0, doc="Minimum buying power required to place BUY order")
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
 from app.database import Base
+from app.models.validation_result import ValidationResult
 
 class Trade(Base):
     __tablename__ = "trades"
@@ -13,4 +15,7 @@ class Trade(Base):
     executed_price = Column(Float, nullable=True)  # Actual market execution price
     status = Column(String)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    validation_data = Column(Text, nullable=True)  # Stores validation results as JSON
\ No newline at end of file
+    validation_id = Column(Integer, ForeignKey("validation_results.id"), nullable=True, index=True)
+    validation = relationship(ValidationResult, lazy="select")
+    # Legacy full JSON blob (superseded by validation_results); deferred so listing trades never loads it
+    validation_data = deferred(Column(Text, nullable=True))
\ No newline at end of file
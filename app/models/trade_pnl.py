@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from app.database import Base
+
+
+class TradePnl(Base):
+    """
+    PnL of one filled trade: realized when it was booked (fixed from then on),
+    the symbol's cumulative realized after it, and the unrealized PnL of lots
+    it opened that are still open (at the ledger's latest mark, refreshed on
+    fills and every PNL_UNREALIZED_REFRESH_S).
+    """
+    __tablename__ = "trade_pnl"
+    __table_args__ = (
+        Index("ix_trade_pnl_symbol", "symbol", "trade_id"),
+    )
+
+    trade_id = Column(Integer, primary_key=True)
+    symbol = Column(String, nullable=False)
+    timestamp = Column(DateTime, index=True)
+    realized = Column(Float, default=0.0)
+    cum_realized = Column(Float, default=0.0)
+    unrealized = Column(Float, default=0.0)
+
+    @property
+    def net(self) -> float:
+        return round((self.realized or 0.0) + (self.unrealized or 0.0), 6)
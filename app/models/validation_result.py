@@ -0,0 +1,91 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, LargeBinary
+from sqlalchemy.orm import deferred
+from datetime import datetime
+import json
+import zlib
+from app.database import Base
+
+# Check name -> pass flag column
+CHECK_COLUMNS = {
+    'price_confirmation': 'price_ok',
+    'trend_confirmation': 'trend_ok',
+    'momentum_confirmation': 'momentum_ok',
+    'candle_strength': 'candle_ok',
+    'volume_confirmation': 'volume_ok',
+    'multitf_alignment': 'multitf_ok',
+}
+
+# Indicator values kept as typed columns (taken from the checks' stored values)
+INDICATOR_COLUMNS = ('close', 'rsi', 'macd_diff', 'vol_ratio', 'body_ratio', 'hour_ema_50')
+
+
+class ValidationResult(Base):
+    """Market-data validation outcome for one alert, referenced by Trade.validation_id."""
+    __tablename__ = "validation_results"
+
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String, index=True)
+    direction = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    valid = Column(Boolean)
+    decision = Column(String, nullable=True, doc="APPROVED, REJECTED or SKIPPED")
+    score = Column(Integer, default=0)
+    checks_passed = Column(Integer, nullable=True)
+    required_passes = Column(Integer, nullable=True)
+    timed_out = Column(Boolean, default=False)
+    elapsed_ms = Column(Float, nullable=True)
+
+    # Per-check pass flags (NULL when the check did not run)
+    price_ok = Column(Boolean, nullable=True)
+    trend_ok = Column(Boolean, nullable=True)
+    momentum_ok = Column(Boolean, nullable=True)
+    candle_ok = Column(Boolean, nullable=True)
+    volume_ok = Column(Boolean, nullable=True)
+    multitf_ok = Column(Boolean, nullable=True)
+
+    # Key indicator values on the validated bar
+    close = Column(Float, nullable=True)
+    rsi = Column(Float, nullable=True)
+    macd_diff = Column(Float, nullable=True)
+    vol_ratio = Column(Float, nullable=True)
+    body_ratio = Column(Float, nullable=True)
+    hour_ema_50 = Column(Float, nullable=True)
+
+    # zlib-compressed JSON of the full result; never loaded unless accessed
+    detail = deferred(Column(LargeBinary, nullable=True))
+
+    @staticmethod
+    def columns_from_result(result: dict, store_detail: bool = True) -> dict:
+        """Column values for a validate_signal() result."""
+        meta = result.get('metadata', {})
+        checks = result.get('checks', {})
+        values = {}
+        for check in checks.values():
+            values.update(check.get('values') or {})
+
+        cols = {
+            'valid': bool(result.get('valid')),
+            'decision': meta.get('decision'),
+            'score': result.get('score', 0),
+            'checks_passed': meta.get('checks_passed'),
+            'required_passes': meta.get('required_passes'),
+            'timed_out': bool(meta.get('timed_out', False)),
+            'elapsed_ms': meta.get('elapsed_ms'),
+        }
+        for name, column in CHECK_COLUMNS.items():
+            cols[column] = checks[name].get('passed') if name in checks else None
+        for name in INDICATOR_COLUMNS:
+            cols[name] = values.get(name)
+        cols['detail'] = zlib.compress(json.dumps(result, default=str).encode()) if store_detail else None
+        return cols
+
+    @classmethod
+    def from_result(cls, symbol: str, direction: str, result: dict, store_detail: bool = True):
+        return cls(symbol=symbol, direction=direction, **cls.columns_from_result(result, store_detail))
+
+    def detail_dict(self):
+        """The full stored result, or None when no detail blob was kept."""
+        if self.detail is None:
+            return None
+        return json.loads(zlib.decompress(self.detail))
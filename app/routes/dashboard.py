@@ -1,9 +1,13 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse, JSONResponse
 from app.services.broadcaster import broadcaster
-from app.services.pnl import compute_pnl_by_ticker, compute_daily_realized_pnl
+from app.services.pnl import compute_pnl
 from app.database import SessionLocal
 from app.models.trade import Trade
+from app.models.trade_pnl import TradePnl
+from app.models.daily_pnl import DailyPnl
+from app.services.signal_validation import clamp_budget_ms
+from app.config import settings
 import json
 import logging
 
@@ -203,6 +207,9 @@ HTML = """
       <div class="setting-group">
         <label>Max Total Position Notional <input id="s_max_total_notional" type="number" min="1000" step="1000" /></label>
       </div>
+      <div class="setting-group">
+        <label>Max Portfolio VaR (0 = off) <input id="s_max_portfolio_var" type="number" min="0" step="100" /></label>
+      </div>
       <div class="setting-group">
         <label>Max Position Per Symbol <input id="s_max_pos_symbol" type="number" min="1" /></label>
       </div>
@@ -218,6 +225,18 @@ HTML = """
       <div class="setting-group">
         <label class="checkbox-label"><input id="s_enable_validation" type="checkbox" /> Enable signal validation (market data confirmation)</label>
       </div>
+      <div class="setting-group">
+        <label>Validation Timeout (ms) <input id="s_validation_timeout_ms" type="number" min="100" step="100" /></label>
+      </div>
+      <div class="setting-group">
+        <label>On Validation Timeout
+          <select id="s_validation_timeout_policy">
+            <option value="reject">Reject signal</option>
+            <option value="approve_cached">Use last cached decision</option>
+            <option value="skip">Skip checks</option>
+          </select>
+        </label>
+      </div>
     </div>
     <button id="settingsSaveBtn" class="btn" style="margin-top: 12px">Save Settings</button>
     <span id="settingsStatus" style="margin-left: 8px; color: #666"></span>
@@ -303,11 +322,14 @@ HTML = """
         document.getElementById('s_max_daily_loss').value = d.max_daily_loss
         document.getElementById('s_max_trades_day').value = d.max_trades_per_day
         document.getElementById('s_max_total_notional').value = d.max_total_position_notional
+        document.getElementById('s_max_portfolio_var').value = d.max_portfolio_var
         document.getElementById('s_max_pos_symbol').value = d.max_position_per_symbol
         document.getElementById('s_min_buying_power').value = d.min_buying_power_required
         document.getElementById('s_rth_only').checked = d.only_trade_during_rth
         document.getElementById('s_subscribe').checked = d.subscribe_to_strategy
         document.getElementById('s_enable_validation').checked = d.enable_signal_validation
+        document.getElementById('s_validation_timeout_ms').value = d.validation_timeout_ms
+        document.getElementById('s_validation_timeout_policy').value = d.validation_timeout_policy
       })
     }
 
@@ -389,11 +411,14 @@ HTML = """
         max_daily_loss: document.getElementById('s_max_daily_loss').value,
         max_trades_per_day: document.getElementById('s_max_trades_day').value,
         max_total_position_notional: document.getElementById('s_max_total_notional').value,
+        max_portfolio_var: document.getElementById('s_max_portfolio_var').value,
         max_position_per_symbol: document.getElementById('s_max_pos_symbol').value,
         min_buying_power_required: document.getElementById('s_min_buying_power').value,
         only_trade_during_rth: document.getElementById('s_rth_only').checked,
         subscribe_to_strategy: document.getElementById('s_subscribe').checked,
         enable_signal_validation: document.getElementById('s_enable_validation').checked,
+        validation_timeout_ms: document.getElementById('s_validation_timeout_ms').value,
+        validation_timeout_policy: document.getElementById('s_validation_timeout_policy').value,
       }
       const r = await fetch('/dashboard/api/settings', { method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(body) })
       const j = await r.json()
@@ -554,19 +579,20 @@ async def dashboard_index():
 async def api_pnl():
     db = SessionLocal()
     try:
-        tickers = compute_pnl_by_ticker(db)
-        tickers_list = list(tickers.values())
-        daily = compute_daily_realized_pnl(db)
-        # compute per-trade pnl mapping for filled trades
-        from app.services.pnl import compute_trade_pnls
-        trade_pnls = compute_trade_pnls(db)
+        # Ticker and daily views from the latest lot-book checkpoint onwards
+        pnl = compute_pnl(db)
+        tickers_list = list(pnl.tickers().values())
+        daily = pnl.daily_realized()
 
         # include recent trades (including rejected/error statuses)
         recent = []
         rows = db.query(Trade).order_by(Trade.timestamp.desc()).limit(50).all()
+        # Per-trade PnL is materialized by the ledger as fills are booked
+        trade_pnls = {p.trade_id: p for p in
+                      db.query(TradePnl).filter(TradePnl.trade_id.in_([t.id for t in rows])).all()}
         for t in rows:
             pnl_entry = trade_pnls.get(t.id)
-            pnl_val = pnl_entry['net'] if pnl_entry is not None else None
+            pnl_val = pnl_entry.net if pnl_entry is not None else None
             recent.append({
                 'id': t.id,
                 'timestamp': t.timestamp.isoformat() if t.timestamp else '',
@@ -637,6 +663,10 @@ async def api_reset():
     db = SessionLocal()
     try:
         deleted = db.query(Trade).delete()
+        from app.models.pnl_checkpoint import PnlCheckpoint
+        db.query(PnlCheckpoint).delete()
+        db.query(TradePnl).delete()
+        db.query(DailyPnl).delete()
         db.commit()
         logging.info("Database reset performed; deleted %s trades", deleted)
         return JSONResponse({"status": "ok", "deleted": deleted})
@@ -651,30 +681,71 @@ async def api_reset():
 async def api_charts():
     db = SessionLocal()
     try:
-        trades = db.query(Trade).filter(Trade.status.like('Filled%')).order_by(Trade.timestamp).all()
-        from app.services.pnl import compute_trade_pnls
-        tpnls = compute_trade_pnls(db)
-
+        # Cumulative realized per symbol and per trading day, straight from the materialized tables
         per_symbol = {}
-        daily = {}
-        for t in trades:
-            real = tpnls.get(t.id, {}).get('realized', 0.0)
-            sym = t.symbol
-            ts_iso = t.timestamp.isoformat()
-            if sym not in per_symbol:
-                per_symbol[sym] = []
-            cum_prev = per_symbol[sym][-1]['v'] if per_symbol[sym] else 0.0
-            cum_now = round(cum_prev + real, 6)
-            per_symbol[sym].append({'t': ts_iso, 'v': cum_now})
-
-            day_key = t.timestamp.date().isoformat()
-            daily[day_key] = round(daily.get(day_key, 0.0) + real, 6)
-
-        daily_series = [{'day': k, 'v': v} for k, v in sorted(daily.items())]
+        rows = db.query(TradePnl.symbol, TradePnl.timestamp, TradePnl.cum_realized) \
+            .order_by(TradePnl.symbol, TradePnl.trade_id).all()
+        for sym, ts, cum in rows:
+            per_symbol.setdefault(sym, []).append({'t': ts.isoformat() if ts else '', 'v': cum})
+
+        daily_series = [{'day': d.trading_day.isoformat(), 'v': d.realized}
+                        for d in db.query(DailyPnl).order_by(DailyPnl.trading_day).all()]
         return JSONResponse({"per_symbol": per_symbol, "daily": daily_series})
     finally:
         db.close()
 
+@router.get('/api/bars/{symbol}')
+async def api_bars(symbol: str, interval: str = '15m', start: str = None, end: str = None):
+    """OHLCV bars for charts, served from the local bar store (no network)."""
+    from app.services.bar_store import bar_store
+    cols = bar_store.read(symbol, interval, start=start, end=end)
+    if cols is None:
+        return JSONResponse({"symbol": symbol.upper(), "interval": interval, "bars": []})
+    bars = [
+        {'t': int(ts) // 1_000_000, 'o': float(o), 'h': float(h), 'l': float(l), 'c': float(c), 'v': float(v)}
+        for ts, o, h, l, c, v in zip(cols['ts'], cols['open'], cols['high'], cols['low'], cols['close'], cols['volume'])
+    ]
+    return JSONResponse({"symbol": symbol.upper(), "interval": interval, "bars": bars})
+
+@router.get('/api/trades/{trade_id}/validation')
+async def api_trade_validation(trade_id: int):
+    """Stored market-data validation for a trade, with detail lines rendered on demand."""
+    db = SessionLocal()
+    try:
+        trade = db.query(Trade).filter(Trade.id == trade_id).first()
+        if trade is None:
+            return JSONResponse({"error": "trade not found"}, status_code=404)
+        if trade.validation is not None:
+            result = trade.validation.detail_dict()
+            if result is None:
+                from app.models.validation_result import CHECK_COLUMNS
+                v = trade.validation
+                result = {
+                    'valid': v.valid,
+                    'score': v.score,
+                    'checks': {name: {'passed': getattr(v, col)} for name, col in CHECK_COLUMNS.items()
+                               if getattr(v, col) is not None},
+                    'metadata': {'decision': v.decision, 'checks_passed': v.checks_passed,
+                                 'timed_out': v.timed_out},
+                }
+        elif trade.validation_data:
+            result = json.loads(trade.validation_data)
+        else:
+            return JSONResponse({"trade_id": trade_id, "validation": None})
+        from app.services.validation_rules import describe_result
+        return JSONResponse({"trade_id": trade_id, "validation": describe_result(result, trade.side or '')})
+    finally:
+        db.close()
+
+@router.get('/api/metrics')
+async def api_metrics():
+    """Counters and latency percentiles collected in-process, plus risk check stats."""
+    from app.services.metrics import metrics
+    from app.services.risk import risk_pipeline
+    snapshot = metrics.snapshot()
+    snapshot['risk_checks'] = risk_pipeline.stats()
+    return JSONResponse(snapshot)
+
 # WebSocket endpoints removed — dashboard now reads directly from the DB on refresh
 
 @router.get('/api/settings')
@@ -702,11 +773,14 @@ async def get_settings():
             "max_daily_loss": setting.max_daily_loss,
             "max_trades_per_day": setting.max_trades_per_day,
             "max_total_position_notional": setting.max_total_position_notional,
+            "max_portfolio_var": getattr(setting, 'max_portfolio_var', None) or 0.0,
             "max_position_per_symbol": setting.max_position_per_symbol,
             "only_trade_during_rth": setting.only_trade_during_rth,
             "min_buying_power_required": setting.min_buying_power_required,
             "subscribe_to_strategy": getattr(setting, 'subscribe_to_strategy', True),
             "enable_signal_validation": getattr(setting, 'enable_signal_validation', True),
+            "validation_timeout_ms": getattr(setting, 'validation_timeout_ms', None) or settings.VALIDATION_TIMEOUT_MS,
+            "validation_timeout_policy": getattr(setting, 'validation_timeout_policy', None) or 'reject',
         })
     finally:
         db.close()
@@ -741,6 +815,8 @@ async def update_settings(body: dict):
             setting.max_trades_per_day = int(body['max_trades_per_day'])
         if 'max_total_position_notional' in body:
             setting.max_total_position_notional = float(body['max_total_position_notional'])
+        if 'max_portfolio_var' in body:
+            setting.max_portfolio_var = float(body['max_portfolio_var'] or 0)
         if 'max_position_per_symbol' in body:
             setting.max_position_per_symbol = int(body['max_position_per_symbol'])
         if 'only_trade_during_rth' in body:
@@ -751,6 +827,13 @@ async def update_settings(body: dict):
             setting.subscribe_to_strategy = bool(body['subscribe_to_strategy'])
         if 'enable_signal_validation' in body:
             setting.enable_signal_validation = bool(body['enable_signal_validation'])
+        if 'validation_timeout_ms' in body:
+            setting.validation_timeout_ms = clamp_budget_ms(body['validation_timeout_ms'])
+        if 'validation_timeout_policy' in body:
+            from app.services.signal_validation import TIMEOUT_POLICIES
+            if body['validation_timeout_policy'] not in TIMEOUT_POLICIES:
+                return JSONResponse({"status": "error", "reason": "invalid validation_timeout_policy"}, status_code=400)
+            setting.validation_timeout_policy = body['validation_timeout_policy']
         
         db.add(setting)
         db.commit()
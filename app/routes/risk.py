@@ -0,0 +1,50 @@
+# app/routes/risk.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.database import SessionLocal
+from app.schemas.risk import ExitLevelsRequest, RiskSimulationRequest
+from app.services.ledger import position_ledger
+from app.services.position_monitor import position_monitor
+from app.services.risk import RiskManager
+from app.services.risk_simulation import simulate_orders
+
+router = APIRouter(prefix="/risk", tags=["Risk"])
+
+
+@router.post("/simulate")
+def simulate(request: RiskSimulationRequest):
+    """
+    What-if run of hypothetical orders through the risk limits, in order,
+    against the current ledger and trade settings. Nothing is placed or
+    recorded; the response has per-order decisions and the position path.
+    """
+    db = SessionLocal()
+    try:
+        user_settings = RiskManager().get_user_settings(db)
+        position_ledger.sync(db)
+        return simulate_orders(request.orders, user_settings, snapshot=position_ledger.snapshot(),
+                               start_flat=request.start_flat, include_orders=request.include_orders)
+    finally:
+        db.close()
+
+
+@router.get("/exits")
+def exits():
+    """Stop-loss / take-profit levels of the open positions and exits in flight."""
+    return position_monitor.snapshot()
+
+
+@router.put("/exits/{symbol}")
+def set_exit_levels(symbol: str, request: ExitLevelsRequest):
+    """Override the stop and target of an open position until it is closed."""
+    levels = position_monitor.set_levels(symbol, request.stop, request.target)
+    if levels is None:
+        return JSONResponse({"status": "error", "reason": f"no open position in {symbol.upper()}"}, status_code=404)
+    return levels.to_dict()
+
+
+@router.delete("/exits/{symbol}")
+def clear_exit_levels(symbol: str):
+    """Go back to the default percentage levels for `symbol`."""
+    levels = position_monitor.clear_levels(symbol)
+    return levels.to_dict() if levels is not None else {"symbol": symbol.upper(), "position": 0}
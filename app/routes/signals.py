@@ -0,0 +1,30 @@
+# app/routes/signals.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.services.scanner import scanner
+from app.config import settings
+import json
+
+router = APIRouter(prefix="/signals", tags=["Signals"])
+
+
+@router.get("/scan")
+def scan_signals(symbols: str = None, refresh: bool = False):
+    """
+    Rank the universe (or a comma-separated `symbols` list, at most
+    SCANNER_MAX_SYMBOLS) by validation score for both directions. Streams
+    NDJSON: one {"type": "result"} line per symbol as it completes, then a
+    {"type": "ranking"} line with the ordered list. Within the same 15m bar
+    the cached ranking is returned immediately. `refresh` tops up the bar
+    store and rescans; the background scanner already does that after every bar close.
+    """
+    universe = [s.strip().upper() for s in symbols.split(',') if s.strip()] if symbols else None
+    if universe and len(universe) > settings.SCANNER_MAX_SYMBOLS:
+        return JSONResponse({"status": "error",
+                             "reason": f"at most {settings.SCANNER_MAX_SYMBOLS} symbols per scan"}, status_code=400)
+
+    def lines():
+        for item in scanner.stream(universe, refresh=refresh):
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
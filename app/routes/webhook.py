@@ -6,16 +6,26 @@ from app.schemas.webhook import TradingViewAlert
 from app.services.strategy import validate_signal
 from app.services.broker import place_order_sync
 from app.services.risk import RiskManager
-from app.services.signal_validation import validate_signal as validate_signal_with_market_data
+from app.services.ledger import position_ledger
+from app.services.order_tracker import order_tracker, is_terminal
+from app.services.position_monitor import position_monitor
+from app.services.pnl import maybe_checkpoint
+from app.services.signal_validation import validate_signal as validate_signal_with_market_data, timed_out_result, clamp_budget_ms
+from app.services.metrics import metrics
 from app.database import SessionLocal
 from app.models.trade import Trade
+from app.models.validation_result import ValidationResult
+from app.config import settings
 import asyncio
+import functools
 import logging
-import json
+import time
 
 router = APIRouter(prefix="/webhook", tags=["Webhook"])
 
 executor = ThreadPoolExecutor(max_workers=2)
+# Separate pool so slow market-data fetches never queue behind order placement
+validation_executor = ThreadPoolExecutor(max_workers=4)
 
 def get_db():
     db = SessionLocal()
@@ -35,6 +45,42 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
     3. Risk management checks
     4. Order placement to IBKR
     """
+    with metrics.timer('webhook.latency_ms'):
+        return await _handle_alert(alert, db)
+
+
+async def _run_validation(symbol: str, side: str, user_settings) -> dict:
+    """
+    Run market-data validation off the event loop under the configured budget.
+    The webhook never waits longer than budget + grace; past that the
+    configured timeout policy decides the outcome.
+    """
+    budget_ms = clamp_budget_ms(getattr(user_settings, 'validation_timeout_ms', None) or settings.VALIDATION_TIMEOUT_MS)
+    policy = getattr(user_settings, 'validation_timeout_policy', None) or 'reject'
+    loop = asyncio.get_running_loop()
+    # Time spent queued for a validation worker counts against the budget, so an
+    # abandoned run finds its deadline passed and returns without fetching
+    queued_at = time.monotonic()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(validation_executor, functools.partial(
+                validate_signal_with_market_data, symbol, side, budget_ms, policy, queued_at=queued_at)),
+            timeout=(budget_ms + settings.VALIDATION_GRACE_MS) / 1000,
+        )
+    except asyncio.TimeoutError:
+        metrics.incr('validation.hard_timeouts')
+        logging.warning("Signal validation for %s exceeded hard ceiling (%sms); policy=%s",
+                        symbol, budget_ms + settings.VALIDATION_GRACE_MS, policy)
+        return timed_out_result(symbol, side, budget_ms, policy)
+
+
+def _validation_record(alert: TradingViewAlert, market_validation: dict) -> ValidationResult:
+    """Row for the validation_results table; the trade references it by id."""
+    return ValidationResult.from_result(alert.symbol.upper(), alert.side.upper(), market_validation,
+                                        store_detail=settings.VALIDATION_STORE_DETAIL)
+
+
+async def _handle_alert(alert: TradingViewAlert, db: Session):
     # Layer 1: Schema validation
     if not validate_signal(alert):
         return {"status": "rejected", "reason": "invalid qty or side"}
@@ -48,7 +94,7 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
     market_validation = None
     if enable_validation:
         logging.info(f"Validating signal: {alert.symbol} {alert.side}")
-        market_validation = validate_signal_with_market_data(alert.symbol.upper(), alert.side.upper())
+        market_validation = await _run_validation(alert.symbol.upper(), alert.side.upper(), user_settings)
         
         if not market_validation['valid']:
             # Signal not confirmed by market data
@@ -59,7 +105,7 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
                 qty=alert.qty,
                 price=alert.price,
                 status=status,
-                validation_data=json.dumps(market_validation)  # Store validation details
+                validation=_validation_record(alert, market_validation)  # Store validation details
             )
             db.add(trade)
             db.commit()
@@ -73,7 +119,7 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
             }
         
         logging.info(
-            f"Signal validated: {market_validation['metadata']['checks_passed']}/5 checks passed"
+            f"Signal validated: {market_validation['metadata'].get('checks_passed')}/5 checks passed"
         )
     else:
         logging.info("Signal validation disabled - skipping market data confirmation")
@@ -92,14 +138,14 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
             qty=alert.qty,
             price=alert.price,
             status=status,
-            validation_data=json.dumps(market_validation)
+            validation=_validation_record(alert, market_validation)
         )
         db.add(trade)
         db.commit()
         return {"status": "rejected", "reason": "subscription_disabled"}
 
-    # Layer 4: Risk management checks
-    ok, reason = risk.validate_order(alert.symbol.upper(), alert.side.upper(), alert.qty, alert.price, db)
+    # Layer 4: Risk management checks; passing reserves the order's qty and notional
+    ok, reason, reservation = risk.reserve_order(alert.symbol.upper(), alert.side.upper(), alert.qty, alert.price, db)
     if not ok:
         status = f"risk_rejected: {reason}"
         # Save rejected trade and return
@@ -109,7 +155,7 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
             qty=alert.qty,
             price=alert.price,
             status=status,
-            validation_data=json.dumps(market_validation)
+            validation=_validation_record(alert, market_validation)
         )
         db.add(trade)
         try:
@@ -121,6 +167,50 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
             return {"status": "db_error", "reason": str(e)}
         return {"status": "rejected", "reason": reason}
 
+    try:
+        result = await _place_and_record(alert, db, market_validation)
+    except BaseException:
+        reservation.release()
+        raise
+    # A fill is in the ledger by now and a rejected order frees its hold; an order
+    # still working at the broker keeps it until RISK_RESERVATION_TTL_S expires it
+    if is_terminal(result.get('order_status')):
+        reservation.release()
+    return result
+
+
+async def submit_exit(symbol: str, side: str, qty: int, price: float, reason: str):
+    """
+    Place a stop-loss / take-profit exit from the position monitor through the
+    same broker path as alerts. Exits skip signal validation and the risk
+    limits; the monitor has already reserved the position being closed.
+    """
+    db = SessionLocal()
+    try:
+        alert = TradingViewAlert(symbol=symbol, side=side, qty=qty, price=price)
+        market_validation = {'valid': True, 'metadata': {'decision': 'EXIT', 'reason': reason}}
+        return await _place_and_record(alert, db, market_validation)
+    finally:
+        db.close()
+        position_monitor.done(symbol)
+
+
+def exit_handler(loop: asyncio.AbstractEventLoop):
+    """Exit callback for the position monitor; runs submit_exit on `loop` from any thread."""
+    def on_exit(symbol, side, qty, price, reason):
+        asyncio.run_coroutine_threadsafe(submit_exit(symbol, side, qty, price, reason), loop)
+    return on_exit
+
+
+async def _place_and_record(alert: TradingViewAlert, db: Session, market_validation: dict):
+    # Track the order as open until the broker reports back (duplicate protection)
+    order = None
+    try:
+        order = order_tracker.submit(db, alert.symbol, alert.side, alert.qty, alert.price)
+    except Exception:
+        db.rollback()
+        logging.exception("Failed to record open order")
+
     # Run synchronous IBKR function in thread and handle errors
     loop = asyncio.get_running_loop()
     try:
@@ -130,6 +220,9 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
         logging.exception("Error placing order")
         status = f"error: {e}"
 
+    if order is not None:
+        order_tracker.record_result(db, order, status)
+
     # Parse execution price from status (e.g., "Filled | reason: Fill 10.0@273.89")
     executed_price = None
     if "Fill" in status and "@" in status:
@@ -151,19 +244,31 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
         price=alert.price,
         executed_price=executed_price,
         status=status,
-        validation_data=json.dumps(market_validation)
+        validation=_validation_record(alert, market_validation)
     )
     db.add(trade)
     try:
         db.commit()
-        logging.info("Trade saved (id=%s) with status: %s", getattr(trade, 'id', None), status)        # Broadcast new trade and updated PnL
+        logging.info("Trade saved (id=%s) with status: %s", getattr(trade, 'id', None), status)
+        if status.startswith('Filled'):
+            try:
+                position_ledger.sync(db)
+            except Exception:
+                logging.exception("Position ledger update failed")
+            try:
+                maybe_checkpoint(db)
+            except Exception:
+                db.rollback()
+                logging.exception("PnL checkpoint failed")
+        # Broadcast new trade and updated PnL
         try:
             from app.services.broadcaster import broadcaster
-            from app.services.pnl import compute_pnl_by_ticker, compute_daily_realized_pnl
-            # prepare payloads
-            from app.services.pnl import compute_trade_pnls
-            tpnl = compute_trade_pnls(db)
-            pnl_val = tpnl.get(trade.id, {}).get('net') if tpnl else None
+            from app.services.pnl import compute_pnl
+            # prepare payloads: trade PnL was materialized by the ledger sync above
+            from app.models.trade_pnl import TradePnl
+            report = compute_pnl(db)
+            tpnl = db.query(TradePnl).filter(TradePnl.trade_id == trade.id).first()
+            pnl_val = tpnl.net if tpnl is not None else None
             tpayload = {
                 'type': 'new_trade',
                 'trade': {
@@ -179,11 +284,10 @@ async def tradingview_webhook(alert: TradingViewAlert, db: Session = Depends(get
             }
             await broadcaster.broadcast(tpayload)
 
-            pnl = compute_pnl_by_ticker(db)
             dpayload = {
                 'type': 'pnl_update',
-                'tickers': list(pnl.values()),
-                'daily_realized': compute_daily_realized_pnl(db)
+                'tickers': list(report.tickers().values()),
+                'daily_realized': report.daily_realized()
             }
             await broadcaster.broadcast(dpayload)
         except Exception:
@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class SimulatedOrder(BaseModel):
+    symbol: str
+    side: str
+    qty: int
+    price: float
+    # When set, the RTH rule is checked against this time instead of being skipped
+    timestamp: Optional[datetime] = None
+
+
+class RiskSimulationRequest(BaseModel):
+    orders: List[SimulatedOrder]
+    # Start from a flat book instead of the current ledger positions
+    start_flat: bool = False
+    # Per-order decisions and position path (set false for summary only)
+    include_orders: bool = True
+
+
+class ExitLevelsRequest(BaseModel):
+    # Either level may be left out to disable exits on that side
+    stop: Optional[float] = None
+    target: Optional[float] = None
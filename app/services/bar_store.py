@@ -0,0 +1,200 @@
+"""
+Local Bar Store
+Columnar, append-only storage of OHLCV bars per symbol and interval.
+
+Layout: <BAR_STORE_DIR>/<SYMBOL>/<interval>/{ts,open,high,low,close,volume}.npy
+`ts` holds bar open times as int64 nanoseconds since the epoch (UTC). Reads
+memory-map the column files so range queries slice the arrays without copying.
+The network (Yahoo Finance) is only used to top up the newest bars.
+"""
+
+import os
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Periods accepted by yfinance, smallest first, used to size top-up downloads
+_TOPUP_PERIODS = (('1d', 1), ('5d', 5), ('1mo', 30), ('3mo', 90))
+
+
+def period_to_timedelta(period: str) -> timedelta:
+    """Convert a yfinance period string ('7d', '1mo', '1y') to a timedelta."""
+    period = period.strip().lower()
+    if period.endswith('mo'):
+        return timedelta(days=30 * int(period[:-2]))
+    if period.endswith('d'):
+        return timedelta(days=int(period[:-1]))
+    if period.endswith('y'):
+        return timedelta(days=365 * int(period[:-1]))
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def download_history(symbol: str, interval: str, period: str,
+                     timeout: float = None) -> Optional[pd.DataFrame]:
+    """Fetch OHLCV bars from Yahoo Finance with lowercase column names."""
+    import yfinance as yf
+    try:
+        df = yf.Ticker(symbol.upper()).history(interval=interval, period=period,
+                                               timeout=timeout if timeout is not None else 10)
+    except Exception as e:
+        logger.error(f"Failed to download {interval} data for {symbol}: {e}")
+        return None
+    if df is None or df.empty:
+        return None
+    df.columns = [col.lower() for col in df.columns]
+    return df
+
+
+class BarStore:
+    """
+    Append-only columnar bar store backed by memory-mapped .npy files.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = Path(root or settings.BAR_STORE_DIR)
+        self._lock = threading.Lock()
+        # (symbol, interval) -> (ts file mtime, {column: memmap})
+        self._maps: Dict[tuple, tuple] = {}
+
+    def _dir(self, symbol: str, interval: str) -> Path:
+        return self.root / symbol.upper() / interval
+
+    def _load(self, symbol: str, interval: str) -> Optional[Dict[str, np.ndarray]]:
+        """Return memory-mapped columns, reopening only when the files changed."""
+        path = self._dir(symbol, interval)
+        ts_file = path / 'ts.npy'
+        if not ts_file.exists():
+            return None
+        key = (symbol.upper(), interval)
+        mtime = ts_file.stat().st_mtime_ns
+        cached = self._maps.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        cols = {'ts': np.load(ts_file, mmap_mode='r')}
+        for col in COLUMNS:
+            cols[col] = np.load(path / f'{col}.npy', mmap_mode='r')
+        # A reader racing a writer may see columns of different length; trim to the shortest
+        n = min(len(a) for a in cols.values())
+        cols = {k: v[:n] for k, v in cols.items()}
+        self._maps[key] = (mtime, cols)
+        return cols
+
+    def read(self, symbol: str, interval: str, start: datetime = None,
+             end: datetime = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Return zero-copy column views for bars with start <= ts < end.
+        Returns None when nothing is stored for the symbol/interval.
+        """
+        cols = self._load(symbol, interval)
+        if cols is None:
+            return None
+        ts = cols['ts']
+        lo = 0 if start is None else int(np.searchsorted(ts, _to_ns(start), side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, _to_ns(end), side='left'))
+        return {k: v[lo:hi] for k, v in cols.items()}
+
+    def read_frame(self, symbol: str, interval: str, start: datetime = None,
+                   end: datetime = None) -> Optional[pd.DataFrame]:
+        """Range query returned as a DataFrame indexed in the exchange timezone."""
+        cols = self.read(symbol, interval, start, end)
+        if cols is None or len(cols['ts']) == 0:
+            return None
+        index = pd.DatetimeIndex(pd.to_datetime(np.asarray(cols['ts']), utc=True))
+        index = index.tz_convert(settings.EXCHANGE_TZ)
+        return pd.DataFrame({col: np.asarray(cols[col], dtype='float64') for col in COLUMNS}, index=index)
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[datetime]:
+        cols = self._load(symbol, interval)
+        if cols is None or len(cols['ts']) == 0:
+            return None
+        return pd.Timestamp(int(cols['ts'][-1]), tz='UTC').to_pydatetime()
+
+    def append(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """
+        Append bars from a DataFrame with a DatetimeIndex and OHLCV columns.
+        Stored bars at or after the first new timestamp are replaced, so a
+        still-forming last bar is overwritten by its updated version.
+        Returns number of bars written.
+        """
+        if df is None or df.empty:
+            return 0
+        df = df.rename(columns=str.lower)
+        new_ts = index_to_ns(df.index)
+        order = np.argsort(new_ts, kind='stable')
+        new_ts = new_ts[order]
+
+        with self._lock:
+            path = self._dir(symbol, interval)
+            path.mkdir(parents=True, exist_ok=True)
+            existing = self._load(symbol, interval)
+            keep = 0
+            if existing is not None:
+                keep = int(np.searchsorted(existing['ts'], new_ts[0], side='left'))
+
+            merged = {'ts': new_ts}
+            for col in COLUMNS:
+                merged[col] = df[col].to_numpy(dtype='float64')[order]
+            if keep:
+                merged = {k: np.concatenate([np.asarray(existing[k][:keep]), v]) for k, v in merged.items()}
+            # Release our mappings before replacing the files (required on Windows)
+            existing = None
+            self._maps.pop((symbol.upper(), interval), None)
+
+            # Write columns first and the timestamp file last; readers key off ts.npy
+            for col in COLUMNS + ('ts',):
+                tmp = path / f'.{col}.tmp.npy'
+                np.save(tmp, merged[col])
+                os.replace(tmp, path / f'{col}.npy')
+
+        return len(new_ts)
+
+    def top_up(self, symbol: str, interval: str, period: str, timeout: float = None) -> int:
+        """
+        Download only the bars newer than what is stored. `period` is the
+        history depth to fetch when the store is empty; `timeout` bounds the
+        download in seconds.
+        """
+        last = self.last_timestamp(symbol, interval)
+        fetch_period = period
+        if last is not None:
+            gap = datetime.now(timezone.utc) - last
+            max_gap = period_to_timedelta(period)
+            for name, days in _TOPUP_PERIODS:
+                if gap < timedelta(days=days) and timedelta(days=days) <= max_gap:
+                    fetch_period = name
+                    break
+        df = download_history(symbol, interval, fetch_period, timeout=timeout)
+        if df is None:
+            return 0
+        return self.append(symbol, interval, df)
+
+
+def _to_ns(value) -> int:
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.value)
+
+
+def index_to_ns(index) -> np.ndarray:
+    """DatetimeIndex (naive = UTC) to int64 epoch nanoseconds."""
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    return index.tz_convert('UTC').as_unit('ns').asi8.astype('int64')
+
+
+# singleton
+bar_store = BarStore()
@@ -0,0 +1,148 @@
+"""
+Validation Compute Pool
+Runs the pandas/ta part of signal validation in a pool of pre-warmed worker
+processes so indicator math never holds the GIL of the web server.
+
+Bars are handed over through shared memory (one int64 timestamp row and the
+float64 OHLCV rows in a single block) instead of pickling DataFrames.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, Any, Optional
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from app.services.bar_store import COLUMNS, index_to_ns
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def frame_to_shm(df: pd.DataFrame):
+    """Copy an OHLCV frame into a new shared-memory block. Returns (shm, spec)."""
+    n = len(df)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n * 8 * (len(COLUMNS) + 1)))
+    np.ndarray((n,), dtype='int64', buffer=shm.buf)[:] = index_to_ns(df.index)
+    block = np.ndarray((len(COLUMNS), n), dtype='float64', buffer=shm.buf, offset=n * 8)
+    for i, col in enumerate(COLUMNS):
+        block[i] = df[col].to_numpy(dtype='float64')
+    tz = str(df.index.tz) if df.index.tz is not None else settings.EXCHANGE_TZ
+    return shm, {'name': shm.name, 'n': n, 'tz': tz}
+
+
+def frame_from_shm(spec: Dict[str, Any]) -> pd.DataFrame:
+    """Rebuild an OHLCV frame from a block written by frame_to_shm()."""
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    try:
+        n = spec['n']
+        ts = np.ndarray((n,), dtype='int64', buffer=shm.buf).copy()
+        block = np.ndarray((len(COLUMNS), n), dtype='float64', buffer=shm.buf, offset=n * 8).copy()
+    finally:
+        shm.close()
+    index = pd.DatetimeIndex(pd.to_datetime(ts, utc=True)).tz_convert(spec['tz'])
+    return pd.DataFrame({col: block[i] for i, col in enumerate(COLUMNS)}, index=index)
+
+
+def _warm() -> None:
+    """Worker initializer: pay the pandas/ta import cost before the first alert."""
+    import pandas  # noqa: F401
+    import ta  # noqa: F401
+    import app.services.signal_validation  # noqa: F401
+
+
+def _ping() -> bool:
+    return True
+
+
+def _evaluate(symbol: str, direction: str, spec_15m: Dict[str, Any],
+              spec_1h: Optional[Dict[str, Any]], remaining: Optional[float]) -> Dict[str, Any]:
+    from app.services.signal_validation import SignalValidator
+    df_15m = frame_from_shm(spec_15m)
+    df_1h = frame_from_shm(spec_1h) if spec_1h else None
+    # Deadlines travel as remaining seconds; monotonic clocks are per process on some platforms
+    deadline = time.monotonic() + remaining if remaining is not None else None
+    return SignalValidator(symbol, direction, deadline=deadline).evaluate(df_15m, df_1h)
+
+
+class ComputePool:
+    def __init__(self, workers: int = None):
+        self.workers = settings.VALIDATION_PROCESS_WORKERS if workers is None else workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def start(self) -> None:
+        """Create the pool and make sure every worker has finished its imports."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm)
+            executor = self._executor
+        for f in [executor.submit(_ping) for _ in range(self.workers)]:
+            f.result()
+        logger.info("Validation compute pool started with %d workers", self.workers)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def evaluate(self, symbol: str, direction: str, df_15m: pd.DataFrame,
+                 df_1h: Optional[pd.DataFrame], remaining: float = None) -> Dict[str, Any]:
+        """
+        Run SignalValidator.evaluate() in a worker. If the worker cannot answer
+        before `remaining` seconds, every check is reported as timed out.
+        """
+        from app.services.signal_validation import SignalValidator, CHECK_NAMES
+        if self._executor is None:
+            self.start()
+
+        shms = []
+        try:
+            shm, spec_15m = frame_to_shm(df_15m)
+            shms.append(shm)
+            spec_1h = None
+            if df_1h is not None and not df_1h.empty:
+                shm, spec_1h = frame_to_shm(df_1h)
+                shms.append(shm)
+
+            started = time.monotonic()
+            future = self._executor.submit(_evaluate, symbol, direction, spec_15m, spec_1h, remaining)
+            try:
+                result = future.result(timeout=remaining)
+            except FutureTimeout:
+                future.cancel()
+                metrics.incr('compute_pool.timeouts')
+                validator = SignalValidator(symbol, direction)
+                for check_name in CHECK_NAMES:
+                    validator._mark_timed_out(check_name)
+                validator._calculate_final_decision()
+                return validator.validation_result
+            except BrokenProcessPool:
+                logger.exception("Validation compute pool broke; evaluating inline")
+                metrics.incr('compute_pool.broken')
+                self.shutdown()
+                return SignalValidator(symbol, direction).evaluate(df_15m, df_1h)
+            metrics.observe('compute_pool.evaluate_ms', (time.monotonic() - started) * 1000)
+            return result
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+
+# singleton
+compute_pool = ComputePool()
@@ -0,0 +1,118 @@
+"""
+Daily Realized PnL
+Per-trading-day realized PnL accumulated fill by fill, so the daily loss
+check is a dict lookup instead of a FIFO replay of the whole trades table.
+
+A trading day starts at TRADING_DAY_START in EXCHANGE_TZ and is labelled by
+the calendar date it ends on (with the default 00:00 this is simply the
+exchange-local date); fills outside trading days roll into the next session
+per the market calendar. Totals are persisted to the daily_pnl table.
+"""
+
+from datetime import datetime, date, timedelta
+from typing import Dict, Optional
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.models.daily_pnl import DailyPnl
+from app.services.market_calendar import market_calendar
+
+logger = logging.getLogger(__name__)
+
+# In-memory days kept behind the current one; older days live only in the table
+KEEP_DAYS = 7
+
+
+def trading_day(ts: Optional[datetime] = None) -> date:
+    """Trading day a timestamp belongs to (see MarketCalendar.trading_day)."""
+    return market_calendar.trading_day(ts)
+
+
+class DailyPnlBook:
+    """Realized PnL and fill count per trading day, flushed to daily_pnl on demand."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.realized_by_day: Dict[date, float] = {}
+        self.fills_by_day: Dict[date, int] = {}
+        self.current: Optional[date] = None
+        # Earliest day the book holds in full (None: every day, replayed from inception)
+        self.since: Optional[date] = None
+        self._dirty = set()
+
+    def restore(self, days: Dict[date, list]) -> None:
+        """Seed with a checkpoint's trading-day totals ({day: [realized, fills]})."""
+        for day, (realized, fills) in days.items():
+            self.realized_by_day[day] = round(realized, 6)
+            self.fills_by_day[day] = fills
+            self._dirty.add(day)
+        if days:
+            self.since = min(days)
+            self.current = max(days)
+
+    def add(self, ts: Optional[datetime], realized: float) -> date:
+        day = trading_day(ts)
+        self.realized_by_day[day] = round(self.realized_by_day.get(day, 0.0) + realized, 6)
+        self.fills_by_day[day] = self.fills_by_day.get(day, 0) + 1
+        self._dirty.add(day)
+        if self.current is None or day > self.current:
+            self._roll(day)
+        return day
+
+    def _roll(self, day: date) -> None:
+        if self.current is not None:
+            logger.info(f"Trading day rolled over {self.current} -> {day} "
+                        f"(realized {self.realized_by_day.get(self.current, 0.0)})")
+        self.current = day
+        cutoff = day - timedelta(days=KEEP_DAYS)
+        for old in [d for d in self.realized_by_day if d < cutoff and d not in self._dirty]:
+            self.realized_by_day.pop(old, None)
+            self.fills_by_day.pop(old, None)
+
+    def realized(self, day: Optional[date] = None) -> float:
+        """Realized PnL for `day` (default: the current trading day)."""
+        return self.realized_by_day.get(day or trading_day(), 0.0)
+
+    def fills(self, day: Optional[date] = None) -> int:
+        """Fills booked to `day` (default: the current trading day)."""
+        return self.fills_by_day.get(day or trading_day(), 0)
+
+    def flush(self, db: Session, replace: bool = False) -> int:
+        """
+        Upsert changed days into daily_pnl; returns the number of rows written.
+        replace=True (after a full replay, when the book holds every day from
+        `since` on) compares against the table, writes only days whose totals
+        differ and deletes days that no longer have fills.
+        """
+        booked = sorted(self._dirty)
+        if not booked and not replace:
+            return 0
+        days = booked
+        try:
+            if replace:
+                query = db.query(DailyPnl.trading_day, DailyPnl.realized, DailyPnl.fills)
+                if self.since is not None:
+                    query = query.filter(DailyPnl.trading_day >= self.since)
+                stored = {r.trading_day: (r.realized, r.fills) for r in query}
+                stale = set(stored) - set(booked)
+                if stale:
+                    db.query(DailyPnl).filter(DailyPnl.trading_day.in_(stale)).delete(synchronize_session=False)
+                days = [d for d in days if stored.get(d) != (self.realized_by_day.get(d, 0.0),
+                                                              self.fills_by_day.get(d, 0))]
+            for day in days:
+                db.merge(DailyPnl(
+                    trading_day=day,
+                    realized=self.realized_by_day.get(day, 0.0),
+                    fills=self.fills_by_day.get(day, 0),
+                    updated_at=datetime.utcnow(),
+                ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to persist daily PnL")
+            return 0
+        self._dirty.difference_update(booked)
+        return len(days)
@@ -0,0 +1,447 @@
+"""
+Position Ledger
+In-memory per-symbol net position and open-lot notional, kept in step with
+the filled trades in the DB so risk checks never have to aggregate the
+trades table.
+
+Total exposure is the open position of each symbol marked at its last known
+price (the latest fill or streamed bar, whichever is newest). Alert prices
+never move a mark; they only value the order being checked.
+It is a running sum adjusted per symbol on fills and price updates, so it
+only ever reflects what is open now, whatever the length of the history.
+
+The ledger is rebuilt from the DB at startup and then only applies filled
+trades it has not seen yet (id > last applied id), so a sync costs one
+indexed range query that is usually empty. A full rebuild happens when the
+last applied trade disappears or changes (e.g. after a dashboard reset), and
+a background thread reconciles against the DB every LEDGER_RECONCILE_S as a
+safety net; any drift found is logged. The same thread re-prices the
+unrealized PnL in trade_pnl every PNL_UNREALIZED_REFRESH_S for symbols whose
+mark moved. A rebuild restores the latest valid
+lot-book checkpoint (see pnl.py), replays only the fills after it into a
+fresh book outside the lock and swaps it in, and PnL tables are written through the
+ledger's own session, never the caller's.
+
+Orders that pass the risk checks hold a Reservation of their qty and
+notional until they fill or fail, so concurrent orders are checked against
+each other as well as against the book. An order only counts against the
+exposure limit by what it adds (see exposure_change), so orders that reduce
+or close a position always pass that check.
+
+Realized PnL of each fill is also booked to its trading day (see
+daily_pnl.py), which makes the daily loss check a lookup, and to the trade
+itself (see trade_pnl.py), which serves charts and trade lists.
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import itertools
+import logging
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.trade import Trade
+from app.models.trade_pnl import TradePnl
+from app.services.daily_pnl import DailyPnlBook
+from app.services.metrics import metrics
+from app.services.pnl import LotBook, PnlReport, fill_price, load_checkpoint
+from app.services.trade_pnl import TradePnlBook
+
+logger = logging.getLogger(__name__)
+
+
+def exposure_change(position: int, side: str, qty: int, price: float, mark: float) -> float:
+    """
+    Change in total exposure if the order fills against `position`: the shares
+    it closes leave at their mark, the shares it opens come in at the order
+    price. Never positive for an order that only reduces the position.
+    """
+    closing = min(qty, max(0, -position if side == 'BUY' else position))
+    return (qty - closing) * price - closing * mark
+
+
+class Reservation:
+    """Qty and notional held against the limits by an order in flight."""
+
+    def __init__(self, ledger, token: int, symbol: str, side: str, qty: int, notional: float,
+                 exposure: float):
+        self.ledger = ledger
+        self.token = token
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.notional = notional
+        # Exposure the order adds if it fills (0 for reducing orders)
+        self.exposure = exposure
+        self.created = time.monotonic()
+
+    def release(self) -> None:
+        """Drop the hold; call once the fill is in the ledger or the order failed."""
+        self.ledger.release(self)
+
+
+class PositionLedger:
+    """Net position, open-lot notional and marked total exposure, read in O(1)."""
+
+    def __init__(self, reconcile_s: float = None, session_factory=None, refresh_s: float = None):
+        self.reconcile_s = settings.LEDGER_RECONCILE_S if reconcile_s is None else reconcile_s
+        self.refresh_s = settings.PNL_UNREALIZED_REFRESH_S if refresh_s is None else refresh_s
+        # Sessions for writing daily_pnl / trade_pnl
+        self.session_factory = session_factory or SessionLocal
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.daily = DailyPnlBook()
+        self.trade_pnl = TradePnlBook()
+        self._tokens = itertools.count(1)
+        self.reservations: Dict[int, Reservation] = {}
+        self.reserved_buys: Dict[str, int] = {}
+        self.reserved_sells: Dict[str, int] = {}
+        # Exposure added by the orders in flight
+        self.reserved_notional = 0.0
+        # symbol -> last known price; kept across rebuilds
+        self.marks: Dict[str, float] = {}
+        # Held symbols re-marked since trade_pnl unrealized was last refreshed
+        self._remarked = set()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.book = LotBook()
+        self.daily.reset()
+        self.trade_pnl.reset()
+        self.positions: Dict[str, int] = {}
+        self.notional: Dict[str, float] = {}
+        self.market_value: Dict[str, float] = {}
+        self.exposure = 0.0
+        self.last_id = 0
+        self._last_row = None
+        self._rebuilt_at = None
+
+    # ---- fills -------------------------------------------------------------
+
+    def apply_fill(self, symbol: str, side: str, qty: int, price: float, trade_id: int = None) -> float:
+        """Apply one executed fill; returns the PnL it realizes."""
+        with self._lock:
+            realized = self.book.fill(symbol, side, int(qty), float(price), trade_id=trade_id)
+            signed = int(qty) if side.upper() == 'BUY' else -int(qty)
+            self.positions[symbol] = self.positions.get(symbol, 0) + signed
+            self.notional[symbol] = sum(abs(lot['qty']) * lot['price'] for lot in self.book.books[symbol])
+            self.marks[symbol] = float(price)
+            self._revalue(symbol)
+            return realized
+
+    def mark(self, symbol: str, price: float) -> None:
+        """Record the latest price for `symbol` and re-mark its open position."""
+        if not price or price <= 0:
+            return
+        with self._lock:
+            self.marks[symbol] = float(price)
+            if self.positions.get(symbol):
+                self._revalue(symbol)
+                self._remarked.add(symbol)
+
+    def _revalue(self, symbol: str) -> None:
+        value = abs(self.positions.get(symbol, 0)) * self.marks.get(symbol, 0.0)
+        self.exposure += value - self.market_value.get(symbol, 0.0)
+        self.market_value[symbol] = value
+
+    def _apply_rows(self, rows) -> int:
+        for t in rows:
+            realized = self.apply_fill(t.symbol, t.side, t.qty, fill_price(t), trade_id=t.id)
+            self.daily.add(t.timestamp, realized)
+            self.trade_pnl.add(t, realized)
+            self.last_id, self._last_row = t.id, _row_key(t)
+        return len(rows)
+
+    # ---- DB sync -----------------------------------------------------------
+
+    def _checkpoint(self, db: Session) -> Optional[PnlReport]:
+        """Latest valid checkpoint, if trade_pnl already holds every trade it covers."""
+        session = self.session_factory()
+        try:
+            report = load_checkpoint(session)
+        except Exception:
+            session.rollback()
+            logger.exception("Failed to load PnL checkpoint; replaying from inception")
+            return None
+        finally:
+            session.close()
+        if report is None or not report.trading_days:
+            return None
+        # Older trades are only written by a replay from inception
+        booked = db.query(func.count(TradePnl.trade_id)).filter(TradePnl.trade_id <= report.last_id).scalar()
+        return report if booked == report.fills else None
+
+    def _restore(self, report: PnlReport, db: Session) -> None:
+        """Start from a checkpoint's lot book instead of an empty one."""
+        self.book = report.book
+        for symbol, lots in self.book.books.items():
+            self.positions[symbol] = self.book.position(symbol)
+            self.notional[symbol] = sum(abs(lot['qty']) * lot['price'] for lot in lots)
+        self.marks.update(self.book.last_price)
+        self.daily.restore(report.trading_days)
+        self.trade_pnl.restore(report.realized, report.last_id)
+        last = db.query(Trade).filter(Trade.id == report.last_id).first()
+        self.last_id, self._last_row = report.last_id, _row_key(last) if last is not None else None
+
+    def _replay(self, db: Session) -> 'PositionLedger':
+        """A fresh ledger holding every filled trade in the DB; touches nothing of ours."""
+        fresh = PositionLedger(reconcile_s=0, session_factory=self.session_factory)
+        report = self._checkpoint(db)
+        if report is not None:
+            fresh._restore(report, db)
+        rows = db.query(Trade).filter(
+            Trade.id > fresh.last_id,
+            Trade.status.like('Filled%'),
+        ).order_by(Trade.id).all()
+        fresh._apply_rows(rows)
+        return fresh
+
+    def _state(self) -> tuple:
+        return dict(self.positions), round(self.exposure, 6), self.realized_today()
+
+    def rebuild(self, db: Session) -> None:
+        """Replay every filled trade from the DB and swap the result in."""
+        self._rebuild(db)
+
+    def _rebuild(self, db: Session) -> Tuple[tuple, tuple]:
+        started = time.monotonic()
+        fresh = self._replay(db)
+        with self._lock:
+            # Fills synced while replaying
+            fresh._apply_rows(db.query(Trade).filter(
+                Trade.id > fresh.last_id,
+                Trade.status.like('Filled%'),
+            ).order_by(Trade.id).all())
+            before = self._state()
+            for name in ('book', 'daily', 'trade_pnl', 'positions', 'notional', 'last_id', '_last_row'):
+                setattr(self, name, getattr(fresh, name))
+            # Prices seen before the rebuild are at least as new as any replayed fill
+            self.marks = {**fresh.marks, **self.marks}
+            self.exposure = 0.0
+            self.market_value = {}
+            for symbol in self.positions:
+                self._revalue(symbol)
+            self._rebuilt_at = time.monotonic()
+            after = self._state()
+            self._persist(replace=True)
+        metrics.observe('ledger.rebuild_ms', (time.monotonic() - started) * 1000)
+        logger.info(f"Position ledger rebuilt up to trade {self.last_id} ({len(self.positions)} symbols)")
+        return before, after
+
+    def reconcile(self, db: Session) -> bool:
+        """Rebuild from the DB and report whether the in-memory state had drifted."""
+        if self._rebuilt_at is None:
+            self.rebuild(db)
+            return True
+        before, after = self._rebuild(db)
+        if before != after:
+            metrics.incr('ledger.drift')
+            logger.warning(f"Position ledger drift corrected: {before} -> {after}")
+            return False
+        return True
+
+    def _persist(self, replace: bool = False) -> None:
+        """Write booked daily and per-trade PnL through the ledger's own session."""
+        db = self.session_factory()
+        try:
+            self.daily.flush(db, replace=replace)
+            self.trade_pnl.flush(db, self.book, replace=replace, marks=self.marks)
+        finally:
+            db.close()
+
+    def refresh_unrealized(self) -> int:
+        """Re-price trade_pnl unrealized PnL of symbols re-marked since the last refresh."""
+        with self._lock:
+            symbols, self._remarked = self._remarked, set()
+            if not symbols:
+                return 0
+            db = self.session_factory()
+            try:
+                self.trade_pnl.refresh_unrealized(db, self.book, symbols, self.marks)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._remarked |= symbols
+                logger.exception("Failed to refresh unrealized trade PnL")
+                return 0
+            finally:
+                db.close()
+        return len(symbols)
+
+    def sync(self, db: Session) -> int:
+        """Apply filled trades committed since the last sync; returns how many."""
+        with self._lock:
+            if self._rebuilt_at is None:
+                self.rebuild(db)
+                return 0
+            if self.last_id and self._last_row is not None:
+                last = db.query(Trade).filter(Trade.id == self.last_id).first()
+                if last is None or _row_key(last) != self._last_row:
+                    logger.info("Trades changed under the position ledger; rebuilding")
+                    self.rebuild(db)
+                    return 0
+            rows = db.query(Trade).filter(
+                Trade.id > self.last_id,
+                Trade.status.like('Filled%'),
+            ).order_by(Trade.id).all()
+            applied = self._apply_rows(rows)
+            if applied:
+                self._persist()
+            return applied
+
+    def start(self) -> None:
+        """Refresh unrealized PnL every refresh_s and reconcile every reconcile_s in a background thread."""
+        if self._thread is not None or not (self.reconcile_s or self.refresh_s):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ledger-reconcile', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        tick = min(s for s in (self.reconcile_s, self.refresh_s) if s)
+        reconciled = time.monotonic()
+        while not self._stop.wait(tick):
+            if self.refresh_s:
+                try:
+                    self.refresh_unrealized()
+                except Exception:
+                    logger.exception("Unrealized PnL refresh failed")
+            if not self.reconcile_s or time.monotonic() - reconciled < self.reconcile_s:
+                continue
+            reconciled = time.monotonic()
+            db = self.session_factory()
+            try:
+                self.reconcile(db)
+            except Exception:
+                logger.exception("Position ledger reconcile failed")
+            finally:
+                db.close()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    # ---- reservations ------------------------------------------------------
+
+    def reserve(self, symbol: str, side: str, qty: int, price: float,
+                max_position: int, max_exposure: float) -> Tuple[Optional[Reservation], Optional[str]]:
+        """
+        Check an order against the position and exposure limits, counting every
+        open reservation, and hold its qty and notional if it fits.
+        Returns (reservation, None) or (None, reason).
+        """
+        side = side.upper()
+        notional = abs(qty * price)
+        with self._lock:
+            self._expire_reservations()
+            position = self.position(symbol)
+            buys = self.reserved_buys.get(symbol, 0)
+            sells = self.reserved_sells.get(symbol, 0)
+
+            # 6. SELL orders need the position not already promised to other sells
+            if side == 'SELL' and position - sells < qty:
+                return None, f"insufficient_position_to_sell (have: {position - sells}, want: {qty})"
+
+            # 7. Position per symbol, whichever of the pending orders fill
+            if side == 'BUY':
+                new_pos = position + buys + qty
+            else:
+                new_pos = position - sells - qty
+            if abs(new_pos) > max_position:
+                return None, f"position_limit_exceeded (would be {new_pos}, max {max_position})"
+
+            # 8. Total exposure (open positions at last price plus everything in flight),
+            # only for orders that add to it
+            change = exposure_change(position + buys if side == 'BUY' else position - sells,
+                                     side, qty, price, self.marks.get(symbol, price))
+            projected = self.exposure + self.reserved_notional + change
+            if change > 0 and projected > max_exposure:
+                return None, f"total_exposure_exceeded (would be {projected} > {max_exposure})"
+
+            reservation = Reservation(self, next(self._tokens), symbol, side, qty, notional, max(0.0, change))
+            self.reservations[reservation.token] = reservation
+            held = self.reserved_buys if side == 'BUY' else self.reserved_sells
+            held[symbol] = held.get(symbol, 0) + qty
+            self.reserved_notional += reservation.exposure
+            metrics.incr('risk.reservations')
+            return reservation, None
+
+    def release(self, reservation: Reservation) -> None:
+        with self._lock:
+            if self.reservations.pop(reservation.token, None) is None:
+                return
+            held = self.reserved_buys if reservation.side == 'BUY' else self.reserved_sells
+            held[reservation.symbol] -= reservation.qty
+            if not held[reservation.symbol]:
+                del held[reservation.symbol]
+            self.reserved_notional = max(0.0, self.reserved_notional - reservation.exposure)
+
+    def _expire_reservations(self) -> None:
+        ttl = settings.RISK_RESERVATION_TTL_S
+        now = time.monotonic()
+        for r in [r for r in self.reservations.values() if now - r.created > ttl]:
+            logger.warning(f"Risk reservation {r.token} ({r.side} {r.qty} {r.symbol}) expired unreleased")
+            metrics.incr('risk.reservations_expired')
+            self.release(r)
+
+    # ---- reads -------------------------------------------------------------
+
+    def position(self, symbol: str) -> int:
+        return self.positions.get(symbol, 0)
+
+    def open_notional(self, symbol: str) -> float:
+        return self.notional.get(symbol, 0.0)
+
+    def total_exposure(self) -> float:
+        return self.exposure
+
+    def position_value(self, symbol: str) -> float:
+        """Open position of `symbol` marked at its last known price."""
+        return self.market_value.get(symbol, 0.0)
+
+    def reserved_exposure(self) -> Dict[str, float]:
+        """Signed notional of the orders in flight per symbol (buys positive)."""
+        out: Dict[str, float] = {}
+        with self._lock:
+            for r in self.reservations.values():
+                out[r.symbol] = out.get(r.symbol, 0.0) + (r.notional if r.side == 'BUY' else -r.notional)
+        return out
+
+    def realized_today(self) -> float:
+        """Realized PnL booked to the current trading day."""
+        return self.daily.realized()
+
+    def fills_today(self) -> int:
+        """Fills booked to the current trading day."""
+        return self.daily.fills()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'positions': {s: q for s, q in self.positions.items() if q},
+                'open_notional': {s: round(n, 6) for s, n in self.notional.items() if n},
+                'market_value': {s: round(v, 6) for s, v in self.market_value.items() if v},
+                'marks': {s: p for s, p in self.marks.items() if self.positions.get(s)},
+                'total_exposure': round(self.exposure, 6),
+                'realized_today': self.realized_today(),
+                'fills_today': self.fills_today(),
+                'reserved': {
+                    'buys': dict(self.reserved_buys),
+                    'sells': dict(self.reserved_sells),
+                    'notional': round(self.reserved_notional, 6),
+                },
+                'last_trade_id': self.last_id,
+            }
+
+
+def _row_key(t) -> tuple:
+    return (t.id, t.symbol, t.side, int(t.qty), fill_price(t), t.status)
+
+
+# singleton
+position_ledger = PositionLedger()
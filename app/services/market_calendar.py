@@ -0,0 +1,231 @@
+"""
+Market Calendar
+NYSE regular sessions precomputed for a range of years: holidays (with the
+exchange's weekend observance rules), early 13:00 closes and one-off
+closures. Session open/close instants are kept as sorted epoch-second
+arrays, so "is the market open", "when does the current bar close" and
+"which trading day is this" are bisections rather than timezone arithmetic
+on every call.
+
+Shared by RTH order gating, bar keys for validation/scan caches, the
+validator's data freshness check and the daily PnL rollover.
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+
+import pytz
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# Unscheduled full-day closures (national days of mourning etc.)
+SPECIAL_CLOSURES = {
+    date(2018, 12, 5): 'Day of mourning (G. H. W. Bush)',
+    date(2025, 1, 9): 'Day of mourning (J. Carter)',
+}
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th `weekday` (Mon=0) of the month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = (date(year, month + 1, 1) if month < 12 else date(year + 1, 1, 1)) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d: date) -> date:
+    """Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def nyse_holidays(year: int) -> Dict[date, str]:
+    holidays = {}
+    new_year = date(year, 1, 1)
+    # A Saturday New Year's Day is not made up on the Friday before
+    if new_year.weekday() != 5:
+        holidays[_observed(new_year)] = "New Year's Day"
+    holidays[_nth_weekday(year, 1, 0, 3)] = 'Martin Luther King Jr. Day'
+    holidays[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    holidays[_easter(year) - timedelta(days=2)] = 'Good Friday'
+    holidays[_nth_weekday(year, 5, 0, -1)] = 'Memorial Day'
+    if year >= 2022:
+        holidays[_observed(date(year, 6, 19))] = 'Juneteenth'
+    holidays[_observed(date(year, 7, 4))] = 'Independence Day'
+    holidays[_nth_weekday(year, 9, 0, 1)] = 'Labor Day'
+    holidays[_nth_weekday(year, 11, 3, 4)] = 'Thanksgiving Day'
+    holidays[_observed(date(year, 12, 25))] = 'Christmas Day'
+    holidays.update({d: name for d, name in SPECIAL_CLOSURES.items() if d.year == year})
+    return holidays
+
+
+def nyse_early_closes(year: int) -> Set[date]:
+    early = set()
+    # July 3rd when Independence Day falls Tuesday-Friday
+    if date(year, 7, 4).weekday() in (1, 2, 3, 4):
+        early.add(date(year, 7, 3))
+    early.add(_nth_weekday(year, 11, 3, 4) + timedelta(days=1))
+    # Christmas Eve Monday-Thursday
+    if date(year, 12, 24).weekday() <= 3:
+        early.add(date(year, 12, 24))
+    return early
+
+
+class MarketCalendar:
+    """Precomputed regular sessions for [start_year, end_year]."""
+
+    def __init__(self, start_year: int = None, end_year: int = None, tz: str = None):
+        this_year = datetime.now(timezone.utc).year
+        self.start_year = start_year or this_year - settings.CALENDAR_YEARS_BACK
+        self.end_year = end_year or this_year + settings.CALENDAR_YEARS_AHEAD
+        self.tz = pytz.timezone(tz or settings.EXCHANGE_TZ)
+
+        self.holidays: Dict[date, str] = {}
+        self.early_closes: Set[date] = set()
+        self.days: List[date] = []
+        self.opens: List[int] = []
+        self.closes: List[int] = []
+        self._day_ordinals: List[int] = []
+        self._build()
+
+    def _build(self) -> None:
+        for year in range(self.start_year, self.end_year + 1):
+            self.holidays.update(nyse_holidays(year))
+            self.early_closes |= nyse_early_closes(year)
+
+        d = date(self.start_year, 1, 1)
+        end = date(self.end_year, 12, 31)
+        while d <= end:
+            if d.weekday() < 5 and d not in self.holidays:
+                close = EARLY_CLOSE if d in self.early_closes else REGULAR_CLOSE
+                self.days.append(d)
+                self.opens.append(self._instant(d, REGULAR_OPEN))
+                self.closes.append(self._instant(d, close))
+            d += timedelta(days=1)
+        self._day_ordinals = [d.toordinal() for d in self.days]
+        logger.info(f"Market calendar: {len(self.days)} sessions {self.start_year}-{self.end_year}")
+
+    def _instant(self, d: date, t: time) -> int:
+        return int(self.tz.localize(datetime.combine(d, t)).timestamp())
+
+    @staticmethod
+    def _epoch(ts) -> int:
+        if ts is None:
+            return int(datetime.now(timezone.utc).timestamp())
+        if isinstance(ts, (int, float)):
+            return int(ts)
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return int(ts.timestamp())
+
+    def _in_range(self, t: int) -> bool:
+        return bool(self.opens) and self.opens[0] - 7 * 86400 <= t <= self.closes[-1] + 7 * 86400
+
+    # ---- sessions ----------------------------------------------------------
+
+    def session(self, ts=None) -> Optional[Tuple[int, int]]:
+        """(open, close) epoch seconds of the session in progress at `ts`, if any."""
+        t = self._epoch(ts)
+        i = bisect_right(self.opens, t) - 1
+        if i >= 0 and t < self.closes[i]:
+            return self.opens[i], self.closes[i]
+        return None
+
+    def is_open(self, ts=None) -> bool:
+        """True during a regular session (holidays and early closes respected)."""
+        return self.session(ts) is not None
+
+    def is_session_day(self, d: date) -> bool:
+        i = bisect_right(self._day_ordinals, d.toordinal()) - 1
+        return i >= 0 and self._day_ordinals[i] == d.toordinal()
+
+    def next_session_day(self, d: date) -> date:
+        """`d` if it is a trading day, else the next one."""
+        i = bisect_right(self._day_ordinals, d.toordinal() - 1)
+        return self.days[i] if i < len(self.days) else d
+
+    def market_time(self, ts=None) -> int:
+        """`ts` if the market is open, otherwise the close of the last session before it."""
+        t = self._epoch(ts)
+        i = bisect_right(self.opens, t) - 1
+        if i < 0 or t < self.closes[i]:
+            return t
+        return self.closes[i]
+
+    # ---- bars --------------------------------------------------------------
+
+    def bar_open(self, ts=None, minutes: int = 15) -> int:
+        """
+        Open (epoch seconds) of the session-aligned bar in progress at `ts`.
+        Outside a session this is the last bar of the previous session, so
+        keys derived from it stay constant overnight and over weekends.
+        """
+        t = self._epoch(ts)
+        step = minutes * 60
+        i = bisect_right(self.opens, t) - 1
+        if i < 0 or not self._in_range(t):
+            offset = (REGULAR_OPEN.hour * 3600 + REGULAR_OPEN.minute * 60) % step
+            return t - (t - offset) % step
+        if t >= self.closes[i]:
+            t = self.closes[i] - 1
+        return self.opens[i] + (t - self.opens[i]) // step * step
+
+    def next_bar_close(self, ts=None, minutes: int = 15) -> int:
+        """Close (epoch seconds) of the next session-aligned bar to complete after `ts`."""
+        t = self._epoch(ts)
+        step = minutes * 60
+        if not self._in_range(t):
+            return t - t % step + step
+        i = bisect_right(self.opens, t) - 1
+        if i < 0 or t >= self.closes[i]:
+            i += 1
+            if i >= len(self.opens):
+                return t - t % step + step
+            return min(self.opens[i] + step, self.closes[i])
+        return min(self.opens[i] + ((t - self.opens[i]) // step + 1) * step, self.closes[i])
+
+    # ---- trading days ------------------------------------------------------
+
+    def trading_day(self, ts=None, start: str = None) -> date:
+        """
+        Trading day a timestamp belongs to for daily accounting. A day starts
+        at `start` (HH:MM, exchange time; default TRADING_DAY_START) and is
+        labelled by the date it ends on; fills on a non-trading day count
+        toward the next session. Naive timestamps are taken as UTC.
+        """
+        hours, mins = (int(x) for x in (start or settings.TRADING_DAY_START).split(':'))
+        shift = timedelta(hours=hours, minutes=mins)
+        shift = timedelta(days=1) - shift if shift else timedelta(0)
+        local = datetime.fromtimestamp(self._epoch(ts), self.tz)
+        return self.next_session_day((local + shift).date())
+
+
+# singleton
+market_calendar = MarketCalendar()
@@ -0,0 +1,377 @@
+"""
+Real-time Market Data
+Optional streaming bar source for signal validation, replacing Yahoo polling
+for symbols that have a live subscription.
+
+Small bars (IBKR 5-second real-time bars, or rows replayed from a file) are
+aggregated in memory into 15m bars aligned to the exchange session. The
+validator reads the aggregated series, including the still-forming bar,
+straight from memory; 1h bars are derived from it with resample_bars().
+Completed 15m bars are also appended to the local bar store, and every
+incoming close is passed to the registered price listeners.
+
+Sources (MARKET_DATA_SOURCE):
+    yahoo   no streaming; validation keeps polling through the bar store (default)
+    ibkr    IBKRBarFeed over a persistent ib_insync connection
+    replay  ReplayBarFeed emitting bars from MARKET_DATA_REPLAY_FILE
+"""
+
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Iterable, Callable, List
+import asyncio
+import csv
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from app.services.bar_store import COLUMNS, bar_store, period_to_timedelta
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# History seeded from the bar store when a symbol is subscribed
+SEED_PERIOD = '30d'
+
+# Called with (symbol, price) for every small bar received
+_price_listeners: List[Callable[[str, float], None]] = []
+
+
+def add_price_listener(fn: Callable[[str, float], None]) -> None:
+    if fn not in _price_listeners:
+        _price_listeners.append(fn)
+
+
+def remove_price_listener(fn: Callable[[str, float], None]) -> None:
+    if fn in _price_listeners:
+        _price_listeners.remove(fn)
+
+
+def _publish_price(symbol: str, price: float) -> None:
+    for fn in list(_price_listeners):
+        try:
+            fn(symbol, price)
+        except Exception:
+            logger.exception(f"Price listener failed for {symbol}")
+
+
+class BarAggregator:
+    """
+    Builds `minutes`-wide OHLCV bars from smaller bars, per symbol.
+    Bins start on multiples of `minutes` since the epoch, which for 15m bars
+    coincides with the 09:30 ET session open.
+    """
+
+    def __init__(self, minutes: int = 15, max_bars: int = 2000, persist: bool = True):
+        self.minutes = minutes
+        self.max_bars = max_bars
+        self.persist = persist
+        self._lock = threading.Lock()
+        # symbol -> deque of completed bars (ts_ns, open, high, low, close, volume)
+        self._bars: Dict[str, deque] = {}
+        # symbol -> still-forming bar as a list [ts_ns, open, high, low, close, volume]
+        self._partial: Dict[str, list] = {}
+        self._last_update: Dict[str, float] = {}
+
+    @property
+    def interval(self) -> str:
+        return f'{self.minutes}m'
+
+    def seed(self, symbol: str, df: Optional[pd.DataFrame]) -> None:
+        """Load history (e.g. from the bar store) ahead of the live bars."""
+        symbol = symbol.upper()
+        bars = deque(maxlen=self.max_bars)
+        if df is not None and not df.empty:
+            ts = pd.DatetimeIndex(df.index)
+            ts = (ts.tz_localize('UTC') if ts.tz is None else ts).as_unit('ns').asi8
+            values = df[list(COLUMNS)].to_numpy(dtype='float64')
+            bars.extend((int(t),) + tuple(row) for t, row in zip(ts, values))
+        with self._lock:
+            live = self._bars.get(symbol, ())
+            cutoff = bars[-1][0] if bars else None
+            bars.extend(b for b in live if cutoff is None or b[0] > cutoff)
+            self._bars[symbol] = bars
+
+    def add(self, symbol: str, ts, open_: float, high: float, low: float, close: float,
+            volume: float) -> Optional[tuple]:
+        """
+        Fold one small bar into the current bin. Returns the completed bar
+        (ts_ns, open, high, low, close, volume) when this bar opens a new bin.
+        """
+        symbol = symbol.upper()
+        ts = pd.Timestamp(ts)
+        ts_ns = int((ts.tz_localize('UTC') if ts.tzinfo is None else ts).value)
+        width = self.minutes * 60 * 1_000_000_000
+        bin_ns = ts_ns - ts_ns % width
+        completed = None
+        with self._lock:
+            self._last_update[symbol] = time.time()
+            cur = self._partial.get(symbol)
+            if cur is not None and bin_ns < cur[0]:
+                return None  # late bar for a bin already closed
+            if cur is None or bin_ns > cur[0]:
+                if cur is not None:
+                    completed = tuple(cur)
+                    self._bars.setdefault(symbol, deque(maxlen=self.max_bars)).append(completed)
+                self._partial[symbol] = [bin_ns, open_, high, low, close, volume]
+            else:
+                cur[2] = max(cur[2], high)
+                cur[3] = min(cur[3], low)
+                cur[4] = close
+                cur[5] += volume
+        _publish_price(symbol, float(close))
+        if completed is not None:
+            metrics.incr('market_data.bars_completed')
+            if self.persist:
+                try:
+                    bar_store.append(symbol, self.interval, _frame([completed]))
+                except Exception as e:
+                    logger.error(f"Failed to persist {self.interval} bar for {symbol}: {e}")
+        return completed
+
+    def frame(self, symbol: str, period: str = None, include_partial: bool = True) -> Optional[pd.DataFrame]:
+        """Aggregated bars (newest last) as an OHLCV frame in the exchange timezone."""
+        symbol = symbol.upper()
+        with self._lock:
+            rows = list(self._bars.get(symbol, ()))
+            partial = self._partial.get(symbol)
+            if include_partial and partial is not None:
+                rows.append(tuple(partial))
+        if not rows:
+            return None
+        df = _frame(rows)
+        if period:
+            df = df[df.index >= df.index[-1] - period_to_timedelta(period)]
+        return df
+
+    def has(self, symbol: str) -> bool:
+        """True once live bars have been received for `symbol` (seeded history alone is not live)."""
+        with self._lock:
+            return symbol.upper() in self._partial
+
+    def age_seconds(self, symbol: str) -> Optional[float]:
+        """Seconds since the last small bar for `symbol` was received."""
+        last = self._last_update.get(symbol.upper())
+        return None if last is None else time.time() - last
+
+
+def _frame(rows) -> pd.DataFrame:
+    arr = np.asarray(rows, dtype='float64')
+    index = pd.DatetimeIndex(pd.to_datetime(arr[:, 0].astype('int64'), utc=True)).tz_convert(settings.EXCHANGE_TZ)
+    return pd.DataFrame({col: arr[:, i + 1] for i, col in enumerate(COLUMNS)}, index=index)
+
+
+class BarFeed:
+    """Base class: owns an aggregator and the set of subscribed symbols."""
+
+    def __init__(self, aggregator: BarAggregator = None):
+        self.aggregator = aggregator or BarAggregator()
+        self.symbols = set()
+
+    def subscribe(self, symbol: str) -> None:
+        symbol = symbol.upper()
+        if symbol in self.symbols:
+            return
+        self.symbols.add(symbol)
+        self._subscribe(symbol)
+
+    def _subscribe(self, symbol: str) -> None:
+        pass
+
+    def frame(self, symbol: str, interval: str = '15m', period: str = None) -> Optional[pd.DataFrame]:
+        """Live bars for a subscribed symbol, or None if it is not streaming yet."""
+        if interval != self.aggregator.interval or not self.aggregator.has(symbol):
+            return None
+        return self.aggregator.frame(symbol, period)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class ReplayBarFeed(BarFeed):
+    """
+    Emits bars from a CSV file with columns
+    `symbol,time,open,high,low,close,volume` (time is ISO-8601 or epoch seconds).
+    speed=0 replays as fast as possible; speed=1 replays in real time.
+    """
+
+    def __init__(self, path: str, aggregator: BarAggregator = None, speed: float = 0.0):
+        super().__init__(aggregator or BarAggregator(persist=False))
+        self.path = path
+        self.speed = speed
+        self._thread = None
+        self._stop = threading.Event()
+
+    def rows(self) -> Iterable[Dict[str, Any]]:
+        with open(self.path, newline='') as f:
+            for row in csv.DictReader(f):
+                t = row['time']
+                ts = pd.Timestamp(float(t), unit='s', tz='UTC') if t.replace('.', '', 1).isdigit() else pd.Timestamp(t)
+                yield {
+                    'symbol': row['symbol'].upper(),
+                    'time': ts,
+                    'open': float(row['open']),
+                    'high': float(row['high']),
+                    'low': float(row['low']),
+                    'close': float(row['close']),
+                    'volume': float(row['volume']),
+                }
+
+    def run(self) -> int:
+        """Replay the whole file synchronously. Returns the number of bars emitted."""
+        emitted = 0
+        prev = None
+        for row in self.rows():
+            if self._stop.is_set():
+                break
+            if self.speed and prev is not None:
+                time.sleep(max(0.0, (row['time'] - prev).total_seconds() / self.speed))
+            prev = row['time']
+            self.symbols.add(row['symbol'])
+            self.aggregator.add(row['symbol'], row['time'], row['open'], row['high'], row['low'],
+                                row['close'], row['volume'])
+            emitted += 1
+        return emitted
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='replay-bar-feed', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class IBKRBarFeed(BarFeed):
+    """
+    5-second real-time bars from TWS / IB Gateway over one persistent
+    ib_insync connection, run on its own thread and event loop.
+    Subscribing seeds the symbol's history from the bar store (topped up once).
+    """
+
+    def __init__(self, host: str = None, port: int = None, client_id: int = None,
+                 aggregator: BarAggregator = None, use_rth: bool = False):
+        super().__init__(aggregator)
+        self.host = host or settings.IBKR_HOST
+        self.port = port or settings.IBKR_PORT
+        self.client_id = client_id or settings.MARKET_DATA_CLIENT_ID
+        self.use_rth = use_rth
+        self._ib = None
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._subscriptions = {}
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='ibkr-bar-feed', daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout=10):
+            logger.warning("IBKR bar feed did not connect within 10s")
+
+    def _run(self) -> None:
+        from ib_insync import IB
+
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ib = IB()
+        try:
+            self._ib.connect(self.host, self.port, clientId=self.client_id)
+        except Exception as e:
+            logger.error(f"IBKR bar feed connection failed: {e}")
+            self._ready.set()
+            return
+        logger.info("IBKR bar feed connected (clientId=%s)", self.client_id)
+        for symbol in list(self.symbols):
+            self._request(symbol)
+        self._ready.set()
+        self._ib.run()
+
+    def _subscribe(self, symbol: str) -> None:
+        # Seeding may download; keep it off the caller's (validation) thread
+        threading.Thread(target=self._seed_and_request, args=(symbol,), daemon=True).start()
+
+    def _seed_and_request(self, symbol: str) -> None:
+        # Seed history first so the aggregated series is usable immediately
+        try:
+            bar_store.top_up(symbol, '15m', SEED_PERIOD)
+        except Exception as e:
+            logger.error(f"Bar store top-up failed for {symbol}: {e}")
+        start = datetime.now(timezone.utc) - period_to_timedelta(SEED_PERIOD)
+        self.aggregator.seed(symbol, bar_store.read_frame(symbol, '15m', start=start))
+        if self._loop is not None and self._ib is not None and self._ib.isConnected():
+            self._loop.call_soon_threadsafe(self._request, symbol)
+
+    def _request(self, symbol: str) -> None:
+        from ib_insync import Stock
+
+        if symbol in self._subscriptions:
+            return
+        contract = Stock(symbol, 'SMART', 'USD')
+        bars = self._ib.reqRealTimeBars(contract, 5, 'TRADES', self.use_rth)
+
+        def on_update(bars, has_new_bar):
+            if has_new_bar:
+                b = bars[-1]
+                self.aggregator.add(symbol, b.time, b.open_, b.high, b.low, b.close, b.volume)
+
+        bars.updateEvent += on_update
+        self._subscriptions[symbol] = bars
+
+    def stop(self) -> None:
+        if self._ib is None or self._loop is None:
+            return
+
+        def _shutdown():
+            for bars in self._subscriptions.values():
+                self._ib.cancelRealTimeBars(bars)
+            self._subscriptions.clear()
+            self._ib.disconnect()
+            self._loop.stop()
+
+        self._loop.call_soon_threadsafe(_shutdown)
+
+
+_feed: Optional[BarFeed] = None
+
+
+def start_feed(source: str = None) -> Optional[BarFeed]:
+    """Create and start the configured feed; returns None for the polling source."""
+    global _feed
+    source = (source or settings.MARKET_DATA_SOURCE).lower()
+    if source == 'ibkr':
+        _feed = IBKRBarFeed()
+    elif source == 'replay':
+        _feed = ReplayBarFeed(settings.MARKET_DATA_REPLAY_FILE)
+    else:
+        _feed = None
+        return None
+    for symbol in settings.MARKET_DATA_SYMBOLS:
+        _feed.subscribe(symbol)
+    _feed.start()
+    return _feed
+
+
+def stop_feed() -> None:
+    global _feed
+    if _feed is not None:
+        _feed.stop()
+        _feed = None
+
+
+def set_feed(feed: Optional[BarFeed]) -> None:
+    """Install a feed directly (tests, scripts)."""
+    global _feed
+    _feed = feed
+
+
+def active_feed() -> Optional[BarFeed]:
+    return _feed
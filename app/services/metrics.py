@@ -0,0 +1,76 @@
+"""
+In-process metrics: named counters and latency reservoirs with percentiles.
+"""
+
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Any
+import threading
+import time
+
+
+class Metrics:
+    def __init__(self, reservoir_size: int = 2048):
+        self._lock = threading.Lock()
+        self._reservoir_size = reservoir_size
+        self.counters = defaultdict(int)
+        # name -> most recent observations in milliseconds
+        self.timings: Dict[str, deque] = {}
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def observe(self, name: str, value_ms: float) -> None:
+        with self._lock:
+            samples = self.timings.get(name)
+            if samples is None:
+                samples = self.timings[name] = deque(maxlen=self._reservoir_size)
+            samples.append(value_ms)
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def percentile(self, name: str, q: float):
+        with self._lock:
+            samples = sorted(self.timings.get(name, ()))
+        if not samples:
+            return None
+        return _pick(samples, q)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            timings = {k: sorted(v) for k, v in self.timings.items()}
+        out = {}
+        for name, samples in timings.items():
+            if not samples:
+                continue
+            out[name] = {
+                'count': len(samples),
+                'p50': round(_pick(samples, 50), 3),
+                'p95': round(_pick(samples, 95), 3),
+                'p99': round(_pick(samples, 99), 3),
+                'max': round(samples[-1], 3),
+            }
+        return {'counters': counters, 'timings': out}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+
+
+def _pick(sorted_samples, q: float) -> float:
+    """Nearest-rank percentile of an already sorted sample list."""
+    idx = min(len(sorted_samples) - 1, int(round(q / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[idx]
+
+
+# singleton
+metrics = Metrics()
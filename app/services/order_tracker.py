@@ -0,0 +1,170 @@
+"""
+Order Tracker
+Writes an open_orders row when an order is submitted and stamps filled_at
+when the broker reports it filled, cancelled or failed. Pending orders are
+mirrored in memory per (symbol, side) so the duplicate-order check is a set
+lookup rather than a query.
+
+Orders that never get a terminal status are expired after
+ORDER_PENDING_TTL_S by a background sweeper, which also closes their rows.
+On restart the pending set is rebuilt from rows still open in the table.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Tuple, Optional
+import logging
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.open_order import OpenOrder
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Broker statuses after which an order no longer blocks duplicates
+TERMINAL_PREFIXES = ('Filled', 'Cancelled', 'ApiCancelled', 'Inactive', 'ERROR', 'error')
+
+
+def is_terminal(status: str) -> bool:
+    return bool(status) and status.startswith(TERMINAL_PREFIXES)
+
+
+class OrderTracker:
+    """Pending orders by (symbol, side), backed by the open_orders table."""
+
+    def __init__(self, ttl_s: float = None):
+        self.ttl_s = settings.ORDER_PENDING_TTL_S if ttl_s is None else ttl_s
+        self._lock = threading.Lock()
+        # (symbol, side) -> {open_orders.id: submitted at (epoch seconds)}
+        self._pending: Dict[Tuple[str, str], Dict[int, float]] = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _add(self, key: Tuple[str, str], row_id: int, submitted: float) -> None:
+        self._pending.setdefault(key, {})[row_id] = submitted
+
+    def _discard(self, key: Tuple[str, str], row_id: int) -> None:
+        orders = self._pending.get(key)
+        if orders is not None:
+            orders.pop(row_id, None)
+            if not orders:
+                del self._pending[key]
+
+    # ---- lifecycle ---------------------------------------------------------
+
+    def submit(self, db: Session, symbol: str, side: str, qty: int, price: float) -> OpenOrder:
+        """Record an order about to be sent to the broker."""
+        order = OpenOrder(symbol=symbol.upper(), side=side.upper(), qty=qty, price=price,
+                          created_at=datetime.utcnow())
+        db.add(order)
+        db.commit()
+        with self._lock:
+            self._add((order.symbol, order.side), order.id, time.time())
+        metrics.incr('orders.submitted')
+        return order
+
+    def close(self, db: Session, order: OpenOrder, status: str, order_id: str = None) -> None:
+        """Stamp filled_at once the broker reports a terminal status."""
+        order.status = status[:120] if status else status
+        order.filled_at = datetime.utcnow()
+        if order_id:
+            order.order_id = order_id
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception(f"Failed to close open order {order.id}")
+        with self._lock:
+            self._discard((order.symbol, order.side), order.id)
+
+    def record_result(self, db: Session, order: OpenOrder, status: str) -> None:
+        """Close the order if `status` is terminal; otherwise leave it to the sweeper."""
+        if is_terminal(status):
+            self.close(db, order, status)
+        else:
+            logger.warning(f"Order {order.id} ({order.side} {order.symbol}) still pending: {status}")
+
+    # ---- reads -------------------------------------------------------------
+
+    def has_pending(self, symbol: str, side: str) -> bool:
+        """True if an order for (symbol, side) was submitted within the TTL and is still open."""
+        cutoff = time.time() - self.ttl_s
+        with self._lock:
+            orders = self._pending.get((symbol.upper(), side.upper()))
+            return bool(orders) and any(t > cutoff for t in orders.values())
+
+    def pending(self) -> Dict[str, int]:
+        with self._lock:
+            return {f"{s}:{d}": len(o) for (s, d), o in self._pending.items()}
+
+    # ---- restart / expiry --------------------------------------------------
+
+    def rebuild(self, db: Session) -> int:
+        """Reload the pending set from rows with no filled_at."""
+        rows = db.query(OpenOrder).filter(OpenOrder.filled_at.is_(None)).all()
+        pending: Dict[Tuple[str, str], Dict[int, float]] = {}
+        for row in rows:
+            created = row.created_at or datetime.utcnow()
+            submitted = time.time() - (datetime.utcnow() - created).total_seconds()
+            pending.setdefault((row.symbol, row.side), {})[row.id] = submitted
+        with self._lock:
+            self._pending = pending
+        logger.info(f"Order tracker rebuilt with {len(rows)} open orders")
+        return len(rows)
+
+    def sweep(self, db: Optional[Session] = None) -> int:
+        """Expire pending orders older than the TTL, in memory and in the table."""
+        cutoff = time.time() - self.ttl_s
+        with self._lock:
+            stale = [(key, row_id) for key, orders in self._pending.items()
+                     for row_id, t in orders.items() if t <= cutoff]
+            for key, row_id in stale:
+                self._discard(key, row_id)
+
+        own = db is None
+        db = db or SessionLocal()
+        try:
+            expired = db.query(OpenOrder).filter(
+                OpenOrder.filled_at.is_(None),
+                OpenOrder.created_at <= datetime.utcnow() - timedelta(seconds=self.ttl_s),
+            ).update({OpenOrder.filled_at: datetime.utcnow(), OpenOrder.status: 'expired'},
+                     synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Open order sweep failed")
+            expired = 0
+        finally:
+            if own:
+                db.close()
+        if stale or expired:
+            metrics.incr('orders.expired', max(len(stale), expired))
+            logger.warning(f"Expired {max(len(stale), expired)} stale open orders")
+        return max(len(stale), expired)
+
+    def start(self) -> None:
+        """Run sweep() every ORDER_SWEEP_S in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='order-sweeper', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.ORDER_SWEEP_S):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Order sweeper failed")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+
+# singleton
+order_tracker = OrderTracker()
@@ -0,0 +1,156 @@
+"""
+Parallel Threshold Sweep
+Runs the vectorized validator rules over a grid or random sample of
+thresholds across a process pool and ranks configurations by hit rate and PnL.
+
+Indicators do not depend on thresholds, so they are computed once in the
+parent and published to the workers through a single shared-memory block;
+each task only applies thresholds to the shared arrays.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional
+import itertools
+import logging
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+from app.services.backtest import compute_indicators, evaluate_rules, load_frames
+from app.services.validation_rules import DEFAULT_THRESHOLDS, decision_thresholds
+
+logger = logging.getLogger(__name__)
+
+# Candidate values per threshold. A direction's default space keeps only the
+# ones that can change its decision (see decision_thresholds): warning and
+# score-only thresholds, and the other direction's RSI band, would multiply the
+# grid without changing a single outcome.
+SWEEP_VALUES = {
+    'rsi_buy_low': [50.0, 55.0, 60.0],
+    'rsi_buy_high': [65.0, 70.0, 75.0],
+    'rsi_sell_low': [25.0, 30.0, 35.0],
+    'rsi_sell_high': [40.0, 45.0, 50.0],
+    'body_ratio': [0.5, 0.6, 0.7],
+    'required_passes': [3, 4, 5],
+}
+
+# Worker-side state, set once per process by _attach()
+_worker = {}
+
+
+def default_space(direction: str = 'BUY') -> Dict[str, list]:
+    """SWEEP_VALUES restricted to the thresholds that drive `direction`'s decision."""
+    used = decision_thresholds(direction)
+    return {k: v for k, v in SWEEP_VALUES.items() if k in used}
+
+
+def grid(space: Dict[str, list] = None, direction: str = 'BUY') -> List[Dict[str, Any]]:
+    """Every combination of the parameter space (default: default_space(direction))."""
+    space = space or default_space(direction)
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_search(space: Dict[str, list] = None, n: int = 200, seed: int = None,
+                  direction: str = 'BUY') -> List[Dict[str, Any]]:
+    """`n` distinct random combinations of the parameter space (default: default_space(direction))."""
+    space = space or default_space(direction)
+    rng = random.Random(seed)
+    total = 1
+    for values in space.values():
+        total *= len(values)
+    seen = set()
+    configs = []
+    while len(configs) < min(n, total):
+        cfg = tuple(rng.choice(values) for values in space.values())
+        if cfg not in seen:
+            seen.add(cfg)
+            configs.append(dict(zip(space, cfg)))
+    return configs
+
+
+def score_config(ind: Dict[str, np.ndarray], direction: str, params: Dict[str, Any],
+                 hold_bars: int = 4) -> Dict[str, Any]:
+    """
+    Evaluate one threshold set. PnL is one unit per approval held for
+    `hold_bars`; once every position is closed this equals the FIFO realized
+    total, without replaying lots for every configuration.
+    """
+    res = evaluate_rules(ind, direction, params)
+    close = ind['close']
+    entries = np.flatnonzero(res['decision'])
+    entries = entries[entries + hold_bars < len(close)]
+    moves = close[entries + hold_bars] - close[entries]
+    if direction.upper() == 'SELL':
+        moves = -moves
+    trades = int(len(entries))
+    return {
+        'params': params,
+        'approved': int(res['decision'].sum()),
+        'trades': trades,
+        'hit_rate': float((moves > 0).mean()) if trades else None,
+        'pnl': round(float(moves.sum()), 6),
+        'spike_warnings': int((res['decision'] & res['spike_warning']).sum()),
+    }
+
+
+def _attach(shm_name: str, shape: tuple, keys: list, direction: str, hold_bars: int) -> None:
+    """Process-pool initializer: map the shared indicator block once per worker."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray(shape, dtype='float64', buffer=shm.buf)
+    _worker['shm'] = shm  # keep the mapping alive for the life of the worker
+    _worker['ind'] = {k: block[i] for i, k in enumerate(keys)}
+    _worker['direction'] = direction
+    _worker['hold_bars'] = hold_bars
+
+
+def _run(params: Dict[str, Any]) -> Dict[str, Any]:
+    return score_config(_worker['ind'], _worker['direction'], params, _worker['hold_bars'])
+
+
+def run_sweep(df_15m: pd.DataFrame, df_1h: Optional[pd.DataFrame], direction: str = 'BUY',
+              configs: List[Dict[str, Any]] = None, workers: int = None, hold_bars: int = 4,
+              min_trades: int = 1, rank_by: str = 'pnl') -> List[Dict[str, Any]]:
+    """
+    Score every configuration in parallel and return them ranked best first.
+    rank_by: 'pnl' (hit rate breaks ties) or 'hit_rate' (PnL breaks ties).
+    workers=0 evaluates in-process.
+    """
+    configs = configs if configs is not None else grid(direction=direction)
+    configs = [{**DEFAULT_THRESHOLDS, **c} for c in configs]
+    ind = compute_indicators(df_15m, df_1h)
+    keys = list(ind)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 0:
+        results = [score_config(ind, direction, c, hold_bars) for c in configs]
+    else:
+        block = np.stack([np.asarray(ind[k], dtype='float64') for k in keys])
+        shm = shared_memory.SharedMemory(create=True, size=block.nbytes)
+        try:
+            np.ndarray(block.shape, dtype='float64', buffer=shm.buf)[:] = block
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=(shm.name, block.shape, keys, direction, hold_bars)) as pool:
+                chunk = max(1, len(configs) // (workers * 4))
+                results = list(pool.map(_run, configs, chunksize=chunk))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    results = [r for r in results if r['trades'] >= min_trades]
+    if rank_by == 'hit_rate':
+        key = lambda r: (r['hit_rate'] or 0.0, r['pnl'])
+    else:
+        key = lambda r: (r['pnl'], r['hit_rate'] or 0.0)
+    results.sort(key=key, reverse=True)
+    return results
+
+
+def sweep_symbol(symbol: str, direction: str = 'BUY', start=None, end=None, **kwargs) -> List[Dict[str, Any]]:
+    """Run a sweep on bars from the local bar store."""
+    df_15m, df_1h = load_frames(symbol, start, end)
+    return run_sweep(df_15m, df_1h, direction, **kwargs)
@@ -1,186 +1,319 @@
+"""
+PnL
+FIFO lot matching for live PnL. One pass over the filled trades, in trade id
+order, feeds a LotBook and produces every view the dashboard needs: per
+ticker (position, realized, unrealized at the last fill price), per trade
+(realized, plus unrealized of the lots it opened) and realized per UTC day.
+Long and short lots are handled alike, and every view prices a fill at its
+executed price, falling back to the alert price.
+
+The pass starts from the latest lot-book checkpoint (pnl_checkpoints) rather
+than from inception and replays only the trades after it. Checkpoints are
+written every PNL_CHECKPOINT_FILLS fills and on the first fill of a new day,
+and carry a checksum of the filled trades they cover (count and sum of
+qty * fill price) so a rewrite anywhere under them invalidates them. The
+position ledger restores its lot book from the same checkpoints.
+Per-trade realized PnL is only known for trades replayed, so callers that
+need it for older trades ask for a checkpoint from before them.
+"""
+
 from collections import deque, defaultdict
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import json
+import logging
+from app.config import settings
+from app.models.pnl_checkpoint import PnlCheckpoint
 from app.models.trade import Trade
+from app.services.daily_pnl import KEEP_DAYS, trading_day
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import datetime, timezone, date
-
+from datetime import timezone, date, timedelta
 
-def compute_pnl_by_ticker(db: Session) -> Dict[str, Dict[str, Any]]:
-    """Compute realized, unrealized and cumulative PnL per ticker using FIFO matching.
-    Assumes `Trade` rows with status starting with 'Filled' represent executed trades.
-    Returns dict keyed by symbol with fields: position, realized, unrealized, cumulative, last_price
-    """
-    # Query filled trades ordered by timestamp (status starts with 'Filled')
-    trades = db.query(Trade).filter(Trade.status.like('Filled%')).order_by(Trade.timestamp).all()
+logger = logging.getLogger(__name__)
 
-    results = {}
-    # For each symbol, maintain a deque of (qty, price) for buys; positive qty for long buys
-    books = defaultdict(deque)
-    # track last price for unrealized value reference
-    last_price = {}
-    realized = defaultdict(float)
 
-    for t in trades:
-        sym = t.symbol
-        side = t.side.upper()
-        qty = int(t.qty)
-        price = float(t.price)
-        last_price[sym] = price
-
-        if side == 'BUY':
-            # add to book
-            books[sym].append({'qty': qty, 'price': price})
-        elif side == 'SELL':
-            # match against buys (FIFO). If no buys, treat as short sell (negative book)
-            remaining = qty
-            while remaining > 0 and books[sym]:
-                lot = books[sym][0]
-                take = min(lot['qty'], remaining)
-                realized[sym] += (price - lot['price']) * take
-                lot['qty'] -= take
-                remaining -= take
-                if lot['qty'] == 0:
-                    books[sym].popleft()
-            # if still remaining (shorting), represent as negative position via a negative lot
-            if remaining > 0:
-                # push negative lot (short)
-                books[sym].appendleft({'qty': -remaining, 'price': price})
-
-    # compute positions and unrealized P/L
-    # Note: last_price and lot prices are all IBKR execution prices (executed_price field)
-    for sym, book in books.items():
-        pos = sum(l['qty'] for l in book)
-        lp = last_price.get(sym, None)  # Last execution price from IBKR
-        unreal = 0.0
-        if lp is not None:
-            for l in book:
-                # Unrealized P/L = (Last exec price - Entry exec price) × Qty
-                unreal += (lp - l['price']) * l['qty']
-        results[sym] = {
-            'symbol': sym,
-            'position': pos,
-            'realized': round(realized.get(sym, 0.0), 6),
-            'unrealized': round(unreal, 6),
-            'cumulative': round(realized.get(sym, 0.0) + unreal, 6),
-            'last_price': lp,  # IBKR execution price
-        }
-    return results
+def fill_price(trade) -> float:
+    """Executed price if IBKR reported one, otherwise the alert price."""
+    return float(trade.executed_price) if trade.executed_price is not None else float(trade.price)
 
 
-def compute_daily_realized_pnl(db: Session, day: date = None) -> float:
-    """Compute the net realized PnL for trades realized on a given day (UTC dates).
-    Implementation: go through filled trades up to the day and compute realized PnL for fills that happened on that day.
+class LotBook:
+    """FIFO lot books per symbol. Long lots carry positive qty, short lots negative.
+    Each lot remembers the trade id that opened it so unrealized PnL can be attributed back.
     """
-    if day is None:
-        day = datetime.now(timezone.utc).date()
-
-    # We'll compute realized PnL by simulating FIFO up to each trade and summing PnL for sell trades whose timestamp date equals the day
-    trades = db.query(Trade).filter(Trade.status.like('Filled%')).order_by(Trade.timestamp).all()
-
-    books = defaultdict(deque)
-    daily_realized = 0.0
 
-    for t in trades:
-        sym = t.symbol
-        side = t.side.upper()
-        qty = int(t.qty)
-        # Use executed_price if available, otherwise fall back to webhook price
-        price = float(t.executed_price) if t.executed_price is not None else float(t.price)
-        ts_date = t.timestamp.date()
-
-        if side == 'BUY':
-            books[sym].append({'qty': qty, 'price': price})
-        else:  # SELL
-            remaining = qty
-            while remaining > 0 and books[sym]:
-                lot = books[sym][0]
-                take = min(lot['qty'], remaining)
-                pnl = (price - lot['price']) * take
-                # If this sell happened on the day, count its pnl towards daily realized
-                if ts_date == day:
-                    daily_realized += pnl
-                lot['qty'] -= take
-                remaining -= take
-                if lot['qty'] == 0:
-                    books[sym].popleft()
-            # remaining negative means we went short; for simplicity, consider remaining realized when later buys match
+    def __init__(self):
+        # symbol -> deque of {'qty': int, 'price': float, 'trade_id': int}
+        self.books = defaultdict(deque)
+        self.last_price = {}
 
-    return round(daily_realized, 6)
+    def fill(self, symbol: str, side: str, qty: int, price: float, trade_id=None) -> float:
+        """Apply an executed fill and return the PnL it realizes."""
+        book = self.books[symbol]
+        self.last_price[symbol] = price
+        realized = 0.0
+        remaining = qty
 
-
-def compute_trade_pnls(db: Session):
-    """Compute per-trade realized and unrealized PnL (net) for trades with status starting with 'Filled'.
-    Returns a dict mapping trade_id -> {'realized': float, 'unrealized': float, 'net': float}
-    Uses FIFO matching and attributes unrealized PnL for remaining open lots to their originating trade id.
-    """
-    trades = db.query(Trade).filter(Trade.status.like('Filled%')).order_by(Trade.timestamp).all()
-
-    # For each symbol, maintain deque of lots: {'qty': int, 'price': float, 'trade_id': int}
-    from collections import deque, defaultdict
-
-    books = defaultdict(deque)
-    last_price = {}
-    per_trade = defaultdict(lambda: {'realized': 0.0, 'unrealized': 0.0})
-
-    for t in trades:
-        sym = t.symbol
-        side = t.side.upper()
-        qty = int(t.qty)
-        # Use executed_price if available, otherwise fall back to webhook price
-        price = float(t.executed_price) if t.executed_price is not None else float(t.price)
-        last_price[sym] = price
-
-        if side == 'BUY':
-            remaining = qty
+        if side.upper() == 'BUY':
             # If there are short lots (qty negative) realize against them
-            while remaining > 0 and books[sym] and books[sym][0]['qty'] < 0:
-                lot = books[sym][0]
+            while remaining > 0 and book and book[0]['qty'] < 0:
+                lot = book[0]
                 take = min(remaining, abs(lot['qty']))
                 # realized for covering short: short_entry_price - cover_price
-                realized_amt = (lot['price'] - price) * take
-                per_trade[t.id]['realized'] += round(realized_amt, 6)
+                realized += round((lot['price'] - price) * take, 6)
                 lot['qty'] += take  # move towards zero (since lot['qty'] negative)
                 remaining -= take
                 if lot['qty'] == 0:
-                    books[sym].popleft()
+                    book.popleft()
             # any remaining opens a long lot
             if remaining > 0:
-                books[sym].append({'qty': remaining, 'price': price, 'trade_id': t.id})
+                book.append({'qty': remaining, 'price': price, 'trade_id': trade_id})
 
-        elif side == 'SELL':
-            remaining = qty
+        elif side.upper() == 'SELL':
             # match against long lots
-            while remaining > 0 and books[sym] and books[sym][0]['qty'] > 0:
-                lot = books[sym][0]
+            while remaining > 0 and book and book[0]['qty'] > 0:
+                lot = book[0]
                 take = min(remaining, lot['qty'])
-                realized_amt = (price - lot['price']) * take
-                per_trade[t.id]['realized'] += round(realized_amt, 6)
+                realized += round((price - lot['price']) * take, 6)
                 lot['qty'] -= take
                 remaining -= take
                 if lot['qty'] == 0:
-                    books[sym].popleft()
+                    book.popleft()
             # any remaining creates a short lot
             if remaining > 0:
-                books[sym].appendleft({'qty': -remaining, 'price': price, 'trade_id': t.id})
-
-    # After processing all trades, attribute unrealized for remaining lots to their originating trade ids using last_price
-    for sym, book in books.items():
-        lp = last_price.get(sym, None)
-        if lp is None:
-            continue
-        for lot in book:
-            qty = lot['qty']
-            price = lot['price']
-            if qty > 0:
-                unreal = (lp - price) * qty
-            else:
-                unreal = (price - lp) * abs(qty)
-            per_trade[lot.get('trade_id')]['unrealized'] += round(unreal, 6)
-
-    # Consolidate
-    out = {}
-    for tid, vals in per_trade.items():
-        r = round(vals.get('realized', 0.0), 6)
-        u = round(vals.get('unrealized', 0.0), 6)
-        out[tid] = {'realized': r, 'unrealized': u, 'net': round(r + u, 6)}
-    return out
\ No newline at end of file
+                book.appendleft({'qty': -remaining, 'price': price, 'trade_id': trade_id})
+
+        return realized
+
+    def position(self, symbol: str) -> int:
+        return sum(lot['qty'] for lot in self.books.get(symbol, ()))
+
+    def lot_unrealized(self, lot: dict, mark: float) -> float:
+        if lot['qty'] > 0:
+            return (mark - lot['price']) * lot['qty']
+        return (lot['price'] - mark) * abs(lot['qty'])
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'books': {sym: [[lot['qty'], lot['price'], lot.get('trade_id')] for lot in book]
+                      for sym, book in self.books.items()},
+            'last_price': dict(self.last_price),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'LotBook':
+        """Lot book as saved by to_state() (e.g. in a checkpoint)."""
+        book = cls()
+        for sym, lots in state['books'].items():
+            book.books[sym] = deque({'qty': q, 'price': p, 'trade_id': tid} for q, p, tid in lots)
+        book.last_price.update(state['last_price'])
+        return book
+
+
+class PnlReport:
+    """Ticker, per-trade and per-day PnL built from a single FIFO pass."""
+
+    def __init__(self):
+        self.book = LotBook()
+        self.realized = defaultdict(float)
+        self.trade_realized = {}
+        # trading day -> [realized, fills], as the position ledger books them
+        self.trading_days: Dict[date, list] = {}
+        # Trades up to start_id came from a checkpoint; last_id is the last trade applied
+        self.start_id = 0
+        self.last_id = 0
+        self.last_key = None
+        self.fills = 0
+
+    def apply(self, t) -> float:
+        """Apply one filled trade; returns the PnL it realizes."""
+        realized = self.book.fill(t.symbol, t.side, int(t.qty), fill_price(t), trade_id=t.id)
+        self.realized[t.symbol] += realized
+        self.trade_realized[t.id] = self.trade_realized.get(t.id, 0.0) + realized
+        tally = self.trading_days.setdefault(trading_day(t.timestamp), [0.0, 0])
+        tally[0] = round(tally[0] + realized, 6)
+        tally[1] += 1
+        self.last_id, self.last_key = t.id, trade_key(t)
+        self.fills += 1
+        return realized
+
+    def tickers(self) -> Dict[str, Dict[str, Any]]:
+        """Per symbol: position, realized, unrealized, cumulative and last (fill) price."""
+        results = {}
+        for sym, book in self.book.books.items():
+            lp = self.book.last_price.get(sym)
+            unreal = sum(self.book.lot_unrealized(lot, lp) for lot in book) if lp is not None else 0.0
+            realized = self.realized.get(sym, 0.0)
+            results[sym] = {
+                'symbol': sym,
+                'position': self.book.position(sym),
+                'realized': round(realized, 6),
+                'unrealized': round(unreal, 6),
+                'cumulative': round(realized + unreal, 6),
+                'last_price': lp,
+            }
+        return results
+
+    def trade_pnls(self) -> Dict[int, Dict[str, float]]:
+        """
+        trade_id -> {'realized', 'unrealized', 'net'}; open lots are attributed to
+        the trade that opened them. Realized PnL covers trades after start_id only.
+        """
+        unrealized = defaultdict(float)
+        for sym, book in self.book.books.items():
+            lp = self.book.last_price.get(sym)
+            if lp is None:
+                continue
+            for lot in book:
+                unrealized[lot.get('trade_id')] += round(self.book.lot_unrealized(lot, lp), 6)
+        out = {}
+        for tid in set(self.trade_realized) | set(unrealized):
+            r = round(self.trade_realized.get(tid, 0.0), 6)
+            u = round(unrealized.get(tid, 0.0), 6)
+            out[tid] = {'realized': r, 'unrealized': u, 'net': round(r + u, 6)}
+        return out
+
+    def daily_realized(self, day: date = None) -> float:
+        """
+        Realized PnL booked to trading `day` (default the current one), bucketed
+        like the daily loss check (see daily_pnl.trading_day).
+        """
+        return round(self.trading_days.get(day or trading_day(), [0.0, 0])[0], 6)
+
+    # ---- checkpoints -------------------------------------------------------
+
+    def to_state(self) -> Dict[str, Any]:
+        # Trading days kept in memory by the ledger's daily book
+        cutoff = max(self.trading_days) - timedelta(days=KEEP_DAYS) if self.trading_days else None
+        return {
+            **self.book.to_state(),
+            'realized': dict(self.realized),
+            'trading_days': {d.isoformat(): v for d, v in self.trading_days.items() if d >= cutoff},
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: PnlCheckpoint) -> 'PnlReport':
+        report = cls()
+        state = checkpoint.state_dict()
+        report.book = LotBook.from_state(state)
+        report.realized.update(state['realized'])
+        report.trading_days = {date.fromisoformat(d): list(v) for d, v in state.get('trading_days', {}).items()}
+        report.start_id = report.last_id = checkpoint.last_trade_id
+        report.last_key = checkpoint.last_trade_key
+        report.fills = checkpoint.fills or 0
+        return report
+
+
+def trade_key(t) -> str:
+    """Identity of a trade row as far as PnL is concerned."""
+    ts = t.timestamp
+    if ts is not None and ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    ts = ts.isoformat() if ts is not None else ''
+    return json.dumps([t.id, t.symbol, t.side, int(t.qty), fill_price(t), ts])
+
+
+def trades_checksum(db: Session, last_trade_id: int) -> str:
+    """Count and sum of qty * fill price of the filled trades up to `last_trade_id`."""
+    count, total = db.query(
+        func.count(Trade.id),
+        func.sum(Trade.qty * func.coalesce(Trade.executed_price, Trade.price)),
+    ).filter(Trade.id <= last_trade_id, Trade.status.like('Filled%')).one()
+    return f"{count}:{total or 0.0:.4f}"
+
+
+def load_checkpoint(db: Session, before_id: int = None) -> Optional[PnlReport]:
+    """
+    Report restored from the latest valid checkpoint (taken before trade
+    `before_id`, if given). Checkpoints whose last trade was deleted or
+    rewritten, or whose trades no longer match their checksum, are discarded
+    along with every later one.
+    """
+    query = db.query(PnlCheckpoint)
+    if before_id is not None:
+        query = query.filter(PnlCheckpoint.last_trade_id < before_id)
+    checkpoint = query.order_by(PnlCheckpoint.last_trade_id.desc()).first()
+    if checkpoint is None:
+        return None
+    last = db.query(Trade).filter(Trade.id == checkpoint.last_trade_id).first()
+    if last is None or trade_key(last) != checkpoint.last_trade_key \
+            or checkpoint.checksum != trades_checksum(db, checkpoint.last_trade_id):
+        logger.info("Trades changed under PnL checkpoint %s; discarding checkpoints", checkpoint.id)
+        db.query(PnlCheckpoint).filter(PnlCheckpoint.last_trade_id >= checkpoint.last_trade_id).delete()
+        db.commit()
+        return load_checkpoint(db, before_id)
+    return PnlReport.from_checkpoint(checkpoint)
+
+
+def compute_pnl(db: Session, since_trade_id: int = None) -> PnlReport:
+    """
+    Latest checkpoint plus every filled trade after it (one query, one pass).
+    With `since_trade_id`, start from a checkpoint before that trade so the
+    report has per-trade realized PnL for it and everything after.
+    """
+    report = None
+    try:
+        report = load_checkpoint(db, since_trade_id)
+    except Exception:
+        db.rollback()
+        logger.exception("Failed to load PnL checkpoint; replaying from inception")
+    report = report or PnlReport()
+    trades = db.query(Trade).filter(
+        Trade.id > report.last_id,
+        Trade.status.like('Filled%'),
+    ).order_by(Trade.id).all()
+    for t in trades:
+        report.apply(t)
+    return report
+
+
+def write_checkpoint(db: Session, report: PnlReport, reason: str) -> Optional[PnlCheckpoint]:
+    """Persist `report` as a checkpoint and prune old ones beyond PNL_CHECKPOINT_KEEP."""
+    if not report.last_id:
+        return None
+    checkpoint = PnlCheckpoint(last_trade_id=report.last_id, last_trade_key=report.last_key,
+                               checksum=trades_checksum(db, report.last_id),
+                               fills=report.fills, reason=reason, state=json.dumps(report.to_state()))
+    db.add(checkpoint)
+    db.flush()
+    stale = db.query(PnlCheckpoint.id).order_by(PnlCheckpoint.last_trade_id.desc()) \
+        .offset(settings.PNL_CHECKPOINT_KEEP).all()
+    if stale:
+        db.query(PnlCheckpoint).filter(PnlCheckpoint.id.in_([r.id for r in stale])) \
+            .delete(synchronize_session=False)
+    db.commit()
+    logger.info(f"PnL checkpoint after trade {report.last_id} ({reason}, {report.fills} fills)")
+    return checkpoint
+
+
+def maybe_checkpoint(db: Session, every: int = None) -> Optional[PnlCheckpoint]:
+    """
+    Write a checkpoint if PNL_CHECKPOINT_FILLS fills have been recorded since
+    the latest one, or if the latest one is from an earlier trading day and
+    there are fills after it. Call after recording a fill.
+    """
+    every = every or settings.PNL_CHECKPOINT_FILLS
+    latest = db.query(PnlCheckpoint).order_by(PnlCheckpoint.last_trade_id.desc()).first()
+    since = latest.last_trade_id if latest is not None else 0
+    pending = db.query(Trade.id).filter(Trade.id > since, Trade.status.like('Filled%')).limit(every).count()
+    if not pending:
+        return None
+    rollover = latest is not None and trading_day(latest.created_at) < trading_day()
+    if pending < every and not rollover:
+        return None
+    return write_checkpoint(db, compute_pnl(db), 'rollover' if rollover and pending < every else 'fills')
+
+
+def compute_pnl_by_ticker(db: Session) -> Dict[str, Dict[str, Any]]:
+    """Realized, unrealized and cumulative PnL per ticker (see PnlReport.tickers)."""
+    return compute_pnl(db).tickers()
+
+
+def compute_daily_realized_pnl(db: Session, day: date = None) -> float:
+    """Net realized PnL booked to a given trading day (default the current one)."""
+    return compute_pnl(db).daily_realized(day)
+
+
+def compute_trade_pnls(db: Session):
+    """Per-trade realized and unrealized PnL of every filled trade (replayed from inception)."""
+    return compute_pnl(db, since_trade_id=0).trade_pnls()
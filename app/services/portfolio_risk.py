@@ -0,0 +1,161 @@
+"""
+Portfolio Risk
+Value-at-Risk of the book from the covariance of 15m returns read out of
+the local bar store.
+
+Close series are cached per symbol and topped up with only the bars added
+since the last read, once per 15m bar. Covariance matrices (and the aligned
+return matrix for historical VaR) are cached per symbol set and recomputed
+only when a new bar has closed, so a risk check between bar closes is a
+couple of small matrix products.
+
+    parametric  z(confidence) * sqrt(w' S w) * sqrt(horizon)
+    historical  loss quantile of the per-bar portfolio PnL R @ w, * sqrt(horizon)
+
+where w holds signed dollar exposures and horizon is VAR_HORIZON_BARS bars.
+Symbols without enough stored bars are not left out: each adds a
+conservative proxy, its gross exposure at VAR_DEFAULT_BAR_VOL per-bar
+volatility, assumed perfectly correlated with the rest of the book
+(z * |w| * vol * sqrt(horizon), added to the estimate). So is the whole book
+when the symbols share too few bars for a covariance.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import reduce
+from statistics import NormalDist
+from typing import Dict, Optional, Tuple
+import logging
+import math
+import threading
+
+import numpy as np
+
+from app.config import settings
+from app.services.bar_store import bar_store
+from app.services.market_calendar import market_calendar
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = '15m'
+# Cached covariance matrices (one per distinct symbol set)
+MAX_COV_ENTRIES = 64
+
+
+class PortfolioRisk:
+    def __init__(self, lookback_bars: int = None, horizon_bars: int = None,
+                 confidence: float = None, method: str = None):
+        self.lookback_bars = lookback_bars or settings.VAR_LOOKBACK_BARS
+        self.horizon_bars = horizon_bars or settings.VAR_HORIZON_BARS
+        self.confidence = confidence or settings.VAR_CONFIDENCE
+        self.method = (method or settings.VAR_METHOD).lower()
+        self.default_vol = settings.VAR_DEFAULT_BAR_VOL
+        self._lock = threading.Lock()
+        # symbol -> (bar key, ts int64 ns, close float64)
+        self._closes: Dict[str, Tuple[int, np.ndarray, np.ndarray]] = {}
+        # symbols tuple -> (bar key, covariance, aligned returns)
+        self._cov: "OrderedDict[tuple, Tuple[int, np.ndarray, np.ndarray]]" = OrderedDict()
+
+    # ---- data --------------------------------------------------------------
+
+    def closes(self, symbol: str, bar: int = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Last lookback_bars+1 closes of `symbol`, refreshed at most once per bar."""
+        bar = bar if bar is not None else market_calendar.bar_open(minutes=15)
+        cached = self._closes.get(symbol)
+        if cached is not None and cached[0] == bar:
+            return cached[1], cached[2]
+
+        keep = self.lookback_bars + 1
+        if cached is not None and len(cached[1]):
+            # Only bars from the last cached one onwards (it may have been revised)
+            last = datetime.fromtimestamp(int(cached[1][-1]) / 1e9, timezone.utc)
+            cols = bar_store.read(symbol, INTERVAL, start=last)
+            ts, close = cached[1], cached[2]
+            if cols is not None and len(cols['ts']):
+                ts = np.concatenate([ts[:-1], np.asarray(cols['ts'], dtype='int64')])[-keep:]
+                close = np.concatenate([close[:-1], np.asarray(cols['close'], dtype='float64')])[-keep:]
+        else:
+            cols = bar_store.read(symbol, INTERVAL)
+            if cols is None or len(cols['ts']) < 2:
+                ts, close = np.empty(0, dtype='int64'), np.empty(0, dtype='float64')
+            else:
+                ts = np.array(cols['ts'][-keep:], dtype='int64')
+                close = np.array(cols['close'][-keep:], dtype='float64')
+        with self._lock:
+            self._closes[symbol] = (bar, ts, close)
+        return ts, close
+
+    def covariance(self, symbols: tuple) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(covariance, aligned log-return matrix) for `symbols`, cached per bar."""
+        bar = market_calendar.bar_open(minutes=15)
+        with self._lock:
+            cached = self._cov.get(symbols)
+            if cached is not None and cached[0] == bar:
+                self._cov.move_to_end(symbols)
+                return cached[1], cached[2]
+
+        series = [self.closes(s, bar) for s in symbols]
+        common = reduce(np.intersect1d, [ts for ts, _ in series])
+        if len(common) < 3:
+            return None
+        rets = np.empty((len(common) - 1, len(symbols)))
+        for j, (ts, close) in enumerate(series):
+            aligned = close[np.searchsorted(ts, common)]
+            rets[:, j] = np.diff(np.log(aligned))
+        cov = np.atleast_2d(np.cov(rets, rowvar=False))
+        metrics.incr('portfolio_risk.cov_refresh')
+        with self._lock:
+            self._cov[symbols] = (bar, cov, rets)
+            while len(self._cov) > MAX_COV_ENTRIES:
+                self._cov.popitem(last=False)
+        return cov, rets
+
+    # ---- VaR ---------------------------------------------------------------
+
+    def var(self, exposures: Dict[str, float], *others: Dict[str, float]):
+        """
+        VaR in dollars of each exposure map ({symbol: signed dollar exposure}),
+        all computed on the same covariance. Returns a float, or a tuple when
+        several maps are given.
+        """
+        maps = (exposures,) + others
+        symbols = tuple(sorted({s for m in maps for s, v in m.items() if v}))
+        usable = tuple(s for s in symbols if len(self.closes(s)[0]) >= 3)
+        est = self.covariance(usable) if usable else None
+        if est is None:
+            usable = ()
+        missing = [s for s in symbols if s not in usable]
+        if missing:
+            metrics.incr('portfolio_risk.missing_bars', len(missing))
+        out = []
+        for m in maps:
+            var = self._proxy_var(sum(abs(m.get(s, 0.0)) for s in missing))
+            if usable:
+                var += self._var(np.array([m.get(s, 0.0) for s in usable]), *est)
+            out.append(var)
+        return out[0] if len(out) == 1 else tuple(out)
+
+    def _proxy_var(self, gross: float) -> float:
+        """VaR of `gross` dollars with no usable history, at the default per-bar volatility."""
+        if not gross:
+            return 0.0
+        z = NormalDist().inv_cdf(self.confidence)
+        return z * gross * self.default_vol * math.sqrt(self.horizon_bars)
+
+    def _var(self, w: np.ndarray, cov: np.ndarray, rets: np.ndarray) -> float:
+        scale = math.sqrt(self.horizon_bars)
+        if self.method == 'historical':
+            pnl = rets @ w
+            return max(0.0, -float(np.quantile(pnl, 1 - self.confidence))) * scale
+        z = NormalDist().inv_cdf(self.confidence)
+        return z * math.sqrt(max(0.0, float(w @ cov @ w))) * scale
+
+    def clear(self) -> None:
+        with self._lock:
+            self._closes.clear()
+            self._cov.clear()
+
+
+# singleton
+portfolio_risk = PortfolioRisk()
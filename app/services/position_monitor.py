@@ -0,0 +1,258 @@
+"""
+Position Monitor
+Stop-loss / take-profit exits for open positions, driven by the price
+stream.
+
+Every open position gets a stop and a target, either derived from its
+average entry (EXIT_STOP_LOSS_PCT / EXIT_TAKE_PROFIT_PCT of the open lots'
+cost basis in the ledger) or set per symbol through the API. Levels are
+kept per symbol and rebuilt only when the ledger position changes, so a
+price tick is a dict lookup and two comparisons, independent of how many
+positions are open.
+
+When a level is crossed the exit (SELL a long, BUY back a short, full
+position) is reserved against the ledger and handed to the exit handler,
+which places it through the same broker path as webhook orders. A symbol
+with an exit in flight is not re-triggered until the exit is reported done
+or ORDER_PENDING_TTL_S passes.
+
+Prices come from the market data listeners when a streaming or replay feed
+runs; otherwise open positions are polled from the bar store every
+EXIT_POLL_S.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+import logging
+import threading
+import time
+
+from app.config import settings
+from app.services import market_data
+from app.services.bar_store import bar_store
+from app.services.ledger import position_ledger
+from app.services.metrics import metrics
+from app.services.order_tracker import order_tracker
+
+logger = logging.getLogger(__name__)
+
+# History fetched when polling a symbol's latest price
+POLL_PERIOD = '1d'
+
+
+class ExitLevels:
+    """Stop and target of one open position; either may be None (no exit on that side)."""
+
+    __slots__ = ('symbol', 'position', 'entry', 'stop', 'target', 'manual')
+
+    def __init__(self, symbol: str, position: int, entry: float, stop: Optional[float],
+                 target: Optional[float], manual: bool = False):
+        self.symbol = symbol
+        self.position = position
+        self.entry = entry
+        self.stop = stop
+        self.target = target
+        self.manual = manual
+
+    @property
+    def active(self) -> bool:
+        return self.stop is not None or self.target is not None
+
+    def crossed(self, price: float) -> Optional[str]:
+        """'stop_loss' or 'take_profit' if `price` is through a level."""
+        if self.position > 0:
+            if self.stop is not None and price <= self.stop:
+                return 'stop_loss'
+            if self.target is not None and price >= self.target:
+                return 'take_profit'
+        elif self.position < 0:
+            if self.stop is not None and price >= self.stop:
+                return 'stop_loss'
+            if self.target is not None and price <= self.target:
+                return 'take_profit'
+        return None
+
+    def to_dict(self) -> Dict:
+        return {'symbol': self.symbol, 'position': self.position, 'entry': round(self.entry, 6),
+                'stop': self.stop, 'target': self.target, 'manual': self.manual}
+
+
+class PositionMonitor:
+    """Per-symbol exit levels checked on every price update."""
+
+    def __init__(self, ledger=None, stop_pct: float = None, target_pct: float = None,
+                 on_exit: Callable[[str, str, int, float, str], None] = None, orders=None):
+        self.ledger = ledger or position_ledger
+        self.orders = orders or order_tracker
+        self.stop_pct = settings.EXIT_STOP_LOSS_PCT if stop_pct is None else stop_pct
+        self.target_pct = settings.EXIT_TAKE_PROFIT_PCT if target_pct is None else target_pct
+        self.on_exit = on_exit
+        self._lock = threading.Lock()
+        self.levels: Dict[str, ExitLevels] = {}
+        # symbol -> (stop, target) set through the API; kept until the position closes
+        self.overrides: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+        # symbol -> (triggered at (monotonic), reservation) for exits in flight
+        self._exiting: Dict[str, tuple] = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ---- levels ------------------------------------------------------------
+
+    def _levels_for(self, symbol: str, position: int) -> Optional[ExitLevels]:
+        if not position:
+            self.overrides.pop(symbol, None)
+            return None
+        entry = self.ledger.open_notional(symbol) / abs(position)
+        if symbol in self.overrides:
+            stop, target = self.overrides[symbol]
+            return ExitLevels(symbol, position, entry, stop, target, manual=True)
+        direction = 1 if position > 0 else -1
+        stop = entry * (1 - direction * self.stop_pct) if entry and self.stop_pct else None
+        target = entry * (1 + direction * self.target_pct) if entry and self.target_pct else None
+        return ExitLevels(symbol, position, entry, stop, target)
+
+    def refresh(self, symbol: str) -> Optional[ExitLevels]:
+        """Recompute the levels of `symbol` from the ledger."""
+        with self._lock:
+            levels = self._levels_for(symbol, self.ledger.position(symbol))
+            if levels is None:
+                self.levels.pop(symbol, None)
+            else:
+                self.levels[symbol] = levels
+            return levels
+
+    def set_levels(self, symbol: str, stop: Optional[float], target: Optional[float]) -> Optional[ExitLevels]:
+        """Override the stop/target of an open position (None clears that level)."""
+        symbol = symbol.upper()
+        with self._lock:
+            self.overrides[symbol] = (stop, target)
+        return self.refresh(symbol)
+
+    def clear_levels(self, symbol: str) -> Optional[ExitLevels]:
+        """Drop a per-symbol override and go back to the default levels."""
+        symbol = symbol.upper()
+        with self._lock:
+            self.overrides.pop(symbol, None)
+        return self.refresh(symbol)
+
+    def snapshot(self) -> Dict:
+        for symbol, qty in list(self.ledger.positions.items()):
+            self._current(symbol, qty)
+        return {
+            'stop_loss_pct': self.stop_pct,
+            'take_profit_pct': self.target_pct,
+            'levels': [lv.to_dict() for lv in self.levels.values() if lv.active],
+            'exiting': sorted(self._exiting),
+        }
+
+    # ---- prices ------------------------------------------------------------
+
+    def _current(self, symbol: str, position: int) -> Optional[ExitLevels]:
+        levels = self.levels.get(symbol)
+        if levels is not None and levels.position == position:
+            return levels
+        if not position and levels is None:
+            return None
+        return self.refresh(symbol)
+
+    def on_price(self, symbol: str, price: float) -> Optional[str]:
+        """Check one price update; returns the exit reason if an exit was triggered."""
+        position = self.ledger.positions.get(symbol, 0)
+        levels = self._current(symbol, position)
+        if levels is None:
+            return None
+        reason = levels.crossed(price)
+        if reason is None:
+            return None
+        return self._trigger(levels, price, reason)
+
+    def _trigger(self, levels: ExitLevels, price: float, reason: str) -> Optional[str]:
+        symbol = levels.symbol
+        side = 'SELL' if levels.position > 0 else 'BUY'
+        qty = abs(levels.position)
+        with self._lock:
+            inflight = self._exiting.get(symbol)
+            if inflight is not None:
+                if time.monotonic() - inflight[0] < settings.ORDER_PENDING_TTL_S:
+                    return None
+                self._release(symbol)
+            # A webhook order on the same side is already working the position
+            if self.orders.has_pending(symbol, side):
+                return None
+            reservation, why = self.ledger.reserve(symbol, side, qty, price,
+                                                   max_position=float('inf'), max_exposure=float('inf'))
+            if reservation is None:
+                logger.info(f"Exit for {symbol} skipped: {why}")
+                return None
+            self._exiting[symbol] = (time.monotonic(), reservation)
+        metrics.incr(f'exits.{reason}')
+        logger.warning(f"{reason} hit for {symbol} at {price} "
+                       f"(stop {levels.stop}, target {levels.target}); {side} {qty}")
+        if self.on_exit is None:
+            logger.error(f"No exit handler installed; {symbol} exit not placed")
+            self.done(symbol)
+            return reason
+        try:
+            self.on_exit(symbol, side, qty, price, reason)
+        except Exception:
+            logger.exception(f"Exit handler failed for {symbol}")
+            self.done(symbol)
+        return reason
+
+    def _release(self, symbol: str) -> None:
+        inflight = self._exiting.pop(symbol, None)
+        if inflight is not None:
+            inflight[1].release()
+
+    def done(self, symbol: str) -> None:
+        """The exit of `symbol` was placed (or failed); its fill is in the ledger if any."""
+        with self._lock:
+            self._release(symbol)
+        self.refresh(symbol)
+
+    # ---- polling -----------------------------------------------------------
+
+    def poll(self) -> int:
+        """Check the latest stored close of every open position; returns exits triggered."""
+        triggered = 0
+        for symbol, qty in list(self.ledger.positions.items()):
+            levels = self._current(symbol, qty)
+            if levels is None or not levels.active:
+                continue
+            try:
+                bar_store.top_up(symbol, '15m', POLL_PERIOD)
+            except Exception as e:
+                logger.error(f"Exit poll top-up failed for {symbol}: {e}")
+            cols = bar_store.read(symbol, '15m')
+            if cols is None or not len(cols['close']):
+                continue
+            if self.on_price(symbol, float(cols['close'][-1])):
+                triggered += 1
+        return triggered
+
+    def start(self, poll_s: float = None) -> None:
+        """Listen to streamed prices, and poll when no streaming feed is running."""
+        market_data.add_price_listener(self.on_price)
+        poll_s = settings.EXIT_POLL_S if poll_s is None else poll_s
+        if self._thread is not None or not poll_s:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(poll_s,), name='position-monitor', daemon=True)
+        self._thread.start()
+
+    def _run(self, poll_s: float) -> None:
+        while not self._stop.wait(poll_s):
+            if market_data.active_feed() is not None:
+                continue
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Exit poll failed")
+
+    def stop(self) -> None:
+        market_data.remove_price_listener(self.on_price)
+        self._stop.set()
+        self._thread = None
+
+
+# singleton
+position_monitor = PositionMonitor()
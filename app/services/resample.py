@@ -0,0 +1,40 @@
+"""
+Bar Resampler
+Builds higher-timeframe OHLCV bars from a lower-timeframe series, aligned to
+the exchange session open (09:30 ET) the same way Yahoo's 60m bars are:
+09:30, 10:30, ..., 15:30 (the last hour is a 30 minute partial bar).
+"""
+
+from datetime import time
+import logging
+
+import pandas as pd
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SESSION_OPEN = time(9, 30)
+
+_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def resample_bars(df: pd.DataFrame, minutes: int = 60, session_open: time = SESSION_OPEN,
+                  tz: str = None) -> pd.DataFrame:
+    """
+    Aggregate bars into `minutes`-wide bins anchored on the session open in
+    the exchange timezone, so bins never straddle the open or the overnight gap.
+    Bins with no source bars are dropped. The result is indexed in the exchange tz.
+    """
+    if df is None or df.empty:
+        return df
+    tz = tz or settings.EXCHANGE_TZ
+    index = df.index if df.index.tz is not None else df.index.tz_localize('UTC')
+    local = df.set_axis(index.tz_convert(tz))
+
+    # Offset of the session open from midnight, reduced modulo the bin width
+    offset = (session_open.hour * 60 + session_open.minute) % minutes
+    out = local.resample(f'{minutes}min', offset=f'{offset}min', label='left', closed='left').agg(
+        {col: how for col, how in _AGG.items() if col in local.columns}
+    )
+    return out.dropna(subset=['close'])
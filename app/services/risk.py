@@ -1,17 +1,23 @@
 from typing import Tuple, Optional
 from app.config import settings
-from app.models.trade import Trade
+from app.services.ledger import position_ledger, Reservation
+from app.services.order_tracker import order_tracker
+from app.services.portfolio_risk import portfolio_risk
+from app.services.market_calendar import market_calendar
+from app.services.metrics import metrics
+from app.services.risk_pipeline import RiskPipeline
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, time
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class RiskManager:
-    def __init__(self, settings_obj=None):
+    def __init__(self, settings_obj=None, ledger=None, orders=None, portfolio=None):
         self.settings = settings_obj or settings
+        self.ledger = ledger or position_ledger
+        self.orders = orders or order_tracker
+        self.portfolio = portfolio or portfolio_risk
 
     def get_user_settings(self, db: Session):
         """Fetch user-configured trade settings from DB, or create defaults."""
@@ -24,155 +30,163 @@ class RiskManager:
         return setting
 
     def is_market_open_rth(self) -> bool:
-        """Check if current time is within RTH (9:30 AM - 4:00 PM ET).
-        Simplified check; does not account for holidays.
-        """
-        import pytz
-        et = pytz.timezone('America/New_York')
-        now = datetime.now(et)
-        # RTH: 9:30 - 16:00 (4 PM)
-        rth_start = time(9, 30)
-        rth_end = time(16, 0)
-        # Only check on weekdays
-        if now.weekday() >= 5:  # Saturday=5, Sunday=6
-            return False
-        return rth_start <= now.time() <= rth_end
+        """Check if a regular NYSE session is in progress (holidays and early closes included)."""
+        return market_calendar.is_open()
 
     def check_daily_loss_limit(self, db: Session, user_settings) -> Tuple[bool, Optional[str]]:
-        """Check if daily loss exceeds threshold."""
-        from app.services.pnl import compute_daily_realized_pnl
-        daily_pnl = compute_daily_realized_pnl(db)
+        """Check if today's realized loss (from the synced ledger) exceeds threshold."""
+        daily_pnl = self.ledger.realized_today()
         if daily_pnl < user_settings.max_daily_loss * -1:
             return False, f"daily_loss_limit_exceeded (loss: {daily_pnl}, limit: -{user_settings.max_daily_loss})"
         return True, None
 
     def check_daily_trade_count(self, db: Session, user_settings) -> Tuple[bool, Optional[str]]:
-        """Check if daily trade count exceeds threshold."""
-        from datetime import date, timedelta
-        today = date.today()
-        trade_count = db.query(Trade).filter(
-            func.date(Trade.timestamp) == today,
-            Trade.status.like('Filled%')
-        ).count()
+        """Check if the current trading day's fill count (from the synced ledger) exceeds threshold."""
+        trade_count = self.ledger.fills_today()
         if trade_count >= user_settings.max_trades_per_day:
             return False, f"max_trades_per_day_exceeded ({trade_count} >= {user_settings.max_trades_per_day})"
         return True, None
 
     def check_open_order_duplicate(self, symbol: str, side: str, db: Session) -> Tuple[bool, Optional[str]]:
-        """Check if there's already a pending order for this symbol/side."""
-        from app.models.open_order import OpenOrder
-        from datetime import timedelta
-        cutoff = datetime.now() - timedelta(minutes=1)  # Check last 1 minute for pending orders
-        existing = db.query(OpenOrder).filter(
-            OpenOrder.symbol == symbol,
-            OpenOrder.side == side,
-            OpenOrder.filled_at.is_(None),
-            OpenOrder.created_at > cutoff
-        ).first()
-        if existing:
+        """Check if there's already a pending order for this symbol/side (in-memory order tracker)."""
+        if self.orders.has_pending(symbol, side):
             return False, f"pending_{side.lower()}_order_exists_for_{symbol}"
         return True, None
 
     def check_position_for_sell(self, symbol: str, qty: int, db: Session) -> Tuple[bool, Optional[str]]:
-        """Check if we hold sufficient quantity to sell."""
-        try:
-            buys = db.query(func.coalesce(func.sum(Trade.qty), 0)).filter(
-                Trade.symbol == symbol, 
-                Trade.status.like('Filled%'), 
-                Trade.side == 'BUY'
-            ).scalar() or 0
-            sells = db.query(func.coalesce(func.sum(Trade.qty), 0)).filter(
-                Trade.symbol == symbol, 
-                Trade.status.like('Filled%'), 
-                Trade.side == 'SELL'
-            ).scalar() or 0
-            position = (buys or 0) - (sells or 0)
-        except Exception as e:
-            logger.exception("Error checking position for sell")
-            position = 0
+        """Check if we hold sufficient quantity to sell, net of reserved sells (reads the synced ledger)."""
+        position = self.ledger.position(symbol) - self.ledger.reserved_sells.get(symbol, 0)
 
         if position < qty:
             return False, f"insufficient_position_to_sell (have: {position}, want: {qty})"
         return True, None
 
+    def check_portfolio_var(self, symbol: str, side: str, qty: int, price: float,
+                            user_settings) -> Tuple[bool, Optional[str]]:
+        """Reject orders that take portfolio VaR (15m bar covariance) above the limit.
+        The book is the open positions plus every order still in flight. Orders that
+        reduce VaR are always allowed, even while the book is over the limit.
+        """
+        limit = getattr(user_settings, 'max_portfolio_var', None) or 0
+        if limit <= 0:
+            return True, None
+        marks = self.ledger.marks
+        before = {s: q * marks.get(s, 0.0) for s, q in list(self.ledger.positions.items()) if q}
+        for s, notional in self.ledger.reserved_exposure().items():
+            before[s] = before.get(s, 0.0) + notional
+        after = dict(before)
+        # The alert price only values this order; the held position stays at its mark
+        signed = qty if side.upper() == 'BUY' else -qty
+        after[symbol] = before.get(symbol, 0.0) + signed * price
+        var_before, var_after = self.portfolio.var(before, after)
+        if var_after > limit and var_after > var_before:
+            return False, f"portfolio_var_exceeded (var: {round(var_after, 2)}, limit: {limit})"
+        return True, None
+
     def validate_order(self, symbol: str, side: str, qty: int, price: float, db: Session) -> Tuple[bool, Optional[str]]:
-        """Validate an outgoing order against all configured risk rules.
+        """Validate an outgoing order against all configured risk rules without holding anything.
         Returns (ok, reason) where reason is provided if not ok.
         """
+        ok, reason, reservation = self.reserve_order(symbol, side, qty, price, db)
+        if reservation is not None:
+            reservation.release()
+        return ok, reason
+
+    def _sync_ledger(self, db: Session) -> None:
+        with metrics.timer('risk.ledger_sync'):
+            try:
+                self.ledger.sync(db)
+            except Exception:
+                logger.exception("Position ledger sync failed; using last known positions")
+
+    def reserve_order(self, symbol: str, side: str, qty: int, price: float,
+                      db: Session) -> Tuple[bool, Optional[str], Optional[Reservation]]:
+        """Validate an order and, if it passes, reserve its qty and notional against the limits.
+        Returns (ok, reason, reservation); the caller must release the reservation once
+        the fill is in the ledger or the order failed.
+        """
         user_settings = self.get_user_settings(db)
+        order = {'symbol': symbol, 'side': side.upper(), 'qty': qty, 'price': price, 'notional': qty * price}
 
-        # 1. Basic checks
-        if qty <= 0:
-            return False, "qty_must_be_positive"
+        # Independent checks, cheapest and most often failing first (see risk_pipeline.py)
+        synced = False
 
-        if qty > user_settings.max_qty_per_order:
-            return False, f"qty_exceeds_max ({qty} > {user_settings.max_qty_per_order})"
+        def sync():
+            nonlocal synced
+            self._sync_ledger(db)
+            synced = True
 
-        notional = qty * price
-        if notional > user_settings.max_notional_per_order:
-            return False, f"notional_exceeds_max ({notional} > {user_settings.max_notional_per_order})"
+        ok, reason, _ = risk_pipeline.run(self, order, db, user_settings, sync=sync)
+        if not ok:
+            return False, reason, None
+        if not synced:
+            self._sync_ledger(db)
+
+        # Last: sell position, position per symbol and total exposure, checked and
+        # reserved atomically against the ledger and all orders still in flight
+        with metrics.timer('risk.reserve'):
+            reservation, reason = self.ledger.reserve(
+                symbol, side, qty, price,
+                max_position=user_settings.max_position_per_symbol,
+                max_exposure=user_settings.max_total_position_notional,
+            )
+        if reservation is None:
+            metrics.incr('risk.reserve.rejects')
+            return False, reason, None
 
-        # 2. RTH check (if enabled)
-        if user_settings.only_trade_during_rth:
-            if not self.is_market_open_rth():
-                return False, "market_not_open_rth_only_trading_enabled"
+        # Passed all checks
+        return True, None, reservation
 
-        # 3. Daily loss limit check
-        ok, reason = self.check_daily_loss_limit(db, user_settings)
-        if not ok:
-            return False, reason
 
-        # 4. Daily trade count check
-        ok, reason = self.check_daily_trade_count(db, user_settings)
-        if not ok:
-            return False, reason
+# Pre-trade checks. Costs are rough per-call estimates in microseconds;
+# the pipeline refines them from measured timings.
+risk_pipeline = RiskPipeline()
 
-        # 5. Open order duplicate check
-        ok, reason = self.check_open_order_duplicate(symbol, side, db)
-        if not ok:
-            return False, reason
-
-        # 6. For SELL orders, check position
-        if side.upper() == 'SELL':
-            ok, reason = self.check_position_for_sell(symbol, qty, db)
-            if not ok:
-                return False, reason
-
-        # 7. Position per symbol check
-        try:
-            buys = db.query(func.coalesce(func.sum(Trade.qty), 0)).filter(
-                Trade.symbol == symbol, 
-                Trade.status.like('Filled%'), 
-                Trade.side == 'BUY'
-            ).scalar() or 0
-            sells = db.query(func.coalesce(func.sum(Trade.qty), 0)).filter(
-                Trade.symbol == symbol, 
-                Trade.status.like('Filled%'), 
-                Trade.side == 'SELL'
-            ).scalar() or 0
-            pos_q = (buys or 0) - (sells or 0)
-        except Exception:
-            pos_q = 0
-
-        # New position after this order
-        if side.upper() == 'BUY':
-            new_pos = (pos_q or 0) + qty
-        else:
-            new_pos = (pos_q or 0) - qty
-
-        if abs(new_pos) > user_settings.max_position_per_symbol:
-            return False, f"position_limit_exceeded (would be {new_pos}, max {user_settings.max_position_per_symbol})"
-
-        # 8. Total exposure check
-        try:
-            total_exposure = db.query(func.coalesce(func.sum(func.abs(Trade.qty * Trade.price)), 0)).filter(
-                Trade.status.like('Filled%')
-            ).scalar() or 0
-        except Exception:
-            total_exposure = 0
-
-        if (total_exposure + abs(notional)) > user_settings.max_total_position_notional:
-            return False, f"total_exposure_exceeded (would be {total_exposure + abs(notional)} > {user_settings.max_total_position_notional})"
 
-        # Passed all checks
-        return True, None
+@risk_pipeline.register('qty_positive', cost_us=1)
+def _qty_positive(rm, order, db, user_settings):
+    if order['qty'] <= 0:
+        return False, "qty_must_be_positive"
+    return True, None
+
+
+@risk_pipeline.register('max_qty', cost_us=1)
+def _max_qty(rm, order, db, user_settings):
+    if order['qty'] > user_settings.max_qty_per_order:
+        return False, f"qty_exceeds_max ({order['qty']} > {user_settings.max_qty_per_order})"
+    return True, None
+
+
+@risk_pipeline.register('max_notional', cost_us=1)
+def _max_notional(rm, order, db, user_settings):
+    notional = order['notional']
+    if notional > user_settings.max_notional_per_order:
+        return False, f"notional_exceeds_max ({notional} > {user_settings.max_notional_per_order})"
+    return True, None
+
+
+@risk_pipeline.register('rth', cost_us=3)
+def _rth(rm, order, db, user_settings):
+    if user_settings.only_trade_during_rth and not rm.is_market_open_rth():
+        return False, "market_not_open_rth_only_trading_enabled"
+    return True, None
+
+
+@risk_pipeline.register('daily_loss', cost_us=2, needs_ledger=True)
+def _daily_loss(rm, order, db, user_settings):
+    return rm.check_daily_loss_limit(db, user_settings)
+
+
+@risk_pipeline.register('daily_trade_count', cost_us=2, needs_ledger=True)
+def _daily_trade_count(rm, order, db, user_settings):
+    return rm.check_daily_trade_count(db, user_settings)
+
+
+@risk_pipeline.register('duplicate_order', cost_us=2)
+def _duplicate_order(rm, order, db, user_settings):
+    return rm.check_open_order_duplicate(order['symbol'], order['side'], db)
+
+
+@risk_pipeline.register('portfolio_var', cost_us=100, needs_ledger=True)
+def _portfolio_var(rm, order, db, user_settings):
+    return rm.check_portfolio_var(order['symbol'], order['side'], order['qty'], order['price'], user_settings)
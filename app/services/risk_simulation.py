@@ -0,0 +1,142 @@
+"""
+Risk What-If Simulation
+Runs a batch of hypothetical orders, in sequence, through the risk limits
+against a snapshot of the position ledger and the trade settings, without
+touching the DB, the live ledger or the broker.
+
+Order-independent rules (qty, notional, RTH at the order's timestamp and
+the daily loss limit) are evaluated for the whole batch at once with NumPy
+masks. Only the orders that survive them go through the sequential part
+(sell position, position per symbol and marked total exposure), which
+mirrors PositionLedger.reserve on a local copy of the book.
+
+Pending-order duplicates and the daily trade count are not simulated: they
+depend on live order flow rather than on the orders themselves. Neither is
+portfolio VaR, which depends on the bar history at decision time.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+import logging
+
+import numpy as np
+
+from app.services.ledger import exposure_change, position_ledger
+from app.services.market_calendar import market_calendar
+
+logger = logging.getLogger(__name__)
+
+
+def _field(order, name, default=None):
+    return order.get(name, default) if isinstance(order, dict) else getattr(order, name, default)
+
+
+def _epoch(ts) -> float:
+    if ts is None:
+        return np.nan
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _rth_mask(times: np.ndarray) -> np.ndarray:
+    """True where the order time falls inside a regular session (NaN times pass)."""
+    opens = np.asarray(market_calendar.opens, dtype='float64')
+    closes = np.asarray(market_calendar.closes, dtype='float64')
+    idx = np.searchsorted(opens, np.nan_to_num(times, nan=0.0), side='right') - 1
+    in_session = (idx >= 0) & (np.nan_to_num(times, nan=0.0) < closes[np.clip(idx, 0, None)])
+    return in_session | np.isnan(times)
+
+
+def simulate_orders(orders: List[Any], user_settings, snapshot: Optional[Dict[str, Any]] = None,
+                    start_flat: bool = False, include_orders: bool = True) -> Dict[str, Any]:
+    """
+    Evaluate `orders` (dicts or objects with symbol, side, qty, price and an
+    optional timestamp) in order. `snapshot` defaults to the live ledger's.
+    Returns per-order decisions with the symbol position and total exposure
+    after each order, plus rejection counts and the final book.
+    """
+    n = len(orders)
+    snapshot = snapshot or position_ledger.snapshot()
+    symbols = [str(_field(o, 'symbol')).upper() for o in orders]
+    side = np.array([1 if str(_field(o, 'side')).upper() == 'BUY' else -1 for o in orders], dtype='int64')
+    qty = np.array([int(_field(o, 'qty')) for o in orders], dtype='int64')
+    price = np.array([float(_field(o, 'price')) for o in orders], dtype='float64')
+    notional = qty * price
+
+    # Order-independent rules, first failing rule wins (same precedence as the reasons below)
+    code = np.zeros(n, dtype='int8')
+    rules = [
+        (qty <= 0, 'qty_must_be_positive'),
+        (qty > user_settings.max_qty_per_order, 'qty_exceeds_max'),
+        (notional > user_settings.max_notional_per_order, 'notional_exceeds_max'),
+    ]
+    if user_settings.only_trade_during_rth:
+        times = np.array([_epoch(_field(o, 'timestamp')) for o in orders], dtype='float64')
+        rules.append((~_rth_mask(times), 'market_not_open_rth_only_trading_enabled'))
+    if snapshot.get('realized_today', 0.0) < -user_settings.max_daily_loss:
+        rules.append((np.ones(n, dtype=bool), 'daily_loss_limit_exceeded'))
+    for k in range(len(rules) - 1, -1, -1):
+        code[rules[k][0]] = k + 1
+    reasons = [None] * n
+    for i in np.flatnonzero(code):
+        reasons[i] = rules[code[i] - 1][1]
+
+    # Sequential limits on a copy of the book; positions stay at their snapshot
+    # marks and only the order's own qty is valued at its price
+    positions = {} if start_flat else dict(snapshot.get('positions', {}))
+    marks = {} if start_flat else dict(snapshot.get('marks', {}))
+    exposure = sum(abs(q) * marks.get(s, 0.0) for s, q in positions.items())
+    max_position = user_settings.max_position_per_symbol
+    max_exposure = user_settings.max_total_position_notional
+
+    position_path = np.zeros(n, dtype='int64')
+    exposure_path = np.zeros(n, dtype='float64')
+    accepted = code == 0
+    for i in range(n):
+        sym = symbols[i]
+        pos = positions.get(sym, 0)
+        if accepted[i]:
+            p = float(price[i])
+            q = int(qty[i])
+            new_pos = pos + int(side[i]) * q
+            change = exposure_change(pos, 'BUY' if side[i] > 0 else 'SELL', q, p, marks.get(sym, p))
+            if side[i] < 0 and pos < q:
+                reasons[i] = 'insufficient_position_to_sell'
+            elif abs(new_pos) > max_position:
+                reasons[i] = 'position_limit_exceeded'
+            elif change > 0 and exposure + change > max_exposure:
+                reasons[i] = 'total_exposure_exceeded'
+            else:
+                positions[sym] = pos = new_pos
+                exposure += change
+                marks.setdefault(sym, p)
+            accepted[i] = reasons[i] is None
+        position_path[i] = pos
+        exposure_path[i] = exposure
+
+    reject_counts: Dict[str, int] = {}
+    for r in reasons:
+        if r is not None:
+            reject_counts[r] = reject_counts.get(r, 0) + 1
+
+    result = {
+        'orders': n,
+        'accepted': int(accepted.sum()),
+        'rejected': int(n - accepted.sum()),
+        'reject_rate': round(float(1 - accepted.mean()), 6) if n else 0.0,
+        'reject_counts': reject_counts,
+        'final_positions': {s: q for s, q in positions.items() if q},
+        'final_exposure': round(float(exposure), 6),
+    }
+    if include_orders:
+        result['decisions'] = [{
+            'symbol': symbols[i],
+            'ok': bool(accepted[i]),
+            'reason': reasons[i],
+            'position': int(position_path[i]),
+            'exposure': round(float(exposure_path[i]), 6),
+        } for i in range(n)]
+    return result
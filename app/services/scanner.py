@@ -0,0 +1,191 @@
+"""
+Universe Scanner
+Runs the validation rule set for both directions across a universe of
+symbols and ranks them by score.
+
+Each symbol is scanned in a worker process straight from the local bar store
+(memory-mapped, nothing is shipped to the worker): indicators are computed
+once and the compiled rules are evaluated for BUY and SELL on the latest bar.
+Results are cached per 15m bar, so repeated scans within a bar are free and
+the first scan after a bar close recomputes. A refresh scan tops up the bar
+store first, so it always recomputes and replaces the cached ranking.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Iterator, Optional
+import logging
+import os
+import threading
+import time
+
+from app.config import settings
+from app.services.bar_store import bar_store, period_to_timedelta
+from app.services.market_calendar import market_calendar
+from app.services.metrics import metrics
+from app.services.signal_validation import LOOKBACK_PERIOD, bar_keys, split_frames
+from app.services.validation_rules import compile_rules, compute_indicators
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ('BUY', 'SELL')
+
+
+def load_universe() -> List[str]:
+    """Symbols from SCANNER_UNIVERSE_FILE (one per line, # comments) or SCANNER_UNIVERSE."""
+    path = settings.SCANNER_UNIVERSE_FILE
+    if path and os.path.exists(path):
+        with open(path) as f:
+            symbols = [line.split('#', 1)[0].strip().upper() for line in f]
+        return [s for s in symbols if s]
+    return list(settings.SCANNER_UNIVERSE)
+
+
+def scan_symbol(symbol: str, refresh: bool = False) -> Dict[str, Any]:
+    """Evaluate both directions on the latest stored bar of `symbol`."""
+    symbol = symbol.upper()
+    if refresh:
+        try:
+            bar_store.top_up(symbol, '15m', LOOKBACK_PERIOD)
+        except Exception as e:
+            logger.error(f"Scanner top-up failed for {symbol}: {e}")
+    start = datetime.now(timezone.utc) - period_to_timedelta(LOOKBACK_PERIOD)
+    df_15m, df_1h = split_frames(bar_store.read_frame(symbol, '15m', start=start))
+    if df_15m is None or df_15m.empty:
+        return {'symbol': symbol, 'error': 'no stored bars'}
+
+    ind = compute_indicators(df_15m, df_1h)
+    ind = {k: v[-1:] for k, v in ind.items()}
+    out = {'symbol': symbol, 'bar_time': df_15m.index[-1].isoformat(), 'close': float(ind['close'][0])}
+    for direction in DIRECTIONS:
+        res = compile_rules(direction).evaluate(ind)
+        out[direction] = {
+            'score': int(res['score'][0]),
+            'checks_passed': int(res['passed_count'][0]),
+            'approved': bool(res['decision'][0]),
+            'failed': [name for name in res['scored'] if not res[name][0]],
+        }
+    best = max(DIRECTIONS, key=lambda d: (out[d]['approved'], out[d]['score'], out[d]['checks_passed']))
+    out['best_direction'] = best
+    out['best_score'] = out[best]['score']
+    return out
+
+
+def rank(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Approved first, then by score and checks passed; symbols without bars last."""
+    def key(r):
+        if 'error' in r:
+            return (0, 0, 0, 0)
+        best = r[r['best_direction']]
+        return (1, best['approved'], best['score'], best['checks_passed'])
+    return sorted(results, key=key, reverse=True)
+
+
+def iter_scan(symbols: List[str], refresh: bool = False,
+              pool: ProcessPoolExecutor = None) -> Iterator[Dict[str, Any]]:
+    """Yield per-symbol results as they complete; in-process when no pool is given."""
+    if pool is None:
+        for symbol in symbols:
+            yield scan_symbol(symbol, refresh)
+        return
+    futures = {pool.submit(scan_symbol, symbol, refresh): symbol for symbol in symbols}
+    for future in as_completed(futures):
+        try:
+            yield future.result()
+        except Exception as e:
+            logger.error(f"Scan failed for {futures[future]}: {e}")
+            yield {'symbol': futures[future], 'error': str(e)}
+
+
+class Scanner:
+    """Scan results cached per 15m bar; a new bar close triggers a fresh scan."""
+
+    def __init__(self, workers: int = None):
+        # Size of the long-lived scan pool (default: all cores); 0 scans in-process
+        if workers is None:
+            workers = settings.SCANNER_WORKERS
+        self.workers = max(0, (os.cpu_count() or 1) if workers is None else workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._bar: Optional[int] = None
+        self._symbols: tuple = ()
+        self._results: List[Dict[str, Any]] = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def cached(self, symbols: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Ranked results of the current bar's scan of `symbols`, if there is one."""
+        with self._lock:
+            if self._bar == bar_keys()[0] and self._symbols == tuple(symbols):
+                return list(self._results)
+        return None
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        """The shared scan pool, started on first use; every scan reuses it."""
+        if not self.workers:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def stream(self, symbols: List[str] = None, refresh: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Yield {'type': 'result', ...} per symbol as it completes, then
+        {'type': 'ranking', 'results': [...]}. Served from cache within a bar
+        unless `refresh`, which rescans and replaces the cached ranking.
+        """
+        symbols = [s.upper() for s in (symbols or load_universe())]
+        bar = bar_keys()[0]
+        cached = None if refresh else self.cached(symbols)
+        if cached is not None:
+            metrics.incr('scanner.cache_hits')
+            yield {'type': 'ranking', 'bar': bar, 'cached': True, 'results': cached}
+            return
+
+        started = time.monotonic()
+        results = []
+        for r in iter_scan(symbols, refresh=refresh, pool=self._executor()):
+            results.append(r)
+            yield {'type': 'result', **r}
+        ranked = rank(results)
+        metrics.observe('scanner.scan_ms', (time.monotonic() - started) * 1000)
+        with self._lock:
+            self._bar, self._symbols, self._results = bar, tuple(symbols), ranked
+        yield {'type': 'ranking', 'bar': bar, 'cached': False, 'results': ranked}
+
+    def scan(self, symbols: List[str] = None, refresh: bool = True) -> List[Dict[str, Any]]:
+        """Blocking scan; returns the ranked results."""
+        last = None
+        for last in self.stream(symbols, refresh):
+            pass
+        return last['results'] if last else []
+
+    def start(self, delay_s: float = 5.0) -> None:
+        """Rescan the configured universe shortly after every 15m bar close (market hours only)."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(delay_s,), name='scanner', daemon=True)
+        self._thread.start()
+
+    def _run(self, delay_s: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception:
+                logger.exception("Scheduled scan failed")
+            next_close = market_calendar.next_bar_close(minutes=15)
+            self._stop.wait(max(1.0, next_close + delay_s - time.time()))
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# singleton
+scanner = Scanner()
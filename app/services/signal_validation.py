@@ -5,29 +5,232 @@ Implements multi-layer validation: price, trend, momentum, candle strength, volu
 """
 
 import yfinance as yf
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from typing import Dict, Any, Tuple
-import ta
 import logging
+import copy
+import threading
+import time
+from collections import OrderedDict
+from app.config import settings
+from app.services.bar_store import bar_store, period_to_timedelta
+from app.services import market_data
+from app.services.market_calendar import market_calendar
+from app.services.compute_pool import compute_pool
+from app.services.metrics import metrics
+from app.services.resample import resample_bars
+from app.services.validation_rules import (
+    DEFAULT_THRESHOLDS, RULES, compile_rules, compute_indicators, describe_result, rule_values,
+)
 
 logger = logging.getLogger(__name__)
 
+CHECK_NAMES = tuple(rule['name'] for rule in RULES)
+
+# 15m history fetched per validation: ~21 sessions give >140 hourly bars for the 1h EMA50
+LOOKBACK_PERIOD = '30d'
+# The 15m checks only look at the most recent week, as they did with the old 7d download
+CHECK_WINDOW_15M = pd.Timedelta(days=7)
+
+# What to do when validation cannot finish inside its latency budget
+TIMEOUT_POLICIES = ('reject', 'approve_cached', 'skip')
+# Accepted range for the per-alert validation budget (validation_timeout_ms)
+TIMEOUT_MIN_MS = 100
+TIMEOUT_MAX_MS = 30000
+
+
+def clamp_budget_ms(budget_ms) -> int:
+    """Validation budget forced into [TIMEOUT_MIN_MS, TIMEOUT_MAX_MS]."""
+    return max(TIMEOUT_MIN_MS, min(TIMEOUT_MAX_MS, int(budget_ms)))
+
+
+def bar_keys(now: datetime = None) -> Tuple[int, int]:
+    """
+    Open times (epoch seconds) of the current session-aligned 15m and 1h bars.
+    Outside market hours these stay on the last bars of the previous session.
+    """
+    return market_calendar.bar_open(now, 15), market_calendar.bar_open(now, 60)
+
+
+def split_frames(df_all: pd.DataFrame):
+    """15m frame for the checks (last CHECK_WINDOW_15M) and the 1h frame derived from the full series."""
+    if df_all is None or df_all.empty:
+        return None, None
+    return df_all[df_all.index > df_all.index[-1] - CHECK_WINDOW_15M], resample_bars(df_all, minutes=60)
+
+
+class ValidationMemo:
+    """
+    LRU cache of full validation results keyed on
+    (symbol, direction, 15m bar, 1h bar). Every rule only looks at those bars,
+    so alerts inside the same bar get the same answer. Entries for a symbol
+    are dropped as soon as a newer 15m bar is seen for it; the newest result
+    per (symbol, direction) is kept apart for the approve_cached policy.
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        # symbol -> newest 15m bar seen
+        self._current_bar: Dict[str, int] = {}
+        # (symbol, direction) -> (15m bar, result) of the newest stored result
+        self._latest: OrderedDict = OrderedDict()
+
+    def _roll(self, symbol: str, bar_15m: int) -> None:
+        current = self._current_bar.get(symbol)
+        if current is not None and bar_15m <= current:
+            return
+        self._current_bar[symbol] = bar_15m
+        if current is not None:
+            stale = [k for k in self._entries if k[0] == symbol and k[2] < bar_15m]
+            for k in stale:
+                del self._entries[k]
+
+    def get(self, key: tuple):
+        with self._lock:
+            self._roll(key[0], key[2])
+            result = self._entries.get(key)
+            if result is None:
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(result)
+
+    def put(self, key: tuple, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._roll(key[0], key[2])
+            if key[2] < self._current_bar[key[0]]:
+                return
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._latest[key[:2]] = (key[2], self._entries[key])
+            self._latest.move_to_end(key[:2])
+            while len(self._latest) > self.max_size:
+                self._latest.popitem(last=False)
+
+    def latest(self, symbol: str, direction: str):
+        """Newest stored result for symbol/direction, whatever its bar, or None."""
+        with self._lock:
+            entry = self._latest.get((symbol, direction))
+            if entry is None:
+                return None
+            bar_15m, result = entry
+        result = copy.deepcopy(result)
+        result['metadata']['cached_bar'] = datetime.fromtimestamp(bar_15m, timezone.utc).isoformat()
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._current_bar.clear()
+            self._latest.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+validation_memo = ValidationMemo(max_size=settings.VALIDATION_MEMO_SIZE)
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution: the
+    first caller runs the function, callers arriving while it is in flight
+    wait for and share its result. Collapsed calls are counted in
+    metrics as '<name>.collapsed'.
+    """
+
+    def __init__(self, name: str, copy_result: bool = False):
+        self.name = name
+        # Hand followers (and the leader, when it had followers) their own deep copy
+        self.copy_result = copy_result
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, _Call] = {}
+
+    def do(self, key, fn, timeout: float = None):
+        """
+        Run `fn()` once for concurrent callers of `key`. Followers wait at most
+        `timeout` seconds and then raise TimeoutError; errors raised by the
+        leader are re-raised in every follower.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            metrics.incr(f'{self.name}.collapsed')
+            if not call.event.wait(timeout):
+                raise TimeoutError(f"{self.name} in flight for {key} did not finish in time")
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result) if self.copy_result else call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                shared = call.followers > 0
+            call.event.set()
+        if shared and self.copy_result:
+            return copy.deepcopy(call.result)
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+# Concurrent validations share downloads per (symbol, interval, period) and results per
+# (symbol, direction, bar, budget, policy); every sharer gets its own copy
+fetch_flight = SingleFlight('bars', copy_result=True)
+validation_flight = SingleFlight('validation', copy_result=True)
+
 
 class SignalValidator:
     """
     Validates TradingView signals against independent market data.
-    Uses scoring system where 4/5 checks must pass for approval.
+    Evaluates the declarative rules in validation_rules; 4/5 checks must pass for approval.
     """
 
-    def __init__(self, symbol: str, signal_direction: str):
+    def __init__(self, symbol: str, signal_direction: str, deadline: float = None,
+                 offline: bool = False, thresholds: Dict[str, Any] = None, details: bool = False):
         """
         Args:
             symbol: Stock ticker (e.g., 'AAPL')
             signal_direction: 'BUY' or 'SELL'
+            deadline: time.monotonic() instant after which remaining checks are marked timed out
+            offline: if True, only use bars already in the local bar store (no network)
+            thresholds: overrides for DEFAULT_THRESHOLDS
+            details: render human-readable detail lines for every check
         """
         self.symbol = symbol.upper()
         self.signal_direction = signal_direction.upper()
+        self.deadline = deadline
+        self.offline = offline
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.details = details
         self.validation_result = {
             'valid': False,
             'score': 0,
@@ -42,40 +245,39 @@ class SignalValidator:
         """
         Run comprehensive signal validation.
         Returns validation result with detailed scoring and feedback.
+        Checks that cannot start before the deadline are marked as timed out.
         """
+        if self._expired():
+            # Spent the budget waiting for a worker; don't start a fetch nobody will wait for
+            for check_name in CHECK_NAMES:
+                self._mark_timed_out(check_name)
+            self._calculate_final_decision()
+            return self.validation_result
+
         try:
-            # Fetch data: 15m, 1h, daily
-            df_15m = self._fetch_data(interval='15m', period='7d')
-            df_1h = self._fetch_data(interval='60m', period='30d')
-            
+            # One 15m download deep enough for EMA50 on 1h; the 1h frame is derived locally
+            df_all = self._fetch_data(interval='15m', period=LOOKBACK_PERIOD)
+            df_15m, df_1h = split_frames(df_all)
+
             if df_15m is None or df_15m.empty:
+                if self._expired():
+                    for check_name in CHECK_NAMES:
+                        self._mark_timed_out(check_name)
+                    self._calculate_final_decision()
+                    return self.validation_result
                 self.validation_result['valid'] = False
                 self.validation_result['errors'].append(
                     f"Failed to fetch 15m data for {self.symbol}"
                 )
                 return self.validation_result
 
-            # 1. Price Confirmation
-            self._check_price_confirmation(df_15m)
-
-            # 2. Trend Confirmation (15m)
-            self._check_trend_confirmation(df_15m)
-
-            # 3. Momentum Confirmation (RSI + MACD)
-            self._check_momentum_confirmation(df_15m)
-
-            # 4. Candle Strength
-            self._check_candle_strength(df_15m)
-
-            # 5. Volume Confirmation
-            self._check_volume_confirmation(df_15m)
-
-            # 6. Multi-Timeframe Alignment (1h confirmation)
-            if df_1h is not None and not df_1h.empty:
-                self._check_multitf_alignment(df_1h)
-
-            # Calculate final score and decision
-            self._calculate_final_decision()
+            if compute_pool.enabled:
+                # Indicator math runs in a worker process so it never blocks the web server
+                self.validation_result = compute_pool.evaluate(
+                    self.symbol, self.signal_direction, df_15m, df_1h, remaining=self._remaining()
+                )
+            else:
+                self.evaluate(df_15m, df_1h)
 
         except Exception as e:
             logger.exception(f"Signal validation error for {self.symbol}")
@@ -84,533 +286,133 @@ class SignalValidator:
 
         return self.validation_result
 
-    def _fetch_data(self, interval: str = '15m', period: str = '7d') -> pd.DataFrame:
-        """
-        Fetch historical OHLCV data from Yahoo Finance.
-        """
-        try:
-            ticker = yf.Ticker(self.symbol)
-            df = ticker.history(interval=interval, period=period)
-            
-            if df.empty:
-                logger.warning(f"No data returned for {self.symbol} at {interval}")
-                return None
-            
-            # Rename columns to lowercase for consistency
-            df.columns = [col.lower() for col in df.columns]
-            return df
-        except Exception as e:
-            logger.error(f"Failed to fetch {interval} data for {self.symbol}: {e}")
-            return None
-
-    def _check_price_confirmation(self, df: pd.DataFrame) -> None:
+    def evaluate(self, df_15m: pd.DataFrame, df_1h: pd.DataFrame = None) -> Dict[str, Any]:
         """
-        1️⃣ Price Confirmation
-        - Latest price exists and is fresh (within 20 minutes)
-        - No NaN / zero price
-        - No abnormal spike (< 3% move from previous)
+        Run the compiled validation rules on the latest bar and make the final decision.
+        Pure computation (no I/O), so it can run in a worker process.
         """
-        check_name = 'price_confirmation'
-        result = {
-            'passed': False,
-            'details': [],
-            'price': None,
-            'timestamp': None
-        }
-
-        try:
-            # Get latest candle
-            latest = df.iloc[-1]
-            close_price = latest['close']
-            high_price = latest['high']
-            low_price = latest['low']
-            timestamp = df.index[-1]
-
-            result['price'] = close_price
-            result['timestamp'] = timestamp.isoformat()
-
-            # Check 1: Price exists and is valid
-            if pd.isna(close_price) or close_price <= 0:
-                result['details'].append('❌ Price is NaN or zero')
-                self.validation_result['errors'].append('Invalid price data')
-                self.validation_result['checks'][check_name] = result
-                return
-
-            result['details'].append(f'✅ Valid price: ${close_price:.2f}')
-
-            # Check 2: Data freshness
-            now = datetime.now(timezone.utc)
-            # Convert timestamp to UTC-aware if needed
-            ts_utc = pd.Timestamp(timestamp).tz_localize(None).replace(tzinfo=timezone.utc)
-            age_minutes = (now - ts_utc).total_seconds() / 60
-
-            if age_minutes > 20:
-                result['details'].append(
-                    f'⚠️ Data age: {age_minutes:.1f} minutes (threshold: 20m)'
-                )
-                self.validation_result['warnings'].append(
-                    f'Price data is {age_minutes:.1f} min old'
-                )
-            else:
-                result['details'].append(f'✅ Data fresh: {age_minutes:.1f} min old')
-
-            # Check 3: No abnormal spike (compare to previous close)
-            if len(df) >= 2:
-                prev_close = df.iloc[-2]['close']
-                if prev_close > 0:
-                    price_change_pct = abs(close_price - prev_close) / prev_close * 100
-                    if price_change_pct > 3.0:
-                        result['details'].append(
-                            f'⚠️ Abnormal spike: {price_change_pct:.2f}% (threshold: 3%)'
-                        )
-                        self.validation_result['warnings'].append(
-                            f'Price moved {price_change_pct:.2f}% since last candle'
-                        )
-                    else:
-                        result['details'].append(
-                            f'✅ Price move normal: {price_change_pct:.2f}%'
-                        )
-
-            # Check 4: High/Low validity
-            if high_price < close_price or low_price > close_price:
-                result['details'].append('❌ Invalid OHLC structure')
-                self.validation_result['errors'].append('OHLC data integrity check failed')
-                self.validation_result['checks'][check_name] = result
-                return
-
-            result['passed'] = True
-            self.validation_result['score'] += 1
-
-        except Exception as e:
-            logger.error(f"Price confirmation check failed: {e}")
-            result['details'].append(f'Error: {str(e)}')
-
-        self.validation_result['checks'][check_name] = result
-
-    def _check_trend_confirmation(self, df: pd.DataFrame) -> None:
-        """
-        2️⃣ Trend Confirmation (15m timeframe)
-        Uses EMA 20, 50, 200 and VWAP.
-        
-        BUY: close > EMA 20 > EMA 50 > EMA 200 (strong) OR close > VWAP
-        SELL: close < EMA 20 < EMA 50
-        """
-        check_name = 'trend_confirmation'
-        result = {
-            'passed': False,
-            'details': [],
-            'ema_20': None,
-            'ema_50': None,
-            'ema_200': None,
-            'vwap': None
-        }
-
-        try:
-            if len(df) < 200:
-                result['details'].append(f'⚠️ Insufficient data: {len(df)} candles (need 200 for EMA200)')
-                self.validation_result['warnings'].append('Insufficient candles for full trend analysis')
-            else:
-                # Calculate EMAs
-                df['ema_20'] = ta.trend.ema_indicator(df['close'], window=20)
-                df['ema_50'] = ta.trend.ema_indicator(df['close'], window=50)
-                df['ema_200'] = ta.trend.ema_indicator(df['close'], window=200)
-                
-                latest = df.iloc[-1]
-                close = latest['close']
-                ema_20 = latest['ema_20']
-                ema_50 = latest['ema_50']
-                ema_200 = latest['ema_200']
-                
-                result['ema_20'] = ema_20
-                result['ema_50'] = ema_50
-                result['ema_200'] = ema_200
-
-            # Calculate VWAP (simplified: using close, high, low, volume)
-            df['vwap'] = self._calculate_vwap(df)
-            latest = df.iloc[-1]
-            close = latest['close']
-            vwap = latest['vwap']
-            ema_20 = df.iloc[-1].get('ema_20')
-            ema_50 = df.iloc[-1].get('ema_50')
-            ema_200 = df.iloc[-1].get('ema_200')
-
-            result['vwap'] = vwap
-
-            if self.signal_direction == 'BUY':
-                # BUY: close > EMA 20 > EMA 50 > EMA 200 (strong trend)
-                # OR close > VWAP (acceptable)
-                
-                buy_checks = []
-
-                if ema_20 is not None and ema_50 is not None:
-                    if close > ema_20 and ema_20 > ema_50:
-                        buy_checks.append('✅ EMA Structure: Close > EMA20 > EMA50')
-                        
-                        if ema_200 is not None and ema_50 > ema_200:
-                            buy_checks.append('✅ Strong Trend: EMA50 > EMA200')
-                        else:
-                            buy_checks.append('⚠️ EMA50 < EMA200 (weak long-term trend)')
-                    else:
-                        buy_checks.append(f'❌ EMA Fail: Close{close:.2f} vs EMA20:{ema_20:.2f} vs EMA50:{ema_50:.2f}')
-
-                if vwap is not None:
-                    if close > vwap:
-                        buy_checks.append(f'✅ Price > VWAP: {close:.2f} > {vwap:.2f}')
-                    else:
-                        buy_checks.append(f'❌ Price < VWAP: {close:.2f} < {vwap:.2f}')
-
-                result['details'] = buy_checks
-                # Pass if EMA structure OR price > VWAP
-                result['passed'] = any('✅' in check for check in buy_checks)
-
-            elif self.signal_direction == 'SELL':
-                # SELL: close < EMA 20 < EMA 50
-                sell_checks = []
-
-                if ema_20 is not None and ema_50 is not None:
-                    if close < ema_20 and ema_20 < ema_50:
-                        sell_checks.append('✅ EMA Structure: Close < EMA20 < EMA50')
-                    else:
-                        sell_checks.append(f'❌ EMA Fail: Close{close:.2f} vs EMA20:{ema_20:.2f} vs EMA50:{ema_50:.2f}')
-
-                if vwap is not None:
-                    if close < vwap:
-                        sell_checks.append(f'✅ Price < VWAP: {close:.2f} < {vwap:.2f}')
-                    else:
-                        sell_checks.append(f'❌ Price > VWAP: {close:.2f} > {vwap:.2f}')
-
-                result['details'] = sell_checks
-                result['passed'] = any('✅' in check for check in sell_checks)
-
-            if result['passed']:
-                self.validation_result['score'] += 1
+        if self._expired():
+            for check_name in CHECK_NAMES:
+                self._mark_timed_out(check_name)
+            self._calculate_final_decision()
+            return self.validation_result
+
+        ind = compute_indicators(df_15m, df_1h)
+        # Only the latest bar is judged; keep length-1 arrays for the evaluator
+        ind = {k: v[-1:] for k, v in ind.items()}
+        bar_time = pd.Timestamp(df_15m.index[-1])
+        bar_utc = bar_time.tz_convert('UTC') if bar_time.tzinfo else bar_time.tz_localize('UTC')
+        # Age against the last moment the market was open, so bars aren't "stale" overnight
+        ind['age_min'] = np.array([(market_calendar.market_time() - bar_utc.timestamp()) / 60])
+        self.validation_result['metadata']['bar_time'] = bar_time.isoformat()
+
+        res = compile_rules(self.signal_direction).evaluate(ind, self.thresholds)
+        for rule in RULES:
+            name = rule['name']
+            if name not in res:
+                continue
+            check = {
+                'passed': bool(res[name][0]),
+                'scored': bool(res['scored'][name][0]),
+                'values': rule_values(rule, self.signal_direction, ind),
+                'details': [],
+            }
+            raised = [key for key, _, _ in rule.get('warnings', []) if key in res and res[key][0]]
+            if raised:
+                check['warnings'] = raised
+                for key, _, message in rule['warnings']:
+                    if key in raised:
+                        self.validation_result['warnings'].append(message.format(**check['values']))
+            if not check['passed'] and rule.get('error'):
+                self.validation_result['errors'].append(rule['error'])
+            self.validation_result['checks'][name] = check
+        self.validation_result['score'] = int(res['score'][0])
+
+        if self.details:
+            describe_result(self.validation_result, self.signal_direction, self.thresholds)
+        self._calculate_final_decision()
+        return self.validation_result
 
-        except Exception as e:
-            logger.error(f"Trend confirmation check failed: {e}")
-            result['details'].append(f'Error: {str(e)}')
+    def _remaining(self):
+        """Seconds left before the deadline, or None when unbounded."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
 
-        self.validation_result['checks'][check_name] = result
+    def _expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
 
-    def _check_momentum_confirmation(self, df: pd.DataFrame) -> None:
-        """
-        3️⃣ Momentum Confirmation
-        RSI (14) + MACD for confirming trend direction.
-        
-        BUY: RSI 55-70, MACD > Signal, histogram increasing
-        SELL: RSI 30-45, MACD < Signal, histogram decreasing
-        """
-        check_name = 'momentum_confirmation'
-        result = {
+    def _mark_timed_out(self, check_name: str) -> None:
+        self.validation_result['checks'][check_name] = {
             'passed': False,
-            'details': [],
-            'rsi': None,
-            'macd': None,
-            'macd_signal': None,
-            'macd_histogram': None
+            'timed_out': True,
+            'details': ['⏱️ Timed out: validation budget exhausted'],
         }
+        self.validation_result['metadata'].setdefault('timed_out_checks', []).append(check_name)
+        self.validation_result['metadata']['timed_out'] = True
 
-        try:
-            # Calculate RSI
-            df['rsi'] = ta.momentum.rsi(df['close'], window=14)
-            
-            # Calculate MACD
-            macd = ta.trend.MACD(df['close'])
-            df['macd'] = macd.macd()
-            df['macd_signal'] = macd.macd_signal()
-            df['macd_diff'] = macd.macd_diff()
-
-            latest = df.iloc[-1]
-            rsi = latest['rsi']
-            macd = latest['macd']
-            macd_signal = latest['macd_signal']
-            macd_diff = latest['macd_diff']
-
-            result['rsi'] = rsi
-            result['macd'] = macd
-            result['macd_signal'] = macd_signal
-            result['macd_histogram'] = macd_diff
-
-            if self.signal_direction == 'BUY':
-                # BUY: RSI 55-70, avoid >75
-                rsi_checks = []
-                
-                if pd.isna(rsi):
-                    rsi_checks.append('⚠️ RSI not calculated')
-                elif rsi > 75:
-                    rsi_checks.append(f'❌ Overbought: RSI {rsi:.2f} > 75')
-                elif 55 <= rsi <= 70:
-                    rsi_checks.append(f'✅ Bullish RSI: {rsi:.2f} (55-70)')
-                elif rsi >= 50:
-                    rsi_checks.append(f'⚠️ Neutral RSI: {rsi:.2f} (not ideal for BUY)')
-                else:
-                    rsi_checks.append(f'❌ Weak RSI: {rsi:.2f} (< 50)')
-
-                # MACD: > Signal and increasing histogram
-                macd_checks = []
-                if pd.isna(macd) or pd.isna(macd_signal):
-                    macd_checks.append('⚠️ MACD not calculated')
-                elif macd > macd_signal and macd_diff > 0:
-                    macd_checks.append(f'✅ MACD bullish: {macd:.4f} > Signal {macd_signal:.4f}')
-                elif macd > macd_signal:
-                    macd_checks.append(f'⚠️ MACD above Signal but histogram declining')
-                else:
-                    macd_checks.append(f'❌ MACD below Signal: not bullish')
-
-                result['details'] = rsi_checks + macd_checks
-                result['passed'] = any('✅' in check for check in rsi_checks) and \
-                                  any('✅' in check for check in macd_checks)
-
-            elif self.signal_direction == 'SELL':
-                # SELL: RSI 30-45, avoid <25
-                rsi_checks = []
-                
-                if pd.isna(rsi):
-                    rsi_checks.append('⚠️ RSI not calculated')
-                elif rsi < 25:
-                    rsi_checks.append(f'❌ Oversold: RSI {rsi:.2f} < 25')
-                elif 30 <= rsi <= 45:
-                    rsi_checks.append(f'✅ Bearish RSI: {rsi:.2f} (30-45)')
-                elif rsi <= 50:
-                    rsi_checks.append(f'⚠️ Neutral RSI: {rsi:.2f}')
-                else:
-                    rsi_checks.append(f'❌ Strong RSI: {rsi:.2f} (> 50)')
-
-                # MACD: < Signal and decreasing histogram
-                macd_checks = []
-                if pd.isna(macd) or pd.isna(macd_signal):
-                    macd_checks.append('⚠️ MACD not calculated')
-                elif macd < macd_signal and macd_diff < 0:
-                    macd_checks.append(f'✅ MACD bearish: {macd:.4f} < Signal {macd_signal:.4f}')
-                elif macd < macd_signal:
-                    macd_checks.append(f'⚠️ MACD below Signal but histogram rising')
-                else:
-                    macd_checks.append(f'❌ MACD above Signal: not bearish')
-
-                result['details'] = rsi_checks + macd_checks
-                result['passed'] = any('✅' in check for check in rsi_checks) and \
-                                  any('✅' in check for check in macd_checks)
-
-            if result['passed']:
-                self.validation_result['score'] += 1
-
-        except Exception as e:
-            logger.error(f"Momentum confirmation check failed: {e}")
-            result['details'].append(f'Error: {str(e)}')
-
-        self.validation_result['checks'][check_name] = result
-
-    def _check_candle_strength(self, df: pd.DataFrame) -> None:
+    def _fetch_data(self, interval: str = '15m', period: str = '7d') -> pd.DataFrame:
         """
-        4️⃣ Candle Strength Confirmation
-        Latest closed 15m candle:
-        - Body size >= 60% of range
-        - Avoid doji and indecision candles
+        Fetch historical OHLCV data.
+        Served from the real-time feed when the symbol is streaming, then from
+        the local bar store when enabled (only the newest bars are downloaded),
+        otherwise straight from Yahoo Finance.
         """
-        check_name = 'candle_strength'
-        result = {
-            'passed': False,
-            'details': [],
-            'body_size': None,
-            'body_ratio': None,
-            'range': None
-        }
-
+        feed = market_data.active_feed()
+        if feed is not None:
+            df = feed.frame(self.symbol, interval, period)
+            if df is not None and not df.empty:
+                metrics.incr('validation.feed_hits')
+                return df
+            # Stream this symbol from now on; this validation still polls
+            feed.subscribe(self.symbol)
+
+        if self.offline:
+            return self._load_data(interval, period)
         try:
-            latest = df.iloc[-1]
-            open_p = latest['open']
-            close_p = latest['close']
-            high = latest['high']
-            low = latest['low']
-
-            range_val = high - low
-            body_size = abs(close_p - open_p)
-            
-            result['range'] = range_val
-            result['body_size'] = body_size
-
-            if range_val <= 0:
-                result['details'].append('❌ Invalid candle range')
-                self.validation_result['checks'][check_name] = result
-                return
-
-            body_ratio = body_size / range_val
-            result['body_ratio'] = body_ratio
-
-            # Check 1: Body strength
-            if body_ratio >= 0.6:
-                result['details'].append(
-                    f'✅ Strong body: {body_ratio*100:.1f}% of range (threshold: 60%)'
-                )
-                result['passed'] = True
-            else:
-                result['details'].append(
-                    f'❌ Weak body: {body_ratio*100:.1f}% of range (need: 60%)'
-                )
-                result['passed'] = False
-
-            # Check 2: Doji detection (very small body)
-            if body_ratio < 0.1:
-                result['details'].append('⚠️ Doji-like candle (indecision)')
-                result['passed'] = False
-
-            # Check 3: Both long wicks (indecision)
-            upper_wick = high - max(open_p, close_p)
-            lower_wick = min(open_p, close_p) - low
-            
-            if upper_wick > body_size and lower_wick > body_size:
-                result['details'].append('⚠️ Indecision candle (long wicks both sides)')
-                result['passed'] = False
-
-            if result['passed']:
-                self.validation_result['score'] += 1
-
-        except Exception as e:
-            logger.error(f"Candle strength check failed: {e}")
-            result['details'].append(f'Error: {str(e)}')
-
-        self.validation_result['checks'][check_name] = result
+            return fetch_flight.do((self.symbol, interval, period), lambda: self._load_data(interval, period),
+                                   timeout=self._remaining())
+        except TimeoutError:
+            logger.warning(f"Shared {interval} fetch for {self.symbol} outlasted the validation budget")
+            return None
 
-    def _check_volume_confirmation(self, df: pd.DataFrame) -> None:
-        """
-        5️⃣ Volume Confirmation
-        Current volume >= 1.2 × 20-period average volume
-        """
-        check_name = 'volume_confirmation'
-        result = {
-            'passed': False,
-            'details': [],
-            'current_volume': None,
-            'volume_sma20': None,
-            'ratio': None
-        }
+    def _load_data(self, interval: str, period: str) -> pd.DataFrame:
+        """Bar store (topped up from Yahoo) or direct Yahoo download."""
+        if settings.BAR_STORE_ENABLED or self.offline:
+            try:
+                if not self.offline:
+                    bar_store.top_up(self.symbol, interval, period, timeout=self._remaining())
+                start = datetime.now(timezone.utc) - period_to_timedelta(period)
+                df = bar_store.read_frame(self.symbol, interval, start=start)
+                if df is None or df.empty:
+                    logger.warning(f"No data returned for {self.symbol} at {interval}")
+                    return None
+                return df
+            except Exception as e:
+                logger.error(f"Bar store read failed for {self.symbol} {interval}: {e}")
+            if self.offline:
+                return None
 
         try:
-            if len(df) < 20:
-                result['details'].append(f'⚠️ Insufficient volume data: {len(df)} candles')
-                result['passed'] = True  # Skip check gracefully
-                self.validation_result['checks'][check_name] = result
-                return
-
-            df['vol_sma20'] = df['volume'].rolling(window=20).mean()
+            ticker = yf.Ticker(self.symbol)
+            timeout = self._remaining()
+            df = ticker.history(interval=interval, period=period, timeout=timeout if timeout is not None else 10)
             
-            latest = df.iloc[-1]
-            current_vol = latest['volume']
-            vol_sma20 = latest['vol_sma20']
-
-            result['current_volume'] = current_vol
-            result['volume_sma20'] = vol_sma20
-
-            if pd.isna(vol_sma20) or vol_sma20 <= 0:
-                result['details'].append('⚠️ Volume SMA20 not available')
-                result['passed'] = True  # Skip check gracefully
-                self.validation_result['checks'][check_name] = result
-                return
-
-            ratio = current_vol / vol_sma20
-            result['ratio'] = ratio
-
-            if ratio >= 1.2:
-                result['details'].append(
-                    f'✅ Volume elevated: {ratio:.2f}x average (threshold: 1.2x)'
-                )
-                result['passed'] = True
-                self.validation_result['score'] += 1
-            else:
-                result['details'].append(
-                    f'⚠️ Low volume: {ratio:.2f}x average (need: 1.2x)'
-                )
-                result['passed'] = True  # Not a hard fail, just warning
-
-        except Exception as e:
-            logger.error(f"Volume confirmation check failed: {e}")
-            result['details'].append(f'Error: {str(e)}')
-            result['passed'] = True
-
-        self.validation_result['checks'][check_name] = result
-
-    def _check_multitf_alignment(self, df_1h: pd.DataFrame) -> None:
-        """
-        6️⃣ Multi-Timeframe Alignment
-        Check 1h EMA 50 direction must agree with 15m signal.
-        
-        15m BUY + 1h bullish (EMA50 UP) → Allow
-        15m BUY + 1h bearish (EMA50 DOWN) → Reject
-        """
-        check_name = 'multitf_alignment'
-        result = {
-            'passed': False,
-            'details': [],
-            'hour_ema_50': None,
-            'hour_trend': None
-        }
-
-        try:
-            if len(df_1h) < 50:
-                result['details'].append(f'⚠️ Insufficient 1h data: {len(df_1h)} candles')
-                result['passed'] = True  # Skip check
-                self.validation_result['checks'][check_name] = result
-                return
-
-            df_1h['ema_50'] = ta.trend.ema_indicator(df_1h['close'], window=50)
+            if df.empty:
+                logger.warning(f"No data returned for {self.symbol} at {interval}")
+                return None
             
-            latest_1h = df_1h.iloc[-1]
-            close_1h = latest_1h['close']
-            ema_50_1h = latest_1h['ema_50']
-
-            result['hour_ema_50'] = ema_50_1h
-
-            if pd.isna(ema_50_1h):
-                result['details'].append('⚠️ 1h EMA50 not calculated')
-                result['passed'] = True  # Skip check
-                self.validation_result['checks'][check_name] = result
-                return
-
-            # Determine 1h trend
-            if len(df_1h) >= 2:
-                prev_ema_50 = df_1h.iloc[-2]['ema_50']
-                if ema_50_1h > prev_ema_50:
-                    hour_trend = 'BULLISH'
-                    result['hour_trend'] = hour_trend
-                else:
-                    hour_trend = 'BEARISH'
-                    result['hour_trend'] = hour_trend
-            else:
-                hour_trend = 'UNKNOWN'
-                result['details'].append('⚠️ Cannot determine 1h trend')
-                result['passed'] = True  # Skip
-                self.validation_result['checks'][check_name] = result
-                return
-
-            # Check alignment
-            if self.signal_direction == 'BUY':
-                if hour_trend == 'BULLISH':
-                    result['details'].append('✅ Multi-TF Align: 15m BUY + 1h BULLISH')
-                    result['passed'] = True
-                    self.validation_result['score'] += 1
-                else:
-                    result['details'].append('❌ Multi-TF Conflict: 15m BUY but 1h BEARISH')
-                    result['passed'] = False
-
-            elif self.signal_direction == 'SELL':
-                if hour_trend == 'BEARISH':
-                    result['details'].append('✅ Multi-TF Align: 15m SELL + 1h BEARISH')
-                    result['passed'] = True
-                    self.validation_result['score'] += 1
-                else:
-                    result['details'].append('❌ Multi-TF Conflict: 15m SELL but 1h BULLISH')
-                    result['passed'] = False
-
+            # Rename columns to lowercase for consistency
+            df.columns = [col.lower() for col in df.columns]
+            return df
         except Exception as e:
-            logger.error(f"Multi-TF alignment check failed: {e}")
-            result['details'].append(f'Error: {str(e)}')
-            result['passed'] = True  # Don't fail on error
-
-        self.validation_result['checks'][check_name] = result
+            logger.error(f"Failed to fetch {interval} data for {self.symbol}: {e}")
+            return None
 
     def _calculate_final_decision(self) -> None:
         """
         Calculate final decision based on scoring.
-        Requirement: 4 / 5 checks must pass for approval.
+        Requirement: `required_passes` checks (default 4) must pass for approval.
         """
         score = self.validation_result['score']
         max_score = self.validation_result['max_score']
@@ -622,9 +424,10 @@ class SignalValidator:
         )
 
         self.validation_result['metadata']['checks_passed'] = passed_count
-        self.validation_result['metadata']['required_passes'] = 4
+        required = self.thresholds['required_passes']
+        self.validation_result['metadata']['required_passes'] = required
 
-        if passed_count >= 4:
+        if passed_count >= required:
             self.validation_result['valid'] = True
             self.validation_result['metadata']['decision'] = 'APPROVED'
             self.validation_result['metadata']['reason'] = (
@@ -634,33 +437,127 @@ class SignalValidator:
             self.validation_result['valid'] = False
             self.validation_result['metadata']['decision'] = 'REJECTED'
             self.validation_result['metadata']['reason'] = (
-                f'Only {passed_count}/5 checks passed (need 4 minimum) - Signal not confirmed'
+                f'Only {passed_count}/5 checks passed (need {required} minimum) - Signal not confirmed'
             )
 
-    def _calculate_vwap(self, df: pd.DataFrame) -> pd.Series:
-        """
-        Simple VWAP calculation: (High + Low + Close) * Volume / 3 / Volume SMA
-        """
-        try:
-            typical_price = (df['high'] + df['low'] + df['close']) / 3
-            tp_vol = typical_price * df['volume']
-            vwap = tp_vol.rolling(window=20).sum() / df['volume'].rolling(window=20).sum()
-            return vwap
-        except Exception as e:
-            logger.warning(f"VWAP calculation failed: {e}")
-            return pd.Series([None] * len(df), index=df.index)
 
+def apply_timeout_policy(result: Dict[str, Any], symbol: str, direction: str,
+                         policy: str = 'reject') -> Dict[str, Any]:
+    """
+    Decide the outcome of a validation that ran out of time.
 
-def validate_signal(symbol: str, direction: str) -> Dict[str, Any]:
+    reject:         reject the signal
+    approve_cached: use the newest stored decision for the symbol and
+                    direction (no checks are re-run, so this is safe to call
+                    on the event loop), reject if there is none
+    skip:           approve as if validation were disabled
+    """
+    if policy not in TIMEOUT_POLICIES:
+        policy = 'reject'
+    metrics.incr(f'validation.timeout_policy.{policy}')
+    meta = result.setdefault('metadata', {})
+    meta['timed_out'] = True
+    meta['timeout_policy'] = policy
+
+    if policy == 'approve_cached':
+        cached = validation_memo.latest(symbol.upper(), direction.upper())
+        if cached is not None:
+            cached['metadata'].update({k: v for k, v in meta.items() if k not in cached['metadata']})
+            cached['metadata']['cached_fallback'] = True
+            return cached
+        meta['reason'] = 'Validation timed out and no cached decision available'
+        result['valid'] = False
+        meta['decision'] = 'REJECTED'
+        return result
+
+    if policy == 'skip':
+        result['valid'] = True
+        meta['decision'] = 'SKIPPED'
+        meta['reason'] = 'Validation timed out - checks skipped'
+        return result
+
+    result['valid'] = False
+    meta['decision'] = 'REJECTED'
+    meta['reason'] = 'Validation timed out - signal not confirmed'
+    return result
+
+
+def timed_out_result(symbol: str, direction: str, budget_ms: int = None,
+                     policy: str = 'reject') -> Dict[str, Any]:
+    """Result for a validation abandoned at the hard ceiling, with every check timed out."""
+    validator = SignalValidator(symbol, direction)
+    for check_name in CHECK_NAMES:
+        validator._mark_timed_out(check_name)
+    result = validator.validation_result
+    result['metadata']['budget_ms'] = budget_ms
+    return apply_timeout_policy(result, symbol, direction, policy)
+
+
+def _validate_uncached(symbol: str, direction: str, start: float, budget_ms: int,
+                       timeout_policy: str, memo_key: tuple) -> Dict[str, Any]:
+    deadline = start + budget_ms / 1000 if budget_ms else None
+    validator = SignalValidator(symbol, direction, deadline=deadline)
+    result = validator.validate()
+
+    elapsed_ms = (time.monotonic() - start) * 1000
+    metrics.observe('validation.latency_ms', elapsed_ms)
+    meta = result['metadata']
+    meta['memo_hit'] = False
+    meta['elapsed_ms'] = round(elapsed_ms, 1)
+    if budget_ms:
+        meta['budget_ms'] = budget_ms
+        if elapsed_ms > budget_ms:
+            meta['budget_overrun_ms'] = round(elapsed_ms - budget_ms, 1)
+            metrics.incr('validation.budget_overruns')
+
+    if meta.get('timed_out'):
+        metrics.incr('validation.timeouts')
+        return apply_timeout_policy(result, symbol, direction, timeout_policy)
+
+    # Only complete decisions are reusable; failed fetches should be retried
+    if meta.get('decision'):
+        validation_memo.put(memo_key, result)
+    return result
+
+
+def validate_signal(symbol: str, direction: str, budget_ms: int = None,
+                    timeout_policy: str = 'reject', details: bool = False,
+                    queued_at: float = None) -> Dict[str, Any]:
     """
     Convenience function to validate a single signal.
     
     Args:
         symbol: Stock ticker
         direction: 'BUY' or 'SELL'
+        budget_ms: latency budget; checks not started in time are marked timed out
+        timeout_policy: one of TIMEOUT_POLICIES, applied when the budget runs out
+        details: render human-readable detail lines for every check
+        queued_at: time.monotonic() when the caller submitted the work; time spent
+            queued for a worker counts against the budget
         
     Returns:
         Validation result dict with all checks and decision
     """
-    validator = SignalValidator(symbol, direction)
-    return validator.validate()
+    start = queued_at if queued_at is not None else time.monotonic()
+    symbol, direction = symbol.upper(), direction.upper()
+    memo_key = (symbol, direction) + bar_keys()
+    result = validation_memo.get(memo_key)
+    if result is not None:
+        metrics.incr('validation.memo_hits')
+        result['metadata']['memo_hit'] = True
+        result['metadata']['elapsed_ms'] = round((time.monotonic() - start) * 1000, 3)
+        return describe_result(result, direction) if details else result
+    metrics.incr('validation.memo_misses')
+
+    # Callers validating the same symbol/direction/bar concurrently share one run; the
+    # budget and timeout policy shape a timed-out result, so they are part of the key
+    try:
+        result = validation_flight.do(
+            memo_key + (budget_ms, timeout_policy),
+            lambda: _validate_uncached(symbol, direction, start, budget_ms, timeout_policy, memo_key),
+            timeout=max(0.0, start + budget_ms / 1000 - time.monotonic()) if budget_ms else None,
+        )
+    except TimeoutError:
+        metrics.incr('validation.timeouts')
+        result = timed_out_result(symbol, direction, budget_ms, timeout_policy)
+    return describe_result(result, direction) if details else result
@@ -0,0 +1,98 @@
+"""
+Per-Trade PnL
+Materializes the realized PnL of every filled trade into trade_pnl as the
+position ledger books it, so charts and trade lists read indexed rows
+instead of replaying the FIFO books.
+
+Realized PnL of a trade never changes once booked. The unrealized part (lots
+the trade opened that are still open, at the symbol's latest mark) is
+refreshed separately: for symbols that trade when their fills are written,
+and for symbols whose mark moved by the position ledger's background thread.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.models.trade_pnl import TradePnl
+
+logger = logging.getLogger(__name__)
+
+
+class TradePnlBook:
+    """Booked trades not yet written to trade_pnl, plus cumulative realized per symbol."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.cum_realized: Dict[str, float] = {}
+        # Trades up to since_id were booked before a checkpoint the book was restored from
+        self.since_id = 0
+        self._pending: List[dict] = []
+
+    def restore(self, realized: Dict[str, float], last_id: int) -> None:
+        """Seed with a checkpoint's cumulative realized PnL per symbol."""
+        self.cum_realized = {sym: round(v, 6) for sym, v in realized.items()}
+        self.since_id = last_id
+
+    def add(self, t, realized: float) -> None:
+        cum = round(self.cum_realized.get(t.symbol, 0.0) + realized, 6)
+        self.cum_realized[t.symbol] = cum
+        self._pending.append({
+            'trade_id': t.id, 'symbol': t.symbol, 'timestamp': t.timestamp,
+            'realized': round(realized, 6), 'cum_realized': cum, 'unrealized': 0.0,
+        })
+
+    def flush(self, db: Session, book, replace: bool = False, marks: Optional[Dict[str, float]] = None) -> int:
+        """
+        Write booked trades and refresh unrealized PnL of the symbols they touch.
+        replace=True (after a full replay, when every trade after since_id is
+        booked) compares against the table: only new or changed trades are
+        written and trades no longer filled are deleted.
+        """
+        rows, symbols = self._pending, {r['symbol'] for r in self._pending}
+        try:
+            if replace:
+                stored = {r.trade_id: (r.symbol, r.realized, r.cum_realized) for r in
+                          db.query(TradePnl.trade_id, TradePnl.symbol, TradePnl.realized, TradePnl.cum_realized)
+                          .filter(TradePnl.trade_id > self.since_id)}
+                booked = {r['trade_id']: r for r in rows}
+                stale = set(stored) - set(booked)
+                if stale:
+                    db.query(TradePnl).filter(TradePnl.trade_id.in_(stale)).delete(synchronize_session=False)
+                db.bulk_insert_mappings(TradePnl, [r for tid, r in booked.items() if tid not in stored])
+                rows = [r for tid, r in booked.items()
+                        if tid in stored and stored[tid] != (r['symbol'], r['realized'], r['cum_realized'])]
+                symbols = set(book.books)
+            for row in rows:
+                db.merge(TradePnl(**row))
+            self.refresh_unrealized(db, book, symbols, marks)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to persist trade PnL")
+            return 0
+        written = len(self._pending)
+        self._pending = []
+        return written
+
+    def refresh_unrealized(self, db: Session, book, symbols: Iterable[str],
+                           marks: Optional[Dict[str, float]] = None) -> None:
+        """Set unrealized PnL of open lots at the mark (default: last fill price); zero it for closed ones."""
+        for symbol in symbols:
+            lp = (marks or {}).get(symbol) or book.last_price.get(symbol)
+            open_lots = defaultdict(float)
+            if lp is not None:
+                for lot in book.books.get(symbol, ()):
+                    open_lots[lot.get('trade_id')] += round(book.lot_unrealized(lot, lp), 6)
+            db.query(TradePnl).filter(
+                TradePnl.symbol == symbol,
+                TradePnl.unrealized != 0,
+                TradePnl.trade_id.notin_(list(open_lots)),
+            ).update({'unrealized': 0.0}, synchronize_session=False)
+            for trade_id, unrealized in open_lots.items():
+                db.query(TradePnl).filter(TradePnl.trade_id == trade_id) \
+                    .update({'unrealized': round(unrealized, 6)}, synchronize_session=False)
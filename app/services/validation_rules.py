@@ -0,0 +1,382 @@
+"""
+Validation Rules
+Declarative spec of the signal validation checks and a compiler that turns it
+into a vectorized evaluator over indicator arrays.
+
+The same compiled rules serve live validation (arrays of length 1, the
+latest bar), backtests and threshold sweeps (one element per historical bar).
+
+Spec format, per rule:
+    name:      check name reported in results
+    weight:    score added when the rule scores
+    requires:  indicators that must exist for the rule to run (else it is skipped)
+    pass:      conditions in disjunctive normal form: a list of groups, the rule
+               passes when every condition of any group holds. Either a list
+               (both directions) or a dict keyed by 'BUY' / 'SELL'.
+    score:     same format; when the rule adds to the score (defaults to `pass`)
+    error:     message added to the result errors when the rule fails
+    warnings:  (key, condition, message template) raised when the condition holds
+
+A condition is (indicator, op, operand) with op one of > >= < <=, or
+(indicator, 'isnan'). The operand is an indicator name, a number, or a
+threshold reference written '$name' (looked up in DEFAULT_THRESHOLDS or the
+overrides passed at evaluation time).
+
+Human-readable details are not produced by evaluation; describe_check()
+renders them from the indicator values stored on the result when needed.
+"""
+
+from typing import Dict, Any, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+import ta
+
+from app.services.bar_store import index_to_ns
+
+logger = logging.getLogger(__name__)
+
+# Thresholds used by the validator rules; backtests and sweeps start from these
+DEFAULT_THRESHOLDS = {
+    'spike_pct': 3.0,          # abnormal move vs previous close (warning only)
+    'max_age_min': 20,         # data freshness window (warning only)
+    'rsi_buy_low': 55.0,
+    'rsi_buy_high': 70.0,
+    'rsi_sell_low': 30.0,
+    'rsi_sell_high': 45.0,
+    'body_ratio': 0.6,         # candle body as fraction of range
+    'doji_ratio': 0.1,
+    'volume_ratio': 1.2,       # volume vs 20-bar average (adds score, never fails)
+    'required_passes': 4,
+}
+
+RULES = [
+    {
+        # 1. Price: valid, positive close inside the bar range
+        'name': 'price_confirmation',
+        'weight': 1,
+        'pass': [[('close', '>', 0), ('high', '>=', 'close'), ('low', '<=', 'close')]],
+        'error': 'Invalid price data',
+        'warnings': [
+            ('stale_warning', ('age_min', '>', '$max_age_min'), 'Price data is {age_min:.1f} min old'),
+            ('spike_warning', ('move_pct', '>', '$spike_pct'), 'Price moved {move_pct:.2f}% since last candle'),
+        ],
+    },
+    {
+        # 2. Trend: EMA stack (only once 200 bars exist) OR price vs VWAP
+        'name': 'trend_confirmation',
+        'weight': 1,
+        'pass': {
+            'BUY': [[('history_len', '>=', 200), ('close', '>', 'ema_20'), ('ema_20', '>', 'ema_50')],
+                    [('close', '>', 'vwap')]],
+            'SELL': [[('history_len', '>=', 200), ('close', '<', 'ema_20'), ('ema_20', '<', 'ema_50')],
+                     [('close', '<', 'vwap')]],
+        },
+        'warnings': [
+            ('short_history_warning', ('history_len', '<', 200), 'Insufficient candles for full trend analysis'),
+        ],
+    },
+    {
+        # 3. Momentum: RSI band and MACD vs signal with histogram sign
+        'name': 'momentum_confirmation',
+        'weight': 1,
+        'pass': {
+            'BUY': [[('rsi', '>=', '$rsi_buy_low'), ('rsi', '<=', '$rsi_buy_high'),
+                     ('macd', '>', 'macd_signal'), ('macd_diff', '>', 0)]],
+            'SELL': [[('rsi', '>=', '$rsi_sell_low'), ('rsi', '<=', '$rsi_sell_high'),
+                      ('macd', '<', 'macd_signal'), ('macd_diff', '<', 0)]],
+        },
+    },
+    {
+        # 4. Candle strength: strong body, not a doji, not long wicks on both sides
+        'name': 'candle_strength',
+        'weight': 1,
+        'pass': [[('range', '>', 0), ('body_ratio', '>=', '$body_ratio'), ('body_ratio', '>=', '$doji_ratio'),
+                  ('min_wick', '<=', 'body')]],
+    },
+    {
+        # 5. Volume: never fails, elevated volume only adds score
+        'name': 'volume_confirmation',
+        'weight': 1,
+        'pass': [[]],
+        'score': [[('history_len', '>=', 20), ('vol_sma20', '>', 0), ('vol_ratio', '>=', '$volume_ratio')]],
+    },
+    {
+        # 6. Multi-timeframe: 1h EMA50 slope agrees; passes when it cannot be judged
+        'name': 'multitf_alignment',
+        'weight': 1,
+        'requires': ('hour_ema_50',),
+        'pass': {
+            'BUY': [[('hour_len', '<', 50)], [('hour_ema_50', 'isnan')],
+                    [('hour_ema_50', '>', 'hour_ema_50_prev')]],
+            'SELL': [[('hour_len', '<', 50)], [('hour_ema_50', 'isnan')],
+                     [('hour_ema_50', '<=', 'hour_ema_50_prev')]],
+        },
+        'score': {
+            'BUY': [[('hour_len', '>=', 50), ('hour_ema_50', '>', 'hour_ema_50_prev')]],
+            'SELL': [[('hour_len', '>=', 50), ('hour_ema_50', '<=', 'hour_ema_50_prev')]],
+        },
+    },
+]
+
+# Bar widths in ns, for lining 1h bars up with the 15m bars they had closed by
+BAR_15M_NS = 15 * 60 * 10**9
+BAR_1H_NS = 60 * 60 * 10**9
+
+_OPS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+}
+
+
+def compute_indicators(df_15m: pd.DataFrame, df_1h: Optional[pd.DataFrame] = None) -> Dict[str, np.ndarray]:
+    """
+    Compute every indicator the rules reference as float64 arrays aligned to the 15m bars.
+    Threshold-independent, so it can be computed once and reused across sweeps.
+    """
+    close = df_15m['close'].astype('float64')
+    high = df_15m['high'].astype('float64')
+    low = df_15m['low'].astype('float64')
+    open_ = df_15m['open'].astype('float64')
+    volume = df_15m['volume'].astype('float64')
+    n = len(df_15m)
+
+    macd = ta.trend.MACD(close)
+    typical = (high + low + close) / 3
+    vwap = (typical * volume).rolling(window=20).sum() / volume.rolling(window=20).sum()
+    vol_sma20 = volume.rolling(window=20).mean()
+    prev_close = close.shift(1)
+    rng = high - low
+    body = (close - open_).abs()
+    upper_wick = high - np.maximum(open_, close)
+    lower_wick = np.minimum(open_, close) - low
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ind = {
+            'close': close.to_numpy(),
+            'high': high.to_numpy(),
+            'low': low.to_numpy(),
+            'open': open_.to_numpy(),
+            'prev_close': prev_close.to_numpy(),
+            'move_pct': ((close - prev_close).abs() / prev_close * 100).to_numpy(),
+            'ema_20': ta.trend.ema_indicator(close, window=20).to_numpy(),
+            'ema_50': ta.trend.ema_indicator(close, window=50).to_numpy(),
+            'ema_200': ta.trend.ema_indicator(close, window=200).to_numpy(),
+            'vwap': vwap.to_numpy(),
+            'rsi': ta.momentum.rsi(close, window=14).to_numpy(),
+            'macd': macd.macd().to_numpy(),
+            'macd_signal': macd.macd_signal().to_numpy(),
+            'macd_diff': macd.macd_diff().to_numpy(),
+            'range': rng.to_numpy(),
+            'body': body.to_numpy(),
+            'body_ratio': (body / rng).to_numpy(),
+            'min_wick': np.minimum(upper_wick, lower_wick).to_numpy(),
+            'volume': volume.to_numpy(),
+            'vol_sma20': vol_sma20.to_numpy(),
+            'vol_ratio': (volume / vol_sma20).to_numpy(),
+            # Number of bars the live validator would have seen at each bar
+            'history_len': np.arange(1, n + 1, dtype='float64'),
+        }
+
+    if df_1h is not None and not df_1h.empty:
+        close_1h = df_1h['close'].astype('float64')
+        ema_1h = ta.trend.ema_indicator(close_1h, window=50).to_numpy()
+        # Latest 1h bar that had closed by the close of each 15m bar: a forming hour
+        # would carry closes from later 15m bars into the past (lookahead in backtests)
+        closed_by = index_to_ns(df_15m.index) + BAR_15M_NS - BAR_1H_NS
+        idx = np.searchsorted(index_to_ns(df_1h.index), closed_by, side='right') - 1
+        valid = idx >= 0
+        safe = np.where(valid, idx, 0)
+        prev = np.where(safe > 0, safe - 1, 0)
+        ind['hour_len'] = np.where(valid, idx + 1, 0).astype('float64')
+        ind['hour_ema_50'] = np.where(valid, ema_1h[safe], np.nan)
+        ind['hour_ema_50_prev'] = np.where(valid & (idx > 0), ema_1h[prev], np.nan)
+    return ind
+
+
+def _for_direction(groups, direction: str):
+    return groups.get(direction, []) if isinstance(groups, dict) else groups
+
+
+def _conditions(rule: Dict[str, Any], direction: str):
+    """Every condition a rule evaluates for `direction`, in spec order."""
+    for key in ('pass', 'score'):
+        for group in _for_direction(rule.get(key, []), direction):
+            yield from group
+    for _, cond, _ in rule.get('warnings', []):
+        yield cond
+
+
+def _available(cond, ind: Dict[str, np.ndarray]) -> bool:
+    names = [cond[0]] + [v for v in cond[2:] if isinstance(v, str) and not v.startswith('$')]
+    return all(name in ind for name in names)
+
+
+def _operand(value, ind: Dict[str, np.ndarray], th: Dict[str, Any]):
+    if isinstance(value, str):
+        return th[value[1:]] if value.startswith('$') else ind[value]
+    return value
+
+
+def _compile_condition(cond):
+    left, op = cond[0], cond[1]
+    if op == 'isnan':
+        return lambda ind, th: np.isnan(ind[left])
+    fn, right = _OPS[op], cond[2]
+    return lambda ind, th: fn(ind[left], _operand(right, ind, th))
+
+
+def _compile_dnf(groups):
+    compiled = [[_compile_condition(c) for c in group] for group in groups]
+
+    def run(ind, th, n):
+        out = np.zeros(n, dtype=bool)
+        for group in compiled:
+            term = np.ones(n, dtype=bool)
+            for cond in group:
+                term &= cond(ind, th)
+            out |= term
+        return out
+    return run
+
+
+class CompiledRules:
+    """Rule spec for one direction, compiled to array functions."""
+
+    def __init__(self, direction: str, rules: List[Dict[str, Any]] = None):
+        self.direction = direction.upper()
+        self.rules = rules if rules is not None else RULES
+        self._compiled = []
+        for rule in self.rules:
+            passes = _compile_dnf(_for_direction(rule['pass'], self.direction))
+            scores = _compile_dnf(_for_direction(rule['score'], self.direction)) if 'score' in rule else None
+            warnings = [(key, _compile_condition(cond)) for key, cond, _ in rule.get('warnings', [])]
+            self._compiled.append((rule, passes, scores, warnings))
+
+    def evaluate(self, ind: Dict[str, np.ndarray], thresholds: Dict[str, Any] = None) -> Dict[str, np.ndarray]:
+        """
+        Apply the rules to indicator arrays.
+        Returns a boolean array per check and per warning key, plus
+        'passed_count', 'score' and 'decision'.
+        """
+        th = dict(DEFAULT_THRESHOLDS)
+        th.update(thresholds or {})
+        n = len(ind['close'])
+        out = {'scored': {}}
+        passed_count = np.zeros(n, dtype=int)
+        score = np.zeros(n, dtype=int)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for rule, passes, scores, warnings in self._compiled:
+                if any(k not in ind for k in rule.get('requires', ())):
+                    continue
+                passed = passes(ind, th, n)
+                scored = scores(ind, th, n) if scores else passed
+                out[rule['name']] = passed
+                out['scored'][rule['name']] = scored
+                passed_count += passed
+                score += rule.get('weight', 1) * scored
+                for (key, cond), (_, spec, _) in zip(warnings, rule.get('warnings', [])):
+                    # Warnings on indicators only known live (e.g. data age) are skipped on history
+                    if _available(spec, ind):
+                        out[key] = cond(ind, th)
+        out['passed_count'] = passed_count
+        out['score'] = score
+        out['decision'] = passed_count >= th['required_passes']
+        return out
+
+
+_compiled_cache: Dict[str, CompiledRules] = {}
+
+
+def compile_rules(direction: str, rules: List[Dict[str, Any]] = None) -> CompiledRules:
+    """Compiled evaluator for `direction`; the default spec is compiled once per direction."""
+    direction = direction.upper()
+    if rules is not None:
+        return CompiledRules(direction, rules)
+    if direction not in _compiled_cache:
+        _compiled_cache[direction] = CompiledRules(direction)
+    return _compiled_cache[direction]
+
+
+def decision_thresholds(direction: str, rules: List[Dict[str, Any]] = None) -> List[str]:
+    """
+    Thresholds that can change the decision for `direction`: those referenced
+    by pass conditions, plus required_passes. Score-only and warning
+    thresholds never flip a decision.
+    """
+    names = []
+    for rule in (rules if rules is not None else RULES):
+        for group in _for_direction(rule['pass'], direction.upper()):
+            for cond in group:
+                for v in cond[2:]:
+                    if isinstance(v, str) and v.startswith('$') and v[1:] not in names:
+                        names.append(v[1:])
+    return names + ['required_passes']
+
+
+def rule_values(rule: Dict[str, Any], direction: str, ind: Dict[str, np.ndarray], i: int = -1) -> Dict[str, Any]:
+    """Indicator values a rule looked at on bar `i`, as JSON-safe floats (None for NaN)."""
+    names = []
+    for cond in _conditions(rule, direction):
+        for name in (cond[0], cond[2] if len(cond) > 2 else None):
+            if isinstance(name, str) and not name.startswith('$') and name in ind and name not in names:
+                names.append(name)
+    values = {}
+    for name in names:
+        v = float(ind[name][i])
+        values[name] = None if np.isnan(v) else v
+    return values
+
+
+def _scalar(value, values: Dict[str, Any], th: Dict[str, Any]) -> float:
+    if isinstance(value, str):
+        v = th.get(value[1:]) if value.startswith('$') else values.get(value)
+    else:
+        v = value
+    return np.nan if v is None else float(v)
+
+
+def _describe_condition(cond, values: Dict[str, Any], th: Dict[str, Any]) -> str:
+    left = _scalar(cond[0], values, th)
+    if cond[1] == 'isnan':
+        return f"✅ {cond[0]} not available" if np.isnan(left) else f"❌ {cond[0]} = {left:.4f}"
+    right = _scalar(cond[2], values, th)
+    with np.errstate(invalid='ignore'):
+        ok = bool(_OPS[cond[1]](left, right))
+    mark = '✅' if ok else '❌'
+    if not isinstance(cond[2], str):
+        return f"{mark} {cond[0]} {left:.4f} {cond[1]} {cond[2]}"
+    return f"{mark} {cond[0]} {left:.4f} {cond[1]} {cond[2].lstrip('$')} ({right:.4f})"
+
+
+def describe_check(name: str, check: Dict[str, Any], direction: str,
+                   thresholds: Dict[str, Any] = None) -> List[str]:
+    """Human-readable lines for one evaluated check, rendered from its stored values."""
+    rule = next((r for r in RULES if r['name'] == name), None)
+    if rule is None or 'values' not in check:
+        return list(check.get('details', []))
+    th = dict(DEFAULT_THRESHOLDS)
+    th.update(thresholds or {})
+    values = check['values']
+    lines = []
+    for i, group in enumerate(_for_direction(rule['pass'], direction.upper())):
+        if i:
+            lines.append('— or —')
+        lines.extend(_describe_condition(cond, values, th) for cond in group)
+    if 'score' in rule:
+        lines.append('✅ Adds to score' if check.get('scored') else '⚠️ Does not add to score')
+    for key, cond, message in rule.get('warnings', []):
+        if key in check.get('warnings', ()):
+            lines.append('⚠️ ' + message.format(**values))
+    return lines
+
+
+def describe_result(result: Dict[str, Any], direction: str, thresholds: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Fill in the 'details' lines of every check of a validation result (in place)."""
+    for name, check in result.get('checks', {}).items():
+        if not check.get('timed_out'):
+            check['details'] = describe_check(name, check, direction, thresholds)
+    return result
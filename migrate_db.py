@@ -25,7 +25,15 @@ if os.path.exists(db_path):
             print(f"✓ Added executed_price column to trades table")
         else:
             print(f"✓ Column executed_price already exists")
-        
+
+        if 'validation_id' not in columns:
+            cursor.execute("ALTER TABLE trades ADD COLUMN validation_id INTEGER REFERENCES validation_results(id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_trades_validation_id ON trades (validation_id)")
+            conn.commit()
+            print(f"✓ Added validation_id column to trades table")
+        else:
+            print(f"✓ Column validation_id already exists")
+
         conn.close()
     except Exception as e:
         print(f"Error migrating trades table: {e}")
@@ -51,9 +59,125 @@ if os.path.exists(db_path):
                 print(f"✓ Added enable_signal_validation column to trade_settings table")
             else:
                 print(f"✓ Column enable_signal_validation already exists")
+
+            if 'validation_timeout_ms' not in columns:
+                cursor.execute("ALTER TABLE trade_settings ADD COLUMN validation_timeout_ms INTEGER DEFAULT 3000")
+                conn.commit()
+                print(f"✓ Added validation_timeout_ms column to trade_settings table")
+            else:
+                print(f"✓ Column validation_timeout_ms already exists")
+
+            if 'validation_timeout_policy' not in columns:
+                cursor.execute("ALTER TABLE trade_settings ADD COLUMN validation_timeout_policy VARCHAR DEFAULT 'reject'")
+                conn.commit()
+                print(f"✓ Added validation_timeout_policy column to trade_settings table")
+            else:
+                print(f"✓ Column validation_timeout_policy already exists")
+
+            if 'max_portfolio_var' not in columns:
+                cursor.execute("ALTER TABLE trade_settings ADD COLUMN max_portfolio_var FLOAT DEFAULT 0")
+                conn.commit()
+                print(f"✓ Added max_portfolio_var column to trade_settings table")
+            else:
+                print(f"✓ Column max_portfolio_var already exists")
         else:
             print("✓ trade_settings table will be created on first run")
         
         conn.close()
     except Exception as e:
         print(f"Error migrating trade_settings table: {e}")
+
+# Migrate open_orders table
+print("\nMigrating open_orders table...")
+if os.path.exists(db_path):
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='open_orders'")
+        if cursor.fetchone():
+            cursor.execute("PRAGMA table_info(open_orders)")
+            columns = [col[1] for col in cursor.fetchall()]
+
+            if 'status' not in columns:
+                cursor.execute("ALTER TABLE open_orders ADD COLUMN status VARCHAR")
+                conn.commit()
+                print(f"✓ Added status column to open_orders table")
+            else:
+                print(f"✓ Column status already exists")
+
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_open_orders_pending ON open_orders (symbol, side, filled_at)")
+            conn.commit()
+            print(f"✓ Index ix_open_orders_pending present")
+        else:
+            print("✓ open_orders table will be created on first run")
+
+        conn.close()
+    except Exception as e:
+        print(f"Error migrating open_orders table: {e}")
+
+# Migrate pnl_checkpoints table
+print("\nMigrating pnl_checkpoints table...")
+if os.path.exists(db_path):
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='pnl_checkpoints'")
+        if cursor.fetchone():
+            cursor.execute("PRAGMA table_info(pnl_checkpoints)")
+            columns = [col[1] for col in cursor.fetchall()]
+
+            if 'checksum' not in columns:
+                cursor.execute("ALTER TABLE pnl_checkpoints ADD COLUMN checksum VARCHAR")
+                # Checkpoints without a checksum can't be verified; they are rewritten on the next fill
+                cursor.execute("DELETE FROM pnl_checkpoints")
+                conn.commit()
+                print(f"✓ Added checksum column to pnl_checkpoints table")
+            else:
+                print(f"✓ Column checksum already exists")
+        else:
+            print("✓ pnl_checkpoints table will be created on first run")
+
+        conn.close()
+    except Exception as e:
+        print(f"Error migrating pnl_checkpoints table: {e}")
+
+# Move legacy validation_data JSON blobs into validation_results
+print("\nMigrating validation results...")
+if os.path.exists(db_path):
+    try:
+        import json
+        from sqlalchemy import create_engine
+        from app.models.validation_result import ValidationResult
+
+        ValidationResult.__table__.create(bind=create_engine(f"sqlite:///{db_path}"), checkfirst=True)
+
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        rows = cursor.execute(
+            "SELECT id, symbol, side, timestamp, validation_data FROM trades "
+            "WHERE validation_data IS NOT NULL AND validation_id IS NULL"
+        ).fetchall()
+        for trade_id, symbol, side, ts, data in rows:
+            try:
+                result = json.loads(data)
+            except ValueError:
+                continue
+            cols = ValidationResult.columns_from_result(result)
+            cols.update({'symbol': symbol, 'direction': side, 'created_at': ts})
+            cursor.execute(
+                f"INSERT INTO validation_results ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                list(cols.values()),
+            )
+            cursor.execute(
+                "UPDATE trades SET validation_id = ?, validation_data = NULL WHERE id = ?",
+                (cursor.lastrowid, trade_id),
+            )
+        conn.commit()
+        if rows:
+            cursor.execute("VACUUM")
+        print(f"✓ Moved {len(rows)} validation blobs to validation_results")
+        conn.close()
+    except Exception as e:
+        print(f"Error migrating validation results: {e}")
@@ -0,0 +1,25 @@
+import argparse
+import time
+
+from app.services.backtest import backtest_symbol
+
+parser = argparse.ArgumentParser(description='Backtest the SignalValidator rules on stored bars')
+parser.add_argument('symbol')
+parser.add_argument('--direction', default='BUY', choices=['BUY', 'SELL'])
+parser.add_argument('--start', default=None)
+parser.add_argument('--end', default=None)
+parser.add_argument('--simulate', action='store_true', help='simulate fills and FIFO PnL')
+parser.add_argument('--hold-bars', type=int, default=4)
+args = parser.parse_args()
+
+started = time.perf_counter()
+res = backtest_symbol(args.symbol.upper(), args.direction, start=args.start, end=args.end,
+                      simulate=args.simulate, hold_bars=args.hold_bars)
+elapsed = time.perf_counter() - started
+
+print(f"{args.symbol.upper()} {args.direction}: {res['bars']} bars, {res['approved']} approved "
+      f"({res['approval_rate'] * 100:.1f}%) in {elapsed:.2f}s")
+if args.simulate:
+    sim = res['simulation']
+    hit = f"{sim['hit_rate'] * 100:.1f}%" if sim['hit_rate'] is not None else '-'
+    print(f"Simulated trades: {sim['trades']}, hit rate: {hit}, realized PnL: {sim['realized']:.2f}")
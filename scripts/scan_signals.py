@@ -0,0 +1,36 @@
+import argparse
+import time
+
+from app.services.scanner import scanner, load_universe
+
+parser = argparse.ArgumentParser(description='Rank a universe of symbols by validation score')
+parser.add_argument('symbols', nargs='*', help='symbols to scan (default: configured universe)')
+parser.add_argument('--file', default=None, help='file with one symbol per line')
+parser.add_argument('--no-refresh', action='store_true', help='use stored bars only (no downloads)')
+parser.add_argument('--workers', type=int, default=None, help='process count (default: all cores)')
+parser.add_argument('--top', type=int, default=20)
+
+# Guarded so process-pool workers that re-import this module do not rerun the scan
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.file:
+        with open(args.file) as f:
+            symbols = [line.split('#', 1)[0].strip().upper() for line in f if line.split('#', 1)[0].strip()]
+    else:
+        symbols = [s.upper() for s in args.symbols] or load_universe()
+    if not symbols:
+        parser.error('no symbols given and no SCANNER_UNIVERSE configured')
+
+    started = time.perf_counter()
+    results = scanner.scan(symbols, refresh=not args.no_refresh, workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(symbols)} symbols in {elapsed:.2f}s")
+    for r in results[:args.top]:
+        if 'error' in r:
+            print(f"{r['symbol']:<8} {r['error']}")
+            continue
+        best = r[r['best_direction']]
+        flag = 'APPROVED' if best['approved'] else ''
+        print(f"{r['symbol']:<8} {r['best_direction']:<4} score={best['score']} "
+              f"passed={best['checks_passed']} close={r['close']:.2f} {flag}")
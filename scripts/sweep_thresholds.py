@@ -0,0 +1,31 @@
+import argparse
+import time
+
+from app.services.param_sweep import sweep_symbol, grid, random_search
+
+parser = argparse.ArgumentParser(description='Sweep SignalValidator thresholds on stored bars')
+parser.add_argument('symbol')
+parser.add_argument('--direction', default='BUY', choices=['BUY', 'SELL'])
+parser.add_argument('--start', default=None)
+parser.add_argument('--end', default=None)
+parser.add_argument('--random', type=int, default=0, help='sample N random configurations instead of the full grid')
+parser.add_argument('--workers', type=int, default=None, help='process count (default: all cores)')
+parser.add_argument('--hold-bars', type=int, default=4)
+parser.add_argument('--rank-by', default='pnl', choices=['pnl', 'hit_rate'])
+parser.add_argument('--top', type=int, default=10)
+
+# Guarded so process-pool workers that re-import this module do not rerun the sweep
+if __name__ == '__main__':
+    args = parser.parse_args()
+    configs = (random_search(n=args.random, direction=args.direction) if args.random
+               else grid(direction=args.direction))
+    started = time.perf_counter()
+    results = sweep_symbol(args.symbol.upper(), args.direction, start=args.start, end=args.end,
+                           configs=configs, workers=args.workers, hold_bars=args.hold_bars,
+                           rank_by=args.rank_by)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(configs)} configurations in {elapsed:.2f}s")
+    for r in results[:args.top]:
+        hit = f"{r['hit_rate'] * 100:.1f}%" if r['hit_rate'] is not None else '-'
+        print(f"pnl={r['pnl']:>10.2f} hit={hit:>6} trades={r['trades']:>5} {r['params']}")
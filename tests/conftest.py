@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite file before app.config is imported, so
+# tests that clear tables never touch the tracked trades.db
+_db_dir = tempfile.mkdtemp(prefix='trades-test-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'trades.db')}"
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _schema():
+    from app.database import Base, engine
+    import app.main  # noqa: F401  registers every model
+    Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
@@ -0,0 +1,48 @@
+from app.services.backtest import run_backtest
+from app.services.resample import resample_bars
+from app.services.signal_validation import SignalValidator
+import numpy as np
+import pandas as pd
+
+
+def make_frames(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2025-10-01 09:30', periods=n, freq='15min', tz='America/New_York')
+    close = 100 + np.cumsum(rng.normal(0.05, 0.6, n))
+    open_ = close - rng.normal(0.1, 0.5, n)
+    high = np.maximum(open_, close) + rng.uniform(0, 0.4, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.4, n)
+    volume = rng.uniform(500, 2000, n)
+    df_15m = pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+    return df_15m, resample_bars(df_15m, minutes=60)
+
+
+def live_decision(df_15m, df_1h, direction):
+    return SignalValidator('SIM', direction).evaluate(df_15m, df_1h)
+
+
+def test_backtest_matches_live_validator_per_bar():
+    df_15m, df_1h = make_frames()
+    for direction in ('BUY', 'SELL'):
+        bt = run_backtest(df_15m, df_1h, direction)
+        assert len(bt['decision']) == len(df_15m)
+        for i in (60, 150, 210, 305, len(df_15m) - 1):
+            hist = df_15m.iloc[:i + 1]
+            # Only hours that had finished by the close of bar i
+            hist_1h = df_1h[df_1h.index + pd.Timedelta(minutes=60) <= hist.index[-1] + pd.Timedelta(minutes=15)]
+            live = live_decision(hist, hist_1h, direction)
+            assert bt['passed_count'][i] == live['metadata']['checks_passed'], (direction, i)
+            assert bool(bt['decision'][i]) == live['valid'], (direction, i)
+            assert bt['score'][i] == live['score'], (direction, i)
+
+
+def test_backtest_simulation_uses_fifo_pnl():
+    df_15m, df_1h = make_frames()
+    bt = run_backtest(df_15m, df_1h, 'BUY', thresholds={'required_passes': 3}, simulate=True, hold_bars=2)
+    sim = bt['simulation']
+    assert sim['trades'] > 0
+    entries = np.flatnonzero(bt['decision'])
+    entries = entries[entries + 2 < len(df_15m)]
+    close = df_15m['close'].to_numpy()
+    expected = np.sum(close[entries + 2] - close[entries])
+    assert abs(sim['realized'] - expected) < 1e-4
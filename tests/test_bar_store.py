@@ -0,0 +1,45 @@
+from app.services.bar_store import BarStore
+import numpy as np
+import pandas as pd
+
+
+def make_bars(start, n, base=100.0):
+    index = pd.date_range(start, periods=n, freq='15min', tz='America/New_York')
+    close = base + np.arange(n, dtype=float)
+    return pd.DataFrame({
+        'Open': close - 0.5,
+        'High': close + 1.0,
+        'Low': close - 1.0,
+        'Close': close,
+        'Volume': np.full(n, 1000.0),
+    }, index=index)
+
+
+def test_append_and_range_query(tmp_path):
+    store = BarStore(tmp_path)
+    assert store.read('FOO', '15m') is None
+
+    store.append('FOO', '15m', make_bars('2025-12-15 09:30', 8))
+    cols = store.read('FOO', '15m')
+    assert isinstance(cols['close'], np.memmap)
+    assert len(cols['ts']) == 8
+
+    # Range query: [10:00, 10:45) -> 3 bars
+    df = store.read_frame('FOO', '15m',
+                          start=pd.Timestamp('2025-12-15 10:00', tz='America/New_York'),
+                          end=pd.Timestamp('2025-12-15 10:45', tz='America/New_York'))
+    assert list(df['close']) == [102.0, 103.0, 104.0]
+    assert str(df.index.tz) == 'America/New_York'
+
+
+def test_append_replaces_overlapping_tail(tmp_path):
+    store = BarStore(tmp_path)
+    store.append('FOO', '15m', make_bars('2025-12-15 09:30', 8))
+
+    # Newer download overlaps the last three stored bars (last one was still forming)
+    store.append('FOO', '15m', make_bars('2025-12-15 10:45', 4, base=500.0))
+    df = store.read_frame('FOO', '15m')
+    assert len(df) == 9
+    assert df.index.is_monotonic_increasing
+    assert df['close'].iloc[5] == 500.0
+    assert df['close'].iloc[-1] == 503.0
@@ -0,0 +1,42 @@
+from app.services.compute_pool import ComputePool, frame_to_shm, frame_from_shm
+from app.services.signal_validation import SignalValidator
+from test_backtest import make_frames
+
+
+def test_shared_memory_round_trip():
+    df_15m, _ = make_frames(50)
+    shm, spec = frame_to_shm(df_15m)
+    try:
+        out = frame_from_shm(spec)
+    finally:
+        shm.close()
+        shm.unlink()
+    assert out.index.equals(df_15m.index)
+    cols = ['open', 'high', 'low', 'close', 'volume']
+    assert (out[cols].values == df_15m[cols].values).all()
+
+
+def test_pool_matches_inline_evaluation():
+    df_15m, df_1h = make_frames(400)
+    pool = ComputePool(workers=1)
+    try:
+        remote = pool.evaluate('FOO', 'BUY', df_15m, df_1h, remaining=30)
+    finally:
+        pool.shutdown()
+    inline = SignalValidator('FOO', 'BUY').evaluate(df_15m.copy(), df_1h.copy())
+
+    assert remote['valid'] == inline['valid']
+    assert remote['score'] == inline['score']
+    assert {k: v['passed'] for k, v in remote['checks'].items()} == \
+        {k: v['passed'] for k, v in inline['checks'].items()}
+
+
+def test_pool_timeout_marks_all_checks():
+    df_15m, df_1h = make_frames(400)
+    pool = ComputePool(workers=1)
+    try:
+        result = pool.evaluate('FOO', 'BUY', df_15m, df_1h, remaining=0)
+    finally:
+        pool.shutdown()
+    assert result['valid'] is False
+    assert result['metadata']['timed_out'] is True
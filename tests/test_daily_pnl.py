@@ -0,0 +1,78 @@
+from datetime import datetime, date, timezone
+
+from app.config import settings
+from app.database import Base, engine, SessionLocal
+from app.models.daily_pnl import DailyPnl
+from app.models.trade import Trade
+from app.services.daily_pnl import trading_day
+from app.services.ledger import PositionLedger
+
+
+def test_trading_day_boundary(monkeypatch):
+    # 2025-12-16 22:00 UTC is 17:00 in New York
+    ts = datetime(2025, 12, 16, 22, 0, tzinfo=timezone.utc)
+    monkeypatch.setattr(settings, 'EXCHANGE_TZ', 'America/New_York')
+    monkeypatch.setattr(settings, 'TRADING_DAY_START', '00:00')
+    assert trading_day(ts) == date(2025, 12, 16)
+    # 03:00 UTC on the 17th is still the 16th in New York
+    assert trading_day(datetime(2025, 12, 17, 3, 0)) == date(2025, 12, 16)
+
+    monkeypatch.setattr(settings, 'TRADING_DAY_START', '17:00')
+    assert trading_day(ts) == date(2025, 12, 17)
+    assert trading_day(datetime(2025, 12, 16, 21, 59, tzinfo=timezone.utc)) == date(2025, 12, 16)
+
+
+def test_ledger_books_realized_pnl_per_day():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.query(Trade).delete()
+    db.commit()
+
+    now = datetime.utcnow()
+    db.add_all([
+        Trade(symbol='FOO', side='BUY', qty=10, price=10.0, status='Filled', timestamp=datetime(2025, 12, 15, 15, 0)),
+        Trade(symbol='FOO', side='SELL', qty=4, price=12.0, status='Filled', timestamp=datetime(2025, 12, 15, 16, 0)),
+        Trade(symbol='FOO', side='SELL', qty=6, price=7.0, status='Filled', timestamp=now),
+    ])
+    db.commit()
+
+    ledger = PositionLedger(reconcile_s=0)
+    ledger.sync(db)
+    assert ledger.realized_today() == -18.0
+    assert ledger.daily.realized(trading_day(datetime(2025, 12, 15, 16, 0))) == 8.0
+
+    rows = {r.trading_day: r for r in db.query(DailyPnl).all()}
+    assert rows[trading_day(now)].realized == -18.0
+    assert rows[trading_day(now)].fills == 1
+
+    # A new fill is added incrementally and persisted
+    db.add(Trade(symbol='FOO', side='BUY', qty=1, price=5.0, status='Filled', timestamp=now))
+    db.add(Trade(symbol='FOO', side='SELL', qty=1, price=6.0, status='Filled', timestamp=now))
+    db.commit()
+    assert ledger.sync(db) == 2
+    assert ledger.realized_today() == -17.0
+    db.expire_all()
+    assert db.get(DailyPnl, trading_day(now)).realized == -17.0
+
+    db.close()
+
+
+def test_daily_trade_count_uses_trading_day(monkeypatch):
+    from types import SimpleNamespace
+    from app.services.risk import RiskManager
+
+    monkeypatch.setattr(settings, 'EXCHANGE_TZ', 'America/New_York')
+    monkeypatch.setattr(settings, 'TRADING_DAY_START', '00:00')
+    ledger = PositionLedger(reconcile_s=0)
+    # 03:00 UTC on the 17th is an evening fill of the 16th's trading day
+    ledger.daily.add(datetime(2025, 12, 16, 15, 0), 0.0)
+    ledger.daily.add(datetime(2025, 12, 17, 3, 0), 0.0)
+    assert ledger.daily.fills(date(2025, 12, 16)) == 2
+    assert ledger.daily.fills(date(2025, 12, 17)) == 0
+
+    ledger.daily.add(None, 0.0)
+    ledger.daily.add(None, 0.0)
+    rm = RiskManager(ledger=ledger)
+    ok, reason = rm.check_daily_trade_count(None, SimpleNamespace(max_trades_per_day=2))
+    assert not ok and 'max_trades_per_day_exceeded (2 >= 2)' in reason
+    assert rm.check_daily_trade_count(None, SimpleNamespace(max_trades_per_day=3)) == (True, None)
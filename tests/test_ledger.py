@@ -0,0 +1,274 @@
+from app.services.ledger import PositionLedger
+from app.models.trade import Trade
+from app.database import Base, engine, SessionLocal
+import time
+
+
+def create_session():
+    Base.metadata.create_all(bind=engine)
+    return SessionLocal()
+
+
+def test_apply_fill_tracks_position_and_notional():
+    ledger = PositionLedger(reconcile_s=0)
+    ledger.apply_fill('FOO', 'BUY', 10, 10.0)
+    ledger.apply_fill('FOO', 'BUY', 5, 12.0)
+    realized = ledger.apply_fill('FOO', 'SELL', 8, 15.0)
+
+    assert realized == 40.0
+    assert ledger.position('FOO') == 7
+    # open lots at cost: 2@10 and 5@12; exposure marks the 7 shares at the last fill
+    assert ledger.open_notional('FOO') == 80.0
+    assert ledger.total_exposure() == 105.0
+
+    ledger.apply_fill('BAR', 'SELL', 3, 20.0)
+    assert ledger.position('BAR') == -3
+    assert ledger.total_exposure() == 165.0
+
+    # Streamed prices re-mark open positions only
+    ledger.mark('FOO', 20.0)
+    ledger.mark('BAZ', 50.0)
+    assert ledger.position_value('FOO') == 140.0
+    assert ledger.total_exposure() == 200.0
+
+    # Flat again: nothing left exposed, however much was traded
+    ledger.apply_fill('FOO', 'SELL', 7, 20.0)
+    ledger.apply_fill('BAR', 'BUY', 3, 20.0)
+    assert ledger.total_exposure() == 0.0
+
+
+def test_sync_is_incremental_and_rebuilds_after_delete():
+    db = create_session()
+    db.query(Trade).delete()
+    db.commit()
+
+    ledger = PositionLedger(reconcile_s=0)
+    db.add(Trade(symbol='FOO', side='BUY', qty=10, price=10.0, status='Filled'))
+    db.add(Trade(symbol='FOO', side='BUY', qty=99, price=10.0, status='risk_rejected: test'))
+    db.commit()
+    ledger.sync(db)
+    assert ledger.position('FOO') == 10
+
+    # executed_price wins over the alert price
+    db.add(Trade(symbol='FOO', side='SELL', qty=4, price=11.0, executed_price=12.0, status='Filled'))
+    db.commit()
+    assert ledger.sync(db) == 1
+    assert ledger.position('FOO') == 6
+    assert ledger.sync(db) == 0
+
+    # Trades removed under the ledger (dashboard reset) force a rebuild
+    db.query(Trade).delete()
+    db.commit()
+    ledger.sync(db)
+    assert ledger.position('FOO') == 0
+    assert ledger.total_exposure() == 0.0
+
+    db.close()
+
+
+def test_reservations_count_against_limits_until_released():
+    ledger = PositionLedger(reconcile_s=0)
+    ledger.apply_fill('FOO', 'BUY', 10, 10.0)
+
+    first, reason = ledger.reserve('FOO', 'BUY', 60, 10.0, max_position=100, max_exposure=10_000)
+    assert first is not None and reason is None
+    # Fits on its own, but not together with the first order in flight
+    second, reason = ledger.reserve('FOO', 'BUY', 40, 10.0, max_position=100, max_exposure=10_000)
+    assert second is None
+    assert 'position_limit_exceeded' in reason
+
+    # Sells can't promise the same shares twice
+    sell, _ = ledger.reserve('FOO', 'SELL', 8, 10.0, max_position=100, max_exposure=10_000)
+    assert sell is not None
+    again, reason = ledger.reserve('FOO', 'SELL', 8, 10.0, max_position=100, max_exposure=10_000)
+    assert again is None
+    assert 'insufficient_position_to_sell' in reason
+
+    # Filled: the fill lands in the book and the hold is dropped
+    ledger.apply_fill('FOO', 'BUY', 60, 10.0)
+    first.release()
+    sell.release()
+    sell.release()  # releasing twice is harmless
+    assert ledger.reserved_notional == 0.0
+    assert ledger.reserved_buys == {} and ledger.reserved_sells == {}
+    assert ledger.position('FOO') == 70
+
+    _, reason = ledger.reserve('FOO', 'BUY', 40, 10.0, max_position=100, max_exposure=10_000)
+    assert 'position_limit_exceeded' in reason
+    ok, reason = ledger.reserve('FOO', 'BUY', 30, 10.0, max_position=100, max_exposure=900)
+    assert ok is None
+    assert 'total_exposure_exceeded' in reason
+
+
+def test_reducing_orders_always_pass_the_exposure_check():
+    ledger = PositionLedger(reconcile_s=0)
+    ledger.apply_fill('FOO', 'BUY', 100, 100.0)
+
+    # Already over the limit: closing or reducing the long is still allowed
+    closing, reason = ledger.reserve('FOO', 'SELL', 100, 100.0, max_position=1_000, max_exposure=5_000)
+    assert closing is not None and reason is None
+    assert ledger.reserved_notional == 0.0
+    closing.release()
+
+    sell, reason = ledger.reserve('FOO', 'SELL', 100, 100.0, max_position=1_000, max_exposure=15_000)
+    assert sell is not None and reason is None
+
+    # Orders that add to it are still checked, at the order price
+    buy, reason = ledger.reserve('FOO', 'BUY', 60, 100.0, max_position=1_000, max_exposure=15_000)
+    assert buy is None and 'would be 16000.0' in reason
+    buy, reason = ledger.reserve('FOO', 'BUY', 50, 100.0, max_position=1_000, max_exposure=15_000)
+    assert buy is not None
+    assert ledger.reserved_notional == 5_000.0
+
+
+def test_sync_materializes_trade_pnl():
+    from app.models.daily_pnl import DailyPnl
+    from app.models.trade_pnl import TradePnl
+    from app.services.pnl import compute_trade_pnls
+
+    db = create_session()
+    db.query(Trade).delete()
+    db.commit()
+
+    ledger = PositionLedger(reconcile_s=0)
+    db.add(Trade(symbol='FOO', side='BUY', qty=10, price=10.0, status='Filled'))
+    db.add(Trade(symbol='FOO', side='BUY', qty=5, price=12.0, status='Filled'))
+    db.commit()
+    ledger.sync(db)
+    db.add(Trade(symbol='FOO', side='SELL', qty=8, price=15.0, status='Filled'))
+    db.commit()
+    assert ledger.sync(db) == 1
+
+    rows = {p.trade_id: p for p in db.query(TradePnl).all()}
+    expected = compute_trade_pnls(db)
+    assert set(rows) == set(expected)
+    for tid, pnl in expected.items():
+        assert (rows[tid].realized, rows[tid].unrealized, rows[tid].net) == \
+            (pnl['realized'], pnl['unrealized'], pnl['net'])
+    assert [r.cum_realized for _, r in sorted(rows.items())] == [0.0, 0.0, 40.0]
+
+    # Closing the rest zeroes the unrealized of the lots it closes; realized stays put
+    db.add(Trade(symbol='FOO', side='SELL', qty=7, price=11.0, status='Filled'))
+    db.commit()
+    ledger.sync(db)
+    rows = {p.trade_id: p for p in db.query(TradePnl).all()}
+    assert all(r.unrealized == 0.0 for r in rows.values())
+    assert [r.cum_realized for _, r in sorted(rows.items())] == [0.0, 0.0, 40.0, 37.0]
+    assert sum(d.realized for d in db.query(DailyPnl).all()) == 37.0
+
+    # A full rebuild leaves a table that already matches the trades alone
+    ledger.rebuild(db)
+    assert db.query(TradePnl).count() == 4
+
+    db.close()
+
+
+def test_rebuild_writes_only_what_changed():
+    from app.models.daily_pnl import DailyPnl
+    from app.models.trade_pnl import TradePnl
+
+    db = create_session()
+    db.query(Trade).delete()
+    db.query(DailyPnl).delete()
+    db.query(TradePnl).delete()
+    db.commit()
+
+    ledger = PositionLedger(reconcile_s=0)
+    db.add(Trade(symbol='FOO', side='BUY', qty=10, price=10.0, status='Filled'))
+    db.add(Trade(symbol='FOO', side='SELL', qty=4, price=12.0, status='Filled'))
+    db.commit()
+    ledger.sync(db)
+    stamps = {r.trading_day: r.updated_at for r in db.query(DailyPnl).all()}
+    assert stamps
+
+    # Nothing drifted: the reconcile leaves every row as it was
+    assert ledger.reconcile(db) is True
+    db.expire_all()
+    assert {r.trading_day: r.updated_at for r in db.query(DailyPnl).all()} == stamps
+    assert db.query(TradePnl).count() == 2
+
+    # A row nobody booked is dropped, the rest stay
+    db.add(TradePnl(trade_id=10_000, symbol='BAR', realized=1.0, cum_realized=1.0, unrealized=0.0))
+    db.commit()
+    ledger.rebuild(db)
+    db.expire_all()
+    assert db.query(TradePnl).count() == 2
+
+    db.close()
+
+
+def test_reconcile_runs_in_background():
+    ledger = PositionLedger(reconcile_s=0.01)
+    calls = []
+    ledger.reconcile = lambda db: calls.append(db)
+    ledger.start()
+    try:
+        deadline = time.monotonic() + 2
+        while not calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        ledger.stop()
+    assert calls
+
+
+def test_rebuild_starts_from_checkpoint(monkeypatch):
+    from app.models.daily_pnl import DailyPnl
+    from app.models.pnl_checkpoint import PnlCheckpoint
+    from app.models.trade_pnl import TradePnl
+    from app.services.pnl import maybe_checkpoint
+
+    db = create_session()
+    for model in (Trade, PnlCheckpoint, DailyPnl, TradePnl):
+        db.query(model).delete()
+    db.commit()
+
+    ledger = PositionLedger(reconcile_s=0)
+    for side, qty, price in (('BUY', 10, 10.0), ('BUY', 5, 12.0), ('SELL', 8, 15.0)):
+        db.add(Trade(symbol='FOO', side=side, qty=qty, price=price, status='Filled'))
+        db.commit()
+        ledger.sync(db)
+    assert maybe_checkpoint(db, every=3) is not None
+    db.add(Trade(symbol='FOO', side='SELL', qty=3, price=11.0, status='Filled'))
+    db.commit()
+    ledger.sync(db)
+    expected = (ledger.position('FOO'), ledger.open_notional('FOO'), ledger.realized_today())
+
+    replayed = []
+    apply_rows = PositionLedger._apply_rows
+    monkeypatch.setattr(PositionLedger, '_apply_rows',
+                        lambda self, rows: replayed.extend(rows) or apply_rows(self, rows))
+    fresh = PositionLedger(reconcile_s=0)
+    fresh.rebuild(db)
+
+    # Only the fill after the checkpoint is replayed, and the result is the same
+    assert [t.qty for t in replayed] == [3]
+    assert (fresh.position('FOO'), fresh.open_notional('FOO'), fresh.realized_today()) == expected
+    assert fresh.trade_pnl.cum_realized == ledger.trade_pnl.cum_realized
+    assert db.query(TradePnl).count() == 4
+
+    db.close()
+
+
+def test_unrealized_follows_marks():
+    from app.models.trade_pnl import TradePnl
+
+    db = create_session()
+    db.query(Trade).delete()
+    db.query(TradePnl).delete()
+    db.commit()
+
+    ledger = PositionLedger(reconcile_s=0)
+    db.add(Trade(symbol='FOO', side='BUY', qty=10, price=10.0, status='Filled'))
+    db.commit()
+    ledger.sync(db)
+    assert ledger.refresh_unrealized() == 0
+
+    # A streamed price re-prices the open lot without any trade in FOO
+    ledger.mark('FOO', 13.0)
+    ledger.mark('BAR', 99.0)
+    assert ledger.refresh_unrealized() == 1
+    db.expire_all()
+    assert db.query(TradePnl).one().unrealized == 30.0
+    assert ledger.refresh_unrealized() == 0
+
+    db.close()
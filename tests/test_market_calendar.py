@@ -0,0 +1,50 @@
+from datetime import date, datetime, timezone
+
+from app.services.market_calendar import MarketCalendar, nyse_holidays, nyse_early_closes
+
+cal = MarketCalendar(2024, 2026, tz='America/New_York')
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_holidays_and_early_closes():
+    h = nyse_holidays(2026)
+    assert date(2026, 4, 3) in h             # Good Friday
+    assert date(2026, 7, 3) in h             # July 4th on a Saturday, observed Friday
+    assert date(2026, 1, 19) in h            # MLK day
+    assert date(2025, 1, 9) in nyse_holidays(2025)
+    assert date(2025, 7, 3) in nyse_early_closes(2025)
+    assert date(2026, 11, 27) in nyse_early_closes(2026)
+    # 2022: New Year's Day on a Saturday is not observed on Friday Dec 31, 2021
+    assert date(2021, 12, 31) not in nyse_holidays(2021)
+    assert date(2021, 12, 31) not in nyse_holidays(2022)
+
+
+def test_is_open_respects_sessions():
+    assert cal.is_open(utc(2025, 12, 16, 14, 30))        # 09:30 ET
+    assert not cal.is_open(utc(2025, 12, 16, 14, 29))
+    assert not cal.is_open(utc(2025, 12, 16, 21, 0))     # 16:00 ET
+    assert not cal.is_open(utc(2025, 12, 25, 16, 0))     # Christmas
+    assert not cal.is_open(utc(2025, 12, 20, 16, 0))     # Saturday
+    # Day after Thanksgiving closes at 13:00 ET
+    assert cal.is_open(utc(2025, 11, 28, 17, 59))
+    assert not cal.is_open(utc(2025, 11, 28, 18, 0))
+
+
+def test_bars_and_trading_days():
+    # Mid-session: next 15m close, bar open aligned to 09:30 ET
+    t = utc(2025, 12, 16, 14, 40)
+    assert cal.next_bar_close(t) == int(utc(2025, 12, 16, 14, 45).timestamp())
+    assert cal.bar_open(t, 60) == int(utc(2025, 12, 16, 14, 30).timestamp())
+    # Friday after the close: bar key stays on the last bar, next close is Monday's first bar
+    t = utc(2025, 12, 19, 23, 0)
+    assert cal.bar_open(t) == int(utc(2025, 12, 19, 20, 45).timestamp())
+    assert cal.next_bar_close(t) == int(utc(2025, 12, 22, 14, 45).timestamp())
+    assert cal.market_time(t) == int(utc(2025, 12, 19, 21, 0).timestamp())
+
+    assert cal.trading_day(utc(2025, 12, 16, 20, 0), start='00:00') == date(2025, 12, 16)
+    assert cal.trading_day(utc(2025, 12, 16, 22, 30), start='17:00') == date(2025, 12, 17)
+    # Weekend fills count toward Monday
+    assert cal.trading_day(utc(2025, 12, 20, 16, 0), start='00:00') == date(2025, 12, 22)
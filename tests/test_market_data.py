@@ -0,0 +1,70 @@
+from app.services import market_data
+from app.services.market_data import BarAggregator, ReplayBarFeed
+from app.services.signal_validation import SignalValidator
+import pandas as pd
+
+
+def write_replay(path, n=90, start='2025-12-16 14:30'):
+    """n one-minute bars for FOO starting at the 09:30 ET open."""
+    t0 = pd.Timestamp(start, tz='UTC')
+    lines = ['symbol,time,open,high,low,close,volume']
+    for i in range(n):
+        t = t0 + pd.Timedelta(minutes=i)
+        p = 100 + i * 0.1
+        lines.append(f'FOO,{t.isoformat()},{p},{p + 0.5},{p - 0.5},{p + 0.05},10')
+    path.write_text('\n'.join(lines))
+
+
+def test_replay_aggregates_session_aligned_15m_bars(tmp_path):
+    path = tmp_path / 'replay.csv'
+    write_replay(path)
+    feed = ReplayBarFeed(str(path))
+
+    assert feed.run() == 90
+    df = feed.frame('FOO')
+    # 90 one-minute bars from 09:30 ET -> six 15m bars, the last still forming
+    assert len(df) == 6
+    assert str(df.index[0].tz) == 'America/New_York'
+    assert df.index[0].strftime('%H:%M') == '09:30'
+    first = df.iloc[0]
+    assert first['open'] == 100.0
+    assert first['close'] == 100 + 14 * 0.1 + 0.05
+    assert first['high'] == 100 + 14 * 0.1 + 0.5
+    assert first['low'] == 99.5
+    assert first['volume'] == 150
+
+
+def test_seeded_history_precedes_live_bars():
+    agg = BarAggregator(persist=False)
+    hist = pd.DataFrame({'open': [1.0], 'high': [2.0], 'low': [0.5], 'close': [1.5], 'volume': [100.0]},
+                        index=pd.DatetimeIndex([pd.Timestamp('2025-12-15 20:45', tz='UTC')]))
+    agg.seed('FOO', hist)
+    assert not agg.has('FOO')
+
+    agg.add('FOO', pd.Timestamp('2025-12-16 14:30:05', tz='UTC'), 3.0, 3.5, 2.5, 3.2, 10)
+    df = agg.frame('FOO')
+    assert agg.has('FOO')
+    assert list(df['close']) == [1.5, 3.2]
+
+
+def test_validator_reads_live_feed(tmp_path, monkeypatch):
+    path = tmp_path / 'replay.csv'
+    write_replay(path)
+    feed = ReplayBarFeed(str(path))
+    feed.run()
+    monkeypatch.setattr(market_data, '_feed', feed)
+
+    df = SignalValidator('FOO', 'BUY')._fetch_data(interval='15m', period='30d')
+    assert len(df) == 6
+
+
+def test_aggregator_publishes_prices():
+    seen = []
+    listener = lambda symbol, price: seen.append((symbol, price))
+    market_data.add_price_listener(listener)
+    try:
+        agg = BarAggregator(minutes=15, persist=False)
+        agg.add('foo', '2025-12-16 14:30:00+00:00', 10, 11, 9, 10.5, 100)
+    finally:
+        market_data.remove_price_listener(listener)
+    assert seen == [('FOO', 10.5)]
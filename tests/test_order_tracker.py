@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from app.database import Base, engine, SessionLocal
+from app.models.open_order import OpenOrder
+from app.services.order_tracker import OrderTracker
+from app.services.risk import RiskManager
+
+
+def create_session():
+    Base.metadata.create_all(bind=engine)
+    return SessionLocal()
+
+
+def test_submit_blocks_duplicates_until_closed():
+    db = create_session()
+    db.query(OpenOrder).delete()
+    db.commit()
+    tracker = OrderTracker(ttl_s=60)
+    rm = RiskManager(orders=tracker)
+
+    order = tracker.submit(db, 'foo', 'buy', 5, 10.0)
+    assert db.get(OpenOrder, order.id).filled_at is None
+    ok, reason = rm.check_open_order_duplicate('FOO', 'BUY', db)
+    assert not ok
+    assert reason == 'pending_buy_order_exists_for_FOO'
+    assert rm.check_open_order_duplicate('FOO', 'SELL', db)[0]
+
+    # Non-terminal broker status keeps it pending; a fill closes it
+    tracker.record_result(db, order, 'PreSubmitted')
+    assert tracker.has_pending('FOO', 'BUY')
+    tracker.record_result(db, order, 'Filled | reason: Fill 5.0@10.01')
+    assert not tracker.has_pending('FOO', 'BUY')
+    db.expire_all()
+    row = db.get(OpenOrder, order.id)
+    assert row.filled_at is not None
+    assert row.status.startswith('Filled')
+
+    db.close()
+
+
+def test_rebuild_and_sweep_expire_stale_orders():
+    db = create_session()
+    db.query(OpenOrder).delete()
+    db.add(OpenOrder(symbol='FOO', side='BUY', qty=1, price=1.0, created_at=datetime.utcnow()))
+    db.add(OpenOrder(symbol='BAR', side='SELL', qty=1, price=1.0,
+                     created_at=datetime.utcnow() - timedelta(minutes=10)))
+    db.commit()
+
+    tracker = OrderTracker(ttl_s=60)
+    assert tracker.rebuild(db) == 2
+    assert tracker.has_pending('FOO', 'BUY')
+    # Past the TTL: no longer blocks, and the sweeper closes the row
+    assert not tracker.has_pending('BAR', 'SELL')
+    assert tracker.sweep(db) == 1
+    assert tracker.pending() == {'FOO:BUY': 1}
+    db.expire_all()
+    stale = db.query(OpenOrder).filter(OpenOrder.symbol == 'BAR').one()
+    assert stale.status == 'expired' and stale.filled_at is not None
+
+    db.close()
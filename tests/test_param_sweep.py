@@ -0,0 +1,29 @@
+from app.services.param_sweep import run_sweep, grid, random_search, default_space
+from test_backtest import make_frames
+
+
+def test_grid_and_random_search_cover_space():
+    space = {'body_ratio': [0.5, 0.6], 'required_passes': [3, 4, 5]}
+    assert len(grid(space)) == 6
+    sample = random_search(space, n=10, seed=1)
+    assert len(sample) == 6
+    assert len({tuple(c.values()) for c in sample}) == 6
+
+
+def test_default_space_only_sweeps_decision_thresholds():
+    assert set(default_space('BUY')) == {'rsi_buy_low', 'rsi_buy_high', 'body_ratio', 'required_passes'}
+    assert set(default_space('SELL')) == {'rsi_sell_low', 'rsi_sell_high', 'body_ratio', 'required_passes'}
+    assert len(grid(direction='SELL')) == 81
+
+
+def test_parallel_sweep_matches_serial_and_is_ranked():
+    df_15m, df_1h = make_frames()
+    configs = grid({'rsi_buy_low': [50.0, 55.0], 'body_ratio': [0.5, 0.6], 'required_passes': [3, 4]})
+
+    parallel = run_sweep(df_15m, df_1h, 'BUY', configs, workers=2, min_trades=0)
+    serial = run_sweep(df_15m, df_1h, 'BUY', configs, workers=0, min_trades=0)
+
+    assert parallel == serial
+    assert len(parallel) == len(configs)
+    pnls = [r['pnl'] for r in parallel]
+    assert pnls == sorted(pnls, reverse=True)
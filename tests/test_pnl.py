@@ -31,8 +31,9 @@ def test_pnl_fifo_and_daily():
     # remaining position is (10+5 -8) =7; remaining lots: 2@10 left? Actually 10 had 8 consumed -> 2@10 left and 5@12 -> net 7 units in book
     assert foo['position'] == 7
 
-    daily = compute_daily_realized_pnl(db, date(2025,12,16))
-    assert daily == 40.0
+    # 00:03 UTC is still the evening of the 15th on the exchange clock
+    assert compute_daily_realized_pnl(db, date(2025,12,15)) == 40.0
+    assert compute_daily_realized_pnl(db, date(2025,12,16)) == 0.0
 
     db.close()
 
@@ -69,4 +70,106 @@ def test_compute_trade_pnls_per_trade():
     # t2: remaining 5 units @12 unrealized => (15-12)*5 = 15
     assert pnls[t2_id]['unrealized'] == 15.0
 
-    db.close()
\ No newline at end of file
+    db.close()
+
+def test_single_pass_views_agree_on_prices_and_shorts():
+    db = create_session()
+    db.query(Trade).delete()
+    db.commit()
+
+    day = datetime(2025, 12, 16, 15, 0, tzinfo=timezone.utc)
+    db.add_all([
+        # Alert price 10, filled at 11: every view must use 11
+        Trade(symbol='FOO', side='BUY', qty=10, price=10.0, executed_price=11.0, status='Filled', timestamp=day),
+        Trade(symbol='FOO', side='SELL', qty=10, price=14.0, status='Filled', timestamp=day.replace(minute=1)),
+        # Short 5 @ 20, covered @ 18
+        Trade(symbol='BAR', side='SELL', qty=5, price=20.0, status='Filled', timestamp=day.replace(minute=2)),
+        Trade(symbol='BAR', side='BUY', qty=5, price=18.0, status='Filled', timestamp=day.replace(minute=3)),
+        Trade(symbol='BAR', side='BUY', qty=9, price=18.0, status='risk_rejected: test', timestamp=day.replace(minute=4)),
+    ])
+    db.commit()
+
+    from app.services.pnl import compute_pnl, compute_trade_pnls
+    report = compute_pnl(db)
+    tickers = report.tickers()
+    assert tickers['FOO']['realized'] == 30.0
+    assert tickers['BAR']['realized'] == 10.0 and tickers['BAR']['position'] == 0
+    assert report.daily_realized(date(2025, 12, 16)) == 40.0
+    assert sum(p['realized'] for p in report.trade_pnls().values()) == 40.0
+    # The wrappers return the same views
+    assert compute_pnl_by_ticker(db) == tickers
+    assert compute_daily_realized_pnl(db, date(2025, 12, 16)) == 40.0
+    assert compute_trade_pnls(db) == report.trade_pnls()
+
+    db.close()
+
+
+def test_checkpoint_replays_only_newer_trades():
+    from app.models.pnl_checkpoint import PnlCheckpoint
+    from app.services.pnl import compute_pnl, maybe_checkpoint
+
+    db = create_session()
+    db.query(Trade).delete()
+    db.query(PnlCheckpoint).delete()
+    db.commit()
+
+    def fill(side, qty, price, minute):
+        db.add(Trade(symbol='FOO', side=side, qty=qty, price=price, status='Filled',
+                     timestamp=datetime(2025, 12, 16, 15, minute)))
+        db.commit()
+
+    fill('BUY', 10, 10.0, 0)
+    fill('BUY', 5, 12.0, 1)
+    assert maybe_checkpoint(db, every=3) is None
+    fill('SELL', 8, 15.0, 2)
+    checkpoint = maybe_checkpoint(db, every=3)
+    assert checkpoint is not None and checkpoint.fills == 3
+
+    fill('SELL', 10, 11.0, 3)
+    fill('BUY', 3, 9.0, 4)
+    report = compute_pnl(db)
+    assert report.start_id == checkpoint.last_trade_id and report.fills == 5
+    full = compute_pnl(db, since_trade_id=0)
+    assert full.start_id == 0
+    assert report.tickers() == full.tickers()
+    assert report.daily_realized(date(2025, 12, 16)) == full.daily_realized(date(2025, 12, 16))
+    # Realized per trade after the checkpoint; open lots still attributed to their trade
+    assert report.trade_pnls()[report.last_id] == full.trade_pnls()[report.last_id]
+
+    # Trades rewritten under the checkpoint invalidate it, not just its last one
+    first = db.query(Trade).order_by(Trade.id).first()
+    db.query(Trade).filter(Trade.id == first.id).update({'executed_price': 10.5})
+    db.commit()
+    assert compute_pnl(db).start_id == 0
+    assert db.query(PnlCheckpoint).count() == 0
+
+    db.close()
+
+
+def test_checkpoint_rolls_over_on_a_new_trading_day(monkeypatch):
+    from app.models.pnl_checkpoint import PnlCheckpoint
+    from app.services import pnl
+    from app.services.pnl import maybe_checkpoint
+
+    db = create_session()
+    db.query(Trade).delete()
+    db.query(PnlCheckpoint).delete()
+    db.commit()
+    db.add(Trade(symbol='FOO', side='BUY', qty=1, price=10.0, status='Filled',
+                 timestamp=datetime(2025, 12, 16, 15, 0)))
+    db.commit()
+    latest = maybe_checkpoint(db, every=1)
+    db.add(Trade(symbol='FOO', side='BUY', qty=1, price=10.0, status='Filled',
+                 timestamp=datetime(2025, 12, 16, 15, 1)))
+    db.commit()
+
+    # Both sides are compared as trading days, not UTC dates
+    today = [date(2025, 12, 16)]
+    monkeypatch.setattr(pnl, 'trading_day', lambda ts=None: today[0] if ts is None else date(2025, 12, 16))
+    assert latest is not None and maybe_checkpoint(db, every=10) is None
+
+    today[0] = date(2025, 12, 17)
+    rolled = maybe_checkpoint(db, every=10)
+    assert rolled is not None and rolled.reason == 'rollover'
+
+    db.close()
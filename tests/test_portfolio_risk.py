@@ -0,0 +1,100 @@
+from app.services import portfolio_risk as portfolio_module
+from app.services.bar_store import BarStore
+from app.services.ledger import PositionLedger
+from app.services.portfolio_risk import PortfolioRisk
+from app.services.risk import RiskManager
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+
+def bars(close, end='2024-03-01 20:00'):
+    index = pd.date_range(end=pd.Timestamp(end, tz='UTC'), periods=len(close), freq='15min')
+    return pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close,
+                         'volume': np.full(len(close), 1000.0)}, index=index)
+
+
+def use_store(tmp_path, monkeypatch, n=300):
+    rng = np.random.default_rng(7)
+    shocks = rng.normal(0, 0.005, n)
+    store = BarStore(tmp_path)
+    store.append('AAA', '15m', bars(100 * np.exp(np.cumsum(shocks))))
+    # BBB moves against AAA
+    store.append('BBB', '15m', bars(50 * np.exp(np.cumsum(-shocks + rng.normal(0, 0.001, n)))))
+    monkeypatch.setattr(portfolio_module, 'bar_store', store)
+    clock = SimpleNamespace(bar=1)
+    monkeypatch.setattr(portfolio_module, 'market_calendar',
+                        SimpleNamespace(bar_open=lambda minutes=15: clock.bar))
+    return store, clock
+
+
+def test_var_reflects_correlation_and_refreshes_per_bar(tmp_path, monkeypatch):
+    store, clock = use_store(tmp_path, monkeypatch)
+    pr = PortfolioRisk(lookback_bars=200, horizon_bars=1, confidence=0.95)
+
+    alone = pr.var({'AAA': 10_000.0})
+    hedged, doubled = pr.var({'AAA': 10_000.0, 'BBB': 10_000.0}, {'AAA': 20_000.0})
+    assert 0 < hedged < alone * 0.5
+    assert abs(doubled - 2 * alone) < 1e-6
+    # Symbols without bars fall back to the default-volatility proxy, added in full
+    proxy = pr.var({'NONE': 5_000.0})
+    assert proxy > 0
+    assert abs(pr.var({'AAA': 10_000.0, 'NONE': 5_000.0}) - (alone + proxy)) < 1e-6
+    assert abs(pr.var({'NONE': -5_000.0}) - proxy) < 1e-6
+
+    # Within a bar the cached series is reused; after a bar close only new bars are read
+    ts, close = pr.closes('AAA')
+    store.append('AAA', '15m', bars(np.array([close[-1], 250.0]), end='2024-03-01 20:15'))
+    assert pr.closes('AAA')[1][-1] == close[-1]
+    clock.bar = 2
+    ts2, close2 = pr.closes('AAA')
+    assert len(ts2) == 201 and close2[-1] == 250.0 and ts2[-2] == ts[-1]
+    assert pr.var({'AAA': 10_000.0}) > alone
+
+    historical = PortfolioRisk(lookback_bars=200, horizon_bars=1, method='historical')
+    assert historical.var({'AAA': 10_000.0}) > 0
+
+
+def test_portfolio_var_check_blocks_risk_increasing_orders_only(tmp_path, monkeypatch):
+    use_store(tmp_path, monkeypatch)
+    ledger = PositionLedger(reconcile_s=0)
+    ledger.apply_fill('AAA', 'BUY', 100, 100.0)
+    rm = RiskManager(ledger=ledger, portfolio=PortfolioRisk(lookback_bars=200, horizon_bars=26))
+    current = rm.portfolio.var({'AAA': 10_000.0})
+
+    user_settings = SimpleNamespace(max_portfolio_var=current * 1.1)
+    ok, reason = rm.check_portfolio_var('AAA', 'BUY', 50, 100.0, user_settings)
+    assert not ok and 'portfolio_var_exceeded' in reason
+    # A hedge, or selling down, lowers VaR and passes
+    assert rm.check_portfolio_var('BBB', 'BUY', 150, 50.0, user_settings) == (True, None)
+    user_settings.max_portfolio_var = current * 0.5
+    assert rm.check_portfolio_var('AAA', 'SELL', 10, 100.0, user_settings) == (True, None)
+    # 0 disables the check
+    user_settings.max_portfolio_var = 0
+    assert rm.check_portfolio_var('AAA', 'BUY', 1000, 100.0, user_settings) == (True, None)
+
+
+def test_portfolio_var_counts_orders_in_flight(tmp_path, monkeypatch):
+    use_store(tmp_path, monkeypatch)
+    ledger = PositionLedger(reconcile_s=0)
+    ledger.apply_fill('AAA', 'BUY', 100, 100.0)
+    rm = RiskManager(ledger=ledger, portfolio=PortfolioRisk(lookback_bars=200, horizon_bars=26))
+    user_settings = SimpleNamespace(max_portfolio_var=rm.portfolio.var({'AAA': 15_000.0}))
+
+    assert rm.check_portfolio_var('AAA', 'BUY', 40, 100.0, user_settings) == (True, None)
+    # The same order no longer fits once another buy is working
+    held, _ = ledger.reserve('AAA', 'BUY', 40, 100.0, max_position=10_000, max_exposure=1e9)
+    ok, reason = rm.check_portfolio_var('AAA', 'BUY', 40, 100.0, user_settings)
+    assert not ok and 'portfolio_var_exceeded' in reason
+    held.release()
+
+
+def test_portfolio_var_without_history_fails_closed(tmp_path, monkeypatch):
+    use_store(tmp_path, monkeypatch)
+    ledger = PositionLedger(reconcile_s=0)
+    rm = RiskManager(ledger=ledger, portfolio=PortfolioRisk(lookback_bars=200, horizon_bars=26))
+    user_settings = SimpleNamespace(max_portfolio_var=100.0)
+
+    # No bars for NEW: a large order is priced at the proxy volatility, not waved through
+    ok, reason = rm.check_portfolio_var('NEW', 'BUY', 1_000, 50.0, user_settings)
+    assert not ok and 'portfolio_var_exceeded' in reason
@@ -0,0 +1,79 @@
+from app.services import market_data
+from app.services.ledger import PositionLedger
+from app.services.market_data import ReplayBarFeed
+from app.services.order_tracker import OrderTracker
+from app.services.position_monitor import PositionMonitor
+import pandas as pd
+
+
+def write_prices(path, prices, start='2025-12-16 14:30'):
+    """One-minute replay rows from a list of (symbol, close)."""
+    t0 = pd.Timestamp(start, tz='UTC')
+    lines = ['symbol,time,open,high,low,close,volume']
+    for i, (symbol, p) in enumerate(prices):
+        t = t0 + pd.Timedelta(minutes=i)
+        lines.append(f'{symbol},{t.isoformat()},{p},{p},{p},{p},10')
+    path.write_text('\n'.join(lines))
+
+
+def make_monitor(exits, **kwargs):
+    ledger = PositionLedger(reconcile_s=0)
+    monitor = PositionMonitor(ledger=ledger, orders=OrderTracker(ttl_s=60), **kwargs)
+
+    def on_exit(symbol, side, qty, price, reason):
+        # Filled straight away at the trigger price
+        exits.append((symbol, side, qty, price, reason))
+        ledger.apply_fill(symbol, side, qty, price)
+        monitor.done(symbol)
+
+    monitor.on_exit = on_exit
+    return ledger, monitor
+
+
+def test_replayed_prices_trigger_stops_and_targets(tmp_path):
+    exits = []
+    ledger, monitor = make_monitor(exits, stop_pct=0.05, target_pct=0.10)
+    ledger.apply_fill('FOO', 'BUY', 10, 100.0)
+    ledger.apply_fill('BAR', 'SELL', 5, 50.0)
+
+    path = tmp_path / 'prices.csv'
+    write_prices(path, [('FOO', 104.0), ('BAR', 51.0), ('BAZ', 1.0), ('FOO', 109.9),
+                        ('BAR', 52.6), ('BAR', 53.0), ('FOO', 110.5), ('FOO', 120.0)])
+    market_data.add_price_listener(monitor.on_price)
+    try:
+        ReplayBarFeed(str(path)).run()
+    finally:
+        market_data.remove_price_listener(monitor.on_price)
+
+    # Short stop above entry, long target above entry; each exit fires once
+    assert exits == [('BAR', 'BUY', 5, 52.6, 'stop_loss'), ('FOO', 'SELL', 10, 110.5, 'take_profit')]
+    assert ledger.positions == {'FOO': 0, 'BAR': 0}
+    assert monitor.snapshot()['levels'] == []
+    assert ledger.reserved_sells == {} and ledger.reserved_buys == {}
+
+
+def test_exit_in_flight_and_manual_levels(tmp_path):
+    pending = []
+    ledger = PositionLedger(reconcile_s=0)
+    monitor = PositionMonitor(ledger=ledger, orders=OrderTracker(ttl_s=60), stop_pct=0.05, target_pct=0,
+                              on_exit=lambda *args: pending.append(args))
+    ledger.apply_fill('FOO', 'BUY', 10, 100.0)
+
+    assert monitor.on_price('FOO', 96.0) is None
+    assert monitor.on_price('FOO', 94.0) == 'stop_loss'
+    # Not re-triggered while the exit is working, and the shares are held for it
+    assert monitor.on_price('FOO', 93.0) is None
+    assert len(pending) == 1
+    assert ledger.reserved_sells == {'FOO': 10}
+    monitor.done('FOO')
+    assert ledger.reserved_sells == {}
+
+    # Manual levels replace the percentages until the position closes
+    levels = monitor.set_levels('foo', stop=90.0, target=105.0)
+    assert levels.manual and levels.stop == 90.0
+    assert monitor.on_price('FOO', 94.0) is None
+    assert monitor.on_price('FOO', 105.0) == 'take_profit'
+    ledger.apply_fill('FOO', 'SELL', 10, 105.0)
+    monitor.done('FOO')
+    ledger.apply_fill('FOO', 'BUY', 10, 100.0)
+    assert monitor.refresh('FOO').stop == 95.0
@@ -0,0 +1,38 @@
+from app.services.resample import resample_bars
+import pandas as pd
+
+
+def make_session(day, tz='America/New_York'):
+    index = pd.date_range(f'{day} 09:30', f'{day} 15:45', freq='15min', tz=tz)
+    n = len(index)
+    return pd.DataFrame({
+        'open': [float(i) for i in range(n)],
+        'high': [float(i) + 2 for i in range(n)],
+        'low': [float(i) - 1 for i in range(n)],
+        'close': [float(i) + 1 for i in range(n)],
+        'volume': [100.0] * n,
+    }, index=index)
+
+
+def test_hourly_bars_anchor_on_session_open():
+    df = pd.concat([make_session('2025-12-15'), make_session('2025-12-16')])
+    hourly = resample_bars(df, minutes=60)
+
+    day1 = hourly[hourly.index.date == pd.Timestamp('2025-12-15').date()]
+    assert [ts.strftime('%H:%M') for ts in day1.index] == ['09:30', '10:30', '11:30', '12:30', '13:30', '14:30', '15:30']
+    first = day1.iloc[0]
+    assert first['open'] == 0.0 and first['close'] == 4.0
+    assert first['high'] == 5.0 and first['low'] == -1.0
+    assert first['volume'] == 400.0
+    # 15:30 bar only has the two 15m bars before the close
+    assert day1.iloc[-1]['volume'] == 200.0
+    # No bins for the overnight gap
+    assert len(hourly) == 14
+
+
+def test_resample_accepts_utc_index_across_dst():
+    # 2025-11-03 is the first session after the DST change; open is 14:30 UTC
+    df = make_session('2025-11-03').tz_convert('UTC')
+    hourly = resample_bars(df, minutes=60)
+    assert hourly.index[0].strftime('%H:%M') == '09:30'
+    assert str(hourly.index.tz) == 'America/New_York'
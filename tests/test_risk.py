@@ -42,4 +42,53 @@ def test_position_limit_enforced():
     assert not ok
     assert 'position_limit_exceeded' in reason
 
-    db.close()
\ No newline at end of file
+    db.close()
+
+def test_pipeline_runs_frequent_cheap_rejections_first():
+    from app.services.risk_pipeline import RiskPipeline
+
+    pipeline = RiskPipeline()
+    calls = []
+
+    def make(name, ok):
+        def fn(rm, order, db, user_settings):
+            calls.append(name)
+            return ok, None if ok else name
+        return fn
+
+    pipeline.register('slow_pass', cost_us=500)(make('slow_pass', True))
+    pipeline.register('cheap_pass', cost_us=1)(make('cheap_pass', True))
+    pipeline.register('cheap_reject', cost_us=2)(make('cheap_reject', False))
+
+    ok, reason, name = pipeline.run(None, {}, None, None)
+    assert not ok and reason == 'cheap_reject' and name == 'cheap_reject'
+    # The DB-priced check never ran
+    assert 'slow_pass' not in calls
+
+    # After a few rejections the always-failing check moves to the front
+    for _ in range(10):
+        pipeline.run(None, {}, None, None)
+    assert pipeline.ordered()[0].name == 'cheap_reject'
+    stats = {s['name']: s for s in pipeline.stats()}
+    assert stats['cheap_reject']['reject_rate'] == 1.0
+    assert stats['slow_pass']['runs'] == 0
+
+
+def test_alert_price_does_not_move_marks():
+    from app.services.ledger import PositionLedger
+
+    db = create_session()
+    ledger = PositionLedger(reconcile_s=0)
+    ledger.sync = lambda db: 0
+    ledger.apply_fill('FOO', 'BUY', 10, 100.0)
+    rm = RiskManager(ledger=ledger)
+    rm.is_market_open_rth = lambda: True
+    rm.check_daily_trade_count = lambda db, user_settings: (True, None)
+
+    ok, reason = rm.validate_order('FOO', 'BUY', 1, 150.0, db)
+    assert ok, reason
+    # The order was priced at 150, but the held shares stay marked at the last fill
+    assert ledger.marks['FOO'] == 100.0
+    assert ledger.total_exposure() == 1000.0
+
+    db.close()
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.services.risk_simulation import simulate_orders
+
+LIMITS = SimpleNamespace(
+    max_qty_per_order=100, max_notional_per_order=5_000.0, only_trade_during_rth=False,
+    max_daily_loss=1_000.0, max_position_per_symbol=150, max_total_position_notional=3_000.0,
+)
+
+
+def test_simulation_applies_limits_in_sequence():
+    snapshot = {'positions': {'FOO': 20}, 'marks': {'FOO': 10.0}, 'realized_today': 0.0}
+    orders = [
+        {'symbol': 'FOO', 'side': 'BUY', 'qty': 100, 'price': 10.0},   # ok -> 120
+        {'symbol': 'foo', 'side': 'BUY', 'qty': 50, 'price': 10.0},    # 170 > 150
+        {'symbol': 'BAR', 'side': 'SELL', 'qty': 5, 'price': 10.0},    # nothing to sell
+        {'symbol': 'BAR', 'side': 'BUY', 'qty': 0, 'price': 10.0},
+        {'symbol': 'BAR', 'side': 'BUY', 'qty': 101, 'price': 1.0},
+        {'symbol': 'BAR', 'side': 'BUY', 'qty': 90, 'price': 60.0},    # notional 5400
+        {'symbol': 'FOO', 'side': 'SELL', 'qty': 100, 'price': 10.0},  # ok -> 20
+        {'symbol': 'BAR', 'side': 'BUY', 'qty': 30, 'price': 60.0},    # 200 + 1800 = 2000
+        {'symbol': 'BAZ', 'side': 'BUY', 'qty': 1, 'price': 1001.0},   # 3001 > 3000
+    ]
+    res = simulate_orders(orders, LIMITS, snapshot=snapshot)
+
+    reasons = [d['reason'] for d in res['decisions']]
+    assert reasons == [
+        None, 'position_limit_exceeded', 'insufficient_position_to_sell', 'qty_must_be_positive',
+        'qty_exceeds_max', 'notional_exceeds_max', None, None, 'total_exposure_exceeded',
+    ]
+    assert [d['position'] for d in res['decisions']] == [120, 120, 0, 0, 0, 0, 20, 30, 0]
+    assert res['decisions'][7]['exposure'] == 2000.0
+    assert res['accepted'] == 3 and res['rejected'] == 6
+    assert res['final_positions'] == {'FOO': 20, 'BAR': 30}
+    assert res['final_exposure'] == 2000.0
+
+    flat = simulate_orders([orders[0], orders[0]], LIMITS, snapshot=snapshot, start_flat=True, include_orders=False)
+    assert flat['accepted'] == 1
+    assert flat['reject_counts'] == {'position_limit_exceeded': 1}
+    assert 'decisions' not in flat
+
+
+def test_simulation_keeps_snapshot_marks_and_passes_reducing_orders():
+    limits = SimpleNamespace(**{**vars(LIMITS), 'max_notional_per_order': 50_000.0,
+                                'max_total_position_notional': 15_000.0})
+    snapshot = {'positions': {'FOO': 100}, 'marks': {'FOO': 100.0}, 'realized_today': 0.0}
+    orders = [
+        {'symbol': 'FOO', 'side': 'BUY', 'qty': 50, 'price': 120.0},   # 10000 + 6000 > 15000
+        {'symbol': 'FOO', 'side': 'BUY', 'qty': 40, 'price': 120.0},   # 10000 + 4800
+        {'symbol': 'FOO', 'side': 'SELL', 'qty': 100, 'price': 130.0},  # reduces: always passes
+    ]
+    res = simulate_orders(orders, limits, snapshot=snapshot)
+
+    assert [d['reason'] for d in res['decisions']] == ['total_exposure_exceeded', None, None]
+    assert [d['exposure'] for d in res['decisions']] == [10_000.0, 14_800.0, 4_800.0]
+
+
+def test_simulate_endpoint():
+    from app.main import app
+    client = TestClient(app)
+    orders = [{'symbol': 'SIMX', 'side': 'BUY', 'qty': 1, 'price': 1.0}] * 3
+    resp = client.post('/risk/simulate', json={'orders': orders, 'start_flat': True})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body['orders'] == 3
+    assert [d['position'] for d in body['decisions']] == [1, 2, 3]
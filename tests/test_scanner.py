@@ -0,0 +1,83 @@
+from app.main import app
+from app.services import scanner as scanner_module
+from app.services.bar_store import BarStore
+from app.services.scanner import Scanner
+from fastapi.testclient import TestClient
+import json
+import numpy as np
+import pandas as pd
+
+
+def recent_bars(seed, n=400):
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.now(tz='UTC').floor('15min')
+    index = pd.date_range(end=end, periods=n, freq='15min')
+    close = 100 + np.cumsum(rng.normal(0.05, 0.6, n))
+    open_ = close - rng.normal(0.1, 0.5, n)
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.uniform(0, 0.4, n),
+        'low': np.minimum(open_, close) - rng.uniform(0, 0.4, n),
+        'close': close,
+        'volume': rng.uniform(500, 2000, n),
+    }, index=index)
+
+
+def use_store(tmp_path, monkeypatch):
+    store = BarStore(tmp_path)
+    for i, symbol in enumerate(('AAA', 'BBB', 'CCC')):
+        store.append(symbol, '15m', recent_bars(i))
+    monkeypatch.setattr(scanner_module, 'bar_store', store)
+
+
+def test_scan_streams_then_ranks_and_caches_per_bar(tmp_path, monkeypatch):
+    use_store(tmp_path, monkeypatch)
+    sc = Scanner(workers=0)
+
+    items = list(sc.stream(['AAA', 'BBB', 'CCC', 'NONE'], refresh=False))
+    assert [i['type'] for i in items] == ['result'] * 4 + ['ranking']
+    ranking = items[-1]['results']
+    assert ranking[-1]['symbol'] == 'NONE'
+    for r in ranking[:3]:
+        assert set(r['BUY']) == {'score', 'checks_passed', 'approved', 'failed'}
+        assert r['best_score'] == r[r['best_direction']]['score']
+
+    again = list(sc.stream(['AAA', 'BBB', 'CCC', 'NONE'], refresh=False))
+    assert len(again) == 1 and again[0]['cached'] is True
+    assert again[0]['results'] == ranking
+
+    # A refresh bypasses the cache and replaces it with the new ranking
+    topped_up = []
+    monkeypatch.setattr(scanner_module.bar_store, 'top_up', lambda symbol, *a: topped_up.append(symbol))
+    refreshed = list(sc.stream(['AAA', 'BBB', 'CCC', 'NONE'], refresh=True))
+    assert len(refreshed) == 5 and refreshed[-1]['cached'] is False
+    assert sorted(topped_up) == ['AAA', 'BBB', 'CCC', 'NONE']
+    assert sc.cached(['AAA', 'BBB', 'CCC', 'NONE']) == refreshed[-1]['results']
+
+
+def test_scan_endpoint_streams_ndjson(tmp_path, monkeypatch):
+    use_store(tmp_path, monkeypatch)
+    monkeypatch.setattr(scanner_module, 'scanner', Scanner(workers=0))
+    monkeypatch.setattr('app.routes.signals.scanner', scanner_module.scanner)
+
+    resp = TestClient(app).get('/signals/scan', params={'symbols': 'AAA,BBB'})
+    assert resp.status_code == 200
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert lines[-1]['type'] == 'ranking'
+    assert {r['symbol'] for r in lines[-1]['results']} == {'AAA', 'BBB'}
+
+
+def test_scan_endpoint_caps_symbol_count(monkeypatch):
+    monkeypatch.setattr('app.routes.signals.settings.SCANNER_MAX_SYMBOLS', 2)
+
+    resp = TestClient(app).get('/signals/scan', params={'symbols': 'AAA,BBB,CCC'})
+    assert resp.status_code == 400
+
+
+def test_scanner_reuses_one_pool():
+    sc = Scanner(workers=1)
+    try:
+        assert sc._executor() is sc._executor()
+    finally:
+        sc.stop()
+    assert sc._pool is None
@@ -0,0 +1,207 @@
+from app.services import signal_validation
+from app.services.signal_validation import SignalValidator, validate_signal, timed_out_result, bar_keys
+from app.services.metrics import metrics
+from datetime import datetime, timezone
+import pandas as pd
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def slow_fetch(self, interval='15m', period='7d'):
+    time.sleep(0.05)
+    return None
+
+
+def test_validation_deadline_marks_checks_timed_out(monkeypatch):
+    monkeypatch.setattr(SignalValidator, '_fetch_data', slow_fetch)
+    metrics.reset()
+
+    result = validate_signal('FOO', 'BUY', budget_ms=10, timeout_policy='reject')
+
+    assert result['valid'] is False
+    meta = result['metadata']
+    assert meta['timed_out'] is True
+    assert meta['timeout_policy'] == 'reject'
+    assert meta['budget_ms'] == 10
+    assert meta['budget_overrun_ms'] > 0
+    assert all(c.get('timed_out') for c in result['checks'].values())
+    assert metrics.counters['validation.timeouts'] == 1
+    assert metrics.counters['validation.budget_overruns'] == 1
+
+
+def test_validation_queued_past_budget_skips_fetch(monkeypatch):
+    fetched = []
+    monkeypatch.setattr(SignalValidator, '_fetch_data',
+                        lambda self, interval='15m', period='7d': fetched.append(interval))
+
+    # Submitted 200ms ago with a 100ms budget: the worker picks it up too late
+    result = validate_signal('FOO', 'BUY', budget_ms=100, timeout_policy='reject',
+                             queued_at=time.monotonic() - 0.2)
+
+    assert fetched == []
+    assert result['valid'] is False
+    assert result['metadata']['timed_out'] is True
+
+
+def test_clamp_budget_ms():
+    assert signal_validation.clamp_budget_ms(0) == signal_validation.TIMEOUT_MIN_MS
+    assert signal_validation.clamp_budget_ms('10000000') == signal_validation.TIMEOUT_MAX_MS
+    assert signal_validation.clamp_budget_ms(1500) == 1500
+
+
+def test_timeout_policy_skip_approves(monkeypatch):
+    monkeypatch.setattr(SignalValidator, '_fetch_data', slow_fetch)
+
+    result = validate_signal('FOO', 'SELL', budget_ms=10, timeout_policy='skip')
+
+    assert result['valid'] is True
+    assert result['metadata']['decision'] == 'SKIPPED'
+
+
+def test_timeout_policy_approve_cached_without_decision_rejects(monkeypatch):
+    monkeypatch.setattr(SignalValidator, '_fetch_data', lambda self, interval='15m', period='7d': None)
+    signal_validation.validation_memo.clear()
+
+    result = timed_out_result('FOO', 'BUY', budget_ms=10, policy='approve_cached')
+
+    assert result['valid'] is False
+    assert result['metadata']['timeout_policy'] == 'approve_cached'
+    assert result['metadata']['decision'] == 'REJECTED'
+
+
+def test_timeout_policy_approve_cached_uses_stored_decision(monkeypatch):
+    def no_validation(self):
+        raise AssertionError('approve_cached must not re-run the checks')
+
+    monkeypatch.setattr(SignalValidator, 'validate', no_validation)
+    memo = signal_validation.validation_memo
+    memo.clear()
+    old_bar = bar_keys(datetime(2025, 12, 16, 15, 1, tzinfo=timezone.utc))
+    memo.put(('FOO', 'BUY') + old_bar, {'valid': True, 'checks': {}, 'metadata': {'decision': 'APPROVED'}})
+    # A newer bar evicts the memo entry but not the stored decision
+    memo.get(('FOO', 'BUY') + bar_keys(datetime(2025, 12, 16, 15, 31, tzinfo=timezone.utc)))
+
+    result = timed_out_result('foo', 'buy', budget_ms=10, policy='approve_cached')
+
+    assert result['valid'] is True
+    meta = result['metadata']
+    assert meta['cached_fallback'] is True and meta['timed_out'] is True
+    assert meta['cached_bar'].startswith('2025-12-16T15:00')
+    assert timed_out_result('FOO', 'SELL', budget_ms=10, policy='approve_cached')['valid'] is False
+
+
+def test_validation_memo_hits_within_bar_and_evicts_on_roll(monkeypatch):
+    calls = []
+
+    def fake_validate(self):
+        calls.append(self.symbol)
+        self.validation_result['metadata']['decision'] = 'APPROVED'
+        self.validation_result['valid'] = True
+        return self.validation_result
+
+    monkeypatch.setattr(SignalValidator, 'validate', fake_validate)
+    signal_validation.validation_memo.clear()
+    real_bar_keys = signal_validation.bar_keys
+    bar = [datetime(2025, 12, 16, 15, 1, tzinfo=timezone.utc)]
+    monkeypatch.setattr(signal_validation, 'bar_keys', lambda now=None: real_bar_keys(bar[0]))
+
+    first = validate_signal('FOO', 'BUY')
+    second = validate_signal('foo', 'buy')
+    assert first['metadata']['memo_hit'] is False
+    assert second['metadata']['memo_hit'] is True
+    assert second['valid'] is True
+    assert len(calls) == 1
+
+    # Same 15m bar, different direction is a separate entry
+    validate_signal('FOO', 'SELL')
+    assert len(calls) == 2
+
+    # Next 15m bar: entries for the old bar are evicted and validation re-runs
+    bar[0] = datetime(2025, 12, 16, 15, 16, tzinfo=timezone.utc)
+    third = validate_signal('FOO', 'BUY')
+    assert third['metadata']['memo_hit'] is False
+    assert len(calls) == 3
+    assert len(signal_validation.validation_memo) == 1
+
+
+def test_bar_keys_session_aligned_hour():
+    # 14:40 UTC == 09:40 ET (EST): 15m bar opened 14:30, 1h bar opened 14:30 (09:30 ET)
+    b15, b1h = bar_keys(datetime(2025, 12, 16, 14, 40, tzinfo=timezone.utc))
+    assert b15 == int(datetime(2025, 12, 16, 14, 30, tzinfo=timezone.utc).timestamp())
+    assert b1h == int(datetime(2025, 12, 16, 14, 30, tzinfo=timezone.utc).timestamp())
+
+
+def test_concurrent_validations_share_one_run(monkeypatch):
+    calls = []
+
+    def slow_validate(self):
+        calls.append(self.symbol)
+        time.sleep(0.2)
+        self.validation_result['metadata']['decision'] = 'APPROVED'
+        self.validation_result['valid'] = True
+        return self.validation_result
+
+    monkeypatch.setattr(SignalValidator, 'validate', slow_validate)
+    signal_validation.validation_memo.clear()
+    metrics.reset()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: validate_signal('BAR', 'BUY'), range(4)))
+
+    assert len(calls) == 1
+    assert all(r['valid'] for r in results)
+    # Every caller owns its result
+    assert len({id(r) for r in results}) == 4
+    assert metrics.counters['validation.collapsed'] == 3
+
+
+def test_concurrent_fetches_share_one_download(monkeypatch):
+    calls = []
+
+    def slow_load(self, interval, period):
+        calls.append(interval)
+        time.sleep(0.2)
+        return 'bars'
+
+    monkeypatch.setattr(SignalValidator, '_load_data', slow_load)
+    metrics.reset()
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = list(pool.map(lambda _: SignalValidator('BAR', 'BUY')._fetch_data('15m', '30d'), range(3)))
+
+    assert results == ['bars'] * 3
+    assert len(calls) == 1
+    assert metrics.counters['bars.collapsed'] == 2
+
+
+def test_shared_fetch_keyed_on_period_and_copied(monkeypatch):
+    calls = []
+
+    def slow_load(self, interval, period):
+        calls.append(period)
+        time.sleep(0.2)
+        return pd.DataFrame({'close': [1.0, 2.0]})
+
+    monkeypatch.setattr(SignalValidator, '_load_data', slow_load)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        periods = ['30d', '30d', '5d', '5d']
+        frames = list(pool.map(lambda p: SignalValidator('BAR', 'BUY')._fetch_data('15m', p), periods))
+
+    assert sorted(calls) == ['30d', '5d']
+    # A caller mutating its frame does not reach the others
+    frames[0].loc[0, 'close'] = -1.0
+    assert all(f.loc[0, 'close'] == 1.0 for f in frames[1:])
+    assert len({id(f) for f in frames}) == 4
+
+
+def test_concurrent_validations_with_different_policies_run_separately(monkeypatch):
+    monkeypatch.setattr(SignalValidator, '_fetch_data', slow_fetch)
+    signal_validation.validation_memo.clear()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        reject, skip = pool.map(lambda p: validate_signal('BAZ', 'BUY', budget_ms=10, timeout_policy=p),
+                                ['reject', 'skip'])
+
+    assert reject['metadata']['decision'] == 'REJECTED'
+    assert skip['metadata']['decision'] == 'SKIPPED'
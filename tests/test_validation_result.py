@@ -0,0 +1,44 @@
+from app.database import Base, engine, SessionLocal
+from app.models.trade import Trade
+from app.models.validation_result import ValidationResult
+from app.services.signal_validation import SignalValidator
+from sqlalchemy import inspect
+from test_backtest import make_frames
+
+
+def create_session():
+    Base.metadata.create_all(bind=engine)
+    return SessionLocal()
+
+
+def test_trade_references_compact_validation_row():
+    db = create_session()
+    db.query(Trade).delete()
+    db.query(ValidationResult).delete()
+    db.commit()
+
+    df_15m, df_1h = make_frames()
+    result = SignalValidator('FOO', 'BUY').evaluate(df_15m, df_1h)
+    trade = Trade(symbol='FOO', side='BUY', qty=1, price=10.0, status='Filled',
+                  validation=ValidationResult.from_result('FOO', 'BUY', result))
+    db.add(trade)
+    db.commit()
+    trade_id = trade.id
+    db.close()
+
+    db = create_session()
+    row = db.query(Trade).filter(Trade.id == trade_id).one()
+    # Hot-path loads skip both the legacy blob and the compressed detail
+    assert 'validation_data' in inspect(row).unloaded
+    v = row.validation
+    assert 'detail' in inspect(v).unloaded
+    assert v.valid == result['valid']
+    assert v.checks_passed == result['metadata']['checks_passed']
+    assert v.momentum_ok == result['checks']['momentum_confirmation']['passed']
+    assert v.rsi == result['checks']['momentum_confirmation']['values']['rsi']
+    assert v.detail_dict()['checks'].keys() == result['checks'].keys()
+
+    db.query(Trade).delete()
+    db.query(ValidationResult).delete()
+    db.commit()
+    db.close()
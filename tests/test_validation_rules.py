@@ -0,0 +1,53 @@
+from app.services.signal_validation import SignalValidator
+from app.services.validation_rules import RULES, CompiledRules, compile_rules, compute_indicators, describe_result
+from app.services.resample import resample_bars
+from test_backtest import make_frames
+import copy
+import numpy as np
+
+
+def test_details_only_rendered_on_request():
+    df_15m, df_1h = make_frames()
+
+    plain = SignalValidator('FOO', 'BUY').evaluate(df_15m, df_1h)
+    assert all(check['details'] == [] for check in plain['checks'].values())
+    assert 'rsi' in plain['checks']['momentum_confirmation']['values']
+
+    detailed = SignalValidator('FOO', 'BUY', details=True).evaluate(df_15m, df_1h)
+    assert all(check['details'] for check in detailed['checks'].values())
+    assert detailed['valid'] == plain['valid']
+
+    # Details can also be rendered later from the stored values
+    stripped = copy.deepcopy(detailed)
+    for check in stripped['checks'].values():
+        check['details'] = []
+    assert describe_result(stripped, 'BUY')['checks'] == detailed['checks']
+
+
+def test_rule_spec_is_reconfigurable():
+    df_15m, df_1h = make_frames()
+    ind = compute_indicators(df_15m, df_1h)
+    default = compile_rules('BUY').evaluate(ind)
+
+    # Heavier candle weight only changes the score, not pass counts
+    rules = copy.deepcopy(RULES)
+    next(r for r in rules if r['name'] == 'candle_strength')['weight'] = 3
+    heavy = CompiledRules('BUY', rules).evaluate(ind)
+    assert (heavy['passed_count'] == default['passed_count']).all()
+    assert (heavy['score'] - default['score'] == 2 * default['candle_strength']).all()
+
+    # Thresholds are bound at evaluation time
+    loose = compile_rules('BUY').evaluate(ind, {'rsi_buy_low': 0, 'rsi_buy_high': 100})
+    assert loose['momentum_confirmation'].sum() >= default['momentum_confirmation'].sum()
+
+
+def test_hour_indicators_ignore_later_prices():
+    df_15m, df_1h = make_frames()
+    base = compute_indicators(df_15m, df_1h)
+    for i in (120, 201, 202, 203, 350):
+        # Rewrite every price after bar i; nothing up to bar i may move
+        future = df_15m.copy()
+        future.iloc[i + 1:, :4] *= 3.0
+        ind = compute_indicators(future, resample_bars(future, minutes=60))
+        for name in ('hour_len', 'hour_ema_50', 'hour_ema_50_prev'):
+            np.testing.assert_array_equal(ind[name][:i + 1], base[name][:i + 1], err_msg=f'{name} at {i}')
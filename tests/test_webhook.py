@@ -130,4 +130,28 @@ def test_tradingview_webhook_db_commit_failure(monkeypatch):
     assert "db commit failed" in resp.json()["reason"]
     assert dummy_db.rolled_back is True
 
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+def test_reservation_held_while_order_is_working(monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+    from app.schemas.webhook import TradingViewAlert
+
+    released = []
+
+    class FakeRisk:
+        def get_user_settings(self, db):
+            return SimpleNamespace(enable_signal_validation=False, subscribe_to_strategy=True)
+
+        def reserve_order(self, symbol, side, qty, price, db):
+            return True, None, SimpleNamespace(release=lambda: released.append(symbol))
+
+    monkeypatch.setattr(webhook, "RiskManager", FakeRisk)
+    alert = TradingViewAlert(symbol="AAPL", side="BUY", qty=1, price=150.0)
+
+    for order_status, expected in (("Submitted", []), ("Filled", ["AAPL"]), ("error: rejected", ["AAPL"] * 2)):
+        async def place(alert, db, market_validation, order_status=order_status):
+            return {"status": "success", "order_status": order_status}
+        monkeypatch.setattr(webhook, "_place_and_record", place)
+        asyncio.run(webhook._handle_alert(alert, DummyDB()))
+        assert released == expected, order_status